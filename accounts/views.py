@@ -4,6 +4,7 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
 from accounts.serializers import UserSerializer
+from students.dashboard import precompute_dashboard
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -88,6 +89,8 @@ class UserLoginView(APIView):
         user = authenticate(username=user.username, password=password)
         if user is not None:
             token, created = Token.objects.get_or_create(user=user)
+            if getattr(settings, "DASHBOARD_PRECOMPUTE_ON_LOGIN", False):
+                precompute_dashboard(user)
             return Response(
                 {
                     "token": token.key,
@@ -89,6 +89,26 @@ DATABASES = {
     }
 }
 
+# Shared by every worker process: the catalog pages, dashboards, outlines and
+# the version stamps that invalidate them (see lessons.cache_versions) must be
+# seen by all of them. Redis when REDIS_URL is set, otherwise a database table
+# created by the lessons migrations ("manage.py createcachetable").
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
 
 
 # Password validation
@@ -304,4 +324,63 @@ EMAIL_HOST_PASSWORD='Maitland@2024'
 DEFAULT_FROM_EMAIL = 'support@maindodigital.com'
 EMAIL_PORT=465
 EMAIL_USE_SSL=True
-EMAIL_USE_TLS=False
\ No newline at end of file
+EMAIL_USE_TLS=False
+
+# Store each student's completed contents in a compact bitmap on CourseProgress
+# instead of the completed_contents rows (see lessons.bitmap). After enabling,
+# run "manage.py rebuild_progress_bitmaps --drop-rows"; when disabling, run
+# "manage.py restore_completed_contents".
+PROGRESS_CONTENT_BITMAP = False
+
+# Acknowledge "mark complete" events once stored in a pending table and apply
+# them in batches (see lessons.progress_buffer). Schedule "manage.py
+# flush_progress_buffer" to drain the events of idle workers.
+PROGRESS_WRITE_BEHIND = False
+PROGRESS_WRITE_BEHIND_MAX_PENDING = 500
+PROGRESS_WRITE_BEHIND_INTERVAL = 2.0
+
+# Serve the students progress report from CourseProgressSnapshot, refreshed by
+# "manage.py refresh_progress_snapshots" (see lessons.progress_snapshots).
+STUDENTS_PROGRESS_FROM_SNAPSHOT = False
+
+# Lifetime in seconds of the cached content item payloads (see
+# lessons.content_cache). Entries are keyed on the item's "updated" timestamp.
+CONTENT_PAYLOAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Largest file accepted by the chunked upload endpoints (see lessons.chunked_upload).
+CHUNKED_UPLOAD_MAX_SIZE = 2 * 1024**3
+
+# Resized WebP/JPEG copies of Image contents and course images (see
+# lessons.image_variants). 0 workers generates them inline, in the request.
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_VARIANT_WORKERS = 2
+
+# Store File/Image contents and course images once per distinct content, under
+# MEDIA_ROOT/blobs/ (see lessons.storage). Unreferenced blobs are removed by
+# "manage.py collect_media_blobs".
+MEDIA_CONTENT_ADDRESSED = True
+
+# Media files are authorized by lessons.media.serve_media. Set to
+# "x-accel-redirect" (nginx, with an internal location at
+# MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or "x-sendfile" (Apache,
+# lighttpd) to let the front server send the file; None streams it from Django.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Lifetime in seconds of the signed media URLs handed out by lessons.media.media_url
+# for <video> and <img> tags, which cannot send the Authorization header.
+MEDIA_TOKEN_MAX_AGE = 3600
+
+# Lifetime in seconds of the cached anonymous course catalog pages (see
+# lessons.catalog_cache). Pages are keyed on a version bumped by Course/Subject
+# writes.
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+# Lifetime in seconds of the cached student dashboards (see students.dashboard),
+# and whether to build the dashboard in the background right after login.
+DASHBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+DASHBOARD_PRECOMPUTE_ON_LOGIN = False
+
+# Lifetime in seconds of the cached course outlines (see lessons.course_outline).
+# Entries are keyed on a per-course version stamp replaced on every change.
+COURSE_OUTLINE_CACHE_TIMEOUT = 60 * 60 * 24
@@ -1,19 +1,25 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from lessons.editor_upload import upload_editor_image
+from lessons.media import serve_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("account/", include("accounts.urls")),
     path("lessons/", include("lessons.urls")),
     path("students/", include("students.urls")),
     path("tests/", include("tests.urls")),
+    # Takes over the CKEditor upload route to generate the image variants.
+    path("ckeditor5/image_upload/", upload_editor_image, name="editor_image_upload"),
     path(
         "ckeditor5/", include("django_ckeditor_5.urls"), name="ck_editor_5_upload_file"
     ),
+    # Authorized media, see lessons.media (and MEDIA_SENDFILE in production).
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.+)$", serve_media),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -4,7 +4,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.contrib.contenttypes.models import ContentType
+from .content_registry import content_types
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from .models import Module, Text, Video, Image, File, Content
@@ -62,20 +62,21 @@ def edit_content(request, content_id):
             )
 
         # Update content based on type
-        if content.content_type.model == "text":
-            content_data = content.content_object
+        content_type = content_types.name_for_id(content.content_type_id)
+        if content_type == "text":
+            content_data = content.item
             content_data.content = request.data.get("content", content_data.content)
             content_data.save()
-        elif content.content_type.model == "video":
-            content_data = content.content_object
+        elif content_type == "video":
+            content_data = content.item
             content_data.url = request.data.get("url", content_data.url)
             content_data.save()
-        elif content.content_type.model == "image" and "file" in request.FILES:
-            content_data = content.content_object
+        elif content_type == "image" and "file" in request.FILES:
+            content_data = content.item
             content_data.file = request.FILES["file"]
             content_data.save()
-        elif content.content_type.model == "file" and "file" in request.FILES:
-            content_data = content.content_object
+        elif content_type == "file" and "file" in request.FILES:
+            content_data = content.item
             content_data.file = request.FILES["file"]
             content_data.save()
         else:
@@ -9,7 +9,38 @@ from .models import (
     Image,
     Video,
     CourseProgress,
+    SearchDocument,
 )
+from .bitmap import bitmap_enabled
+from .content_registry import content_types
+from .search import matching_object_ids
+
+
+class IndexedSearchMixin:
+    """
+    Admin search through the full-text index (see lessons.search) instead of
+    ``LIKE '%term%'`` scans; ``search_fields`` enables the search box and only
+    searches the rows that have no document (see ``unindexed``).
+    """
+
+    search_kind = None
+    search_fields = ["title"]
+
+    def indexed_ids(self, search_term):
+        return matching_object_ids(search_term, self.search_kind)
+
+    def unindexed(self, queryset):
+        """Rows without a document, searched with ``search_fields`` instead."""
+        return queryset.none()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        results = queryset.filter(pk__in=list(self.indexed_ids(search_term)))
+        unindexed, may_have_duplicates = super().get_search_results(
+            request, self.unindexed(queryset), search_term
+        )
+        return results | unindexed, may_have_duplicates
 
 
 # Subject Admin
@@ -28,10 +59,10 @@ class ModuleInline(admin.StackedInline):
 
 # Course Admin
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ["title", "subject", "owner", "created"]
     list_filter = ["created", "subject"]
-    search_fields = ["title", "overview"]
+    search_kind = SearchDocument.COURSE
     prepopulated_fields = {"slug": ("title",)}
     inlines = [ModuleInline]
 
@@ -44,19 +75,33 @@ class ContentInline(admin.StackedInline):
 
 # Module Admin
 @admin.register(Module)
-class ModuleAdmin(admin.ModelAdmin):
+class ModuleAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ["title", "course", "order"]
     list_filter = ["course"]
-    search_fields = ["title"]
+    search_kind = SearchDocument.MODULE
     inlines = [ContentInline]
 
 
 # Text, Image, Video, File Admins
 @admin.register(Text)
-class TextAdmin(admin.ModelAdmin):
+class TextAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ["title", "owner", "created"]
+    search_kind = SearchDocument.CONTENT
     search_fields = ["title", "content"]
 
+    def indexed_ids(self, search_term):
+        # Text documents are indexed per Content row, texts in no module are not.
+        return Content.objects.filter(
+            pk__in=list(super().indexed_ids(search_term))
+        ).values_list("object_id", flat=True)
+
+    def unindexed(self, queryset):
+        return queryset.exclude(
+            pk__in=Content.objects.filter(
+                content_type=content_types.get("text")
+            ).values("object_id")
+        )
+
 
 @admin.register(Image)
 class ImageAdmin(admin.ModelAdmin):
@@ -91,3 +136,9 @@ class CourseProgressAdmin(admin.ModelAdmin):
     search_fields = ["student__username", "course__title"]
     list_filter = ["course"]
     filter_horizontal = ["completed_modules", "completed_contents"]
+
+    def get_exclude(self, request, obj=None):
+        # The completed_contents rows are not used in bitmap storage mode.
+        if bitmap_enabled():
+            return ["completed_contents"]
+        return super().get_exclude(request, obj)
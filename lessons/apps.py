@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class LessonsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "lessons"
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .content_registry import content_types, warm_on_first_request
+
+        # Django discourages queries in ready(), so the registry is filled on the
+        # first request (or first use) and dropped when migrations ran.
+        request_started.connect(warm_on_first_request)
+        post_migrate.connect(content_types.clear, sender=self)
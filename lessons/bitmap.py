@@ -0,0 +1,287 @@
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def bitmap_enabled():
+    """
+    Whether CourseProgress stores completed contents in ``completed_bitmap``
+    instead of the ``completed_contents`` rows.
+    """
+    return getattr(settings, "PROGRESS_CONTENT_BITMAP", False)
+
+
+class ContentBitmap:
+    """
+    Compact set of content ordinals, one bit per ordinal (little-endian bit order).
+
+    Bit ``i`` lives in byte ``i >> 3`` under the mask ``1 << (i & 7)``, which is the
+    layout ``numpy.unpackbits(..., bitorder="little")`` expects.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data=b""):
+        self.data = bytearray(data or b"")
+
+    @classmethod
+    def from_ordinals(cls, ordinals):
+        bitmap = cls()
+        for ordinal in ordinals:
+            bitmap.set(ordinal)
+        return bitmap
+
+    def set(self, ordinal):
+        index = ordinal >> 3
+        if index >= len(self.data):
+            self.data.extend(bytes(index + 1 - len(self.data)))
+        self.data[index] |= 1 << (ordinal & 7)
+
+    def clear(self, ordinal):
+        index = ordinal >> 3
+        if index < len(self.data):
+            self.data[index] &= ~(1 << (ordinal & 7)) & 0xFF
+
+    def test(self, ordinal):
+        index = ordinal >> 3
+        return index < len(self.data) and bool(self.data[index] & (1 << (ordinal & 7)))
+
+    def popcount(self):
+        return int.from_bytes(self.data, "little").bit_count()
+
+    def ordinals(self):
+        value = int.from_bytes(self.data, "little")
+        ordinal = 0
+        while value:
+            if value & 1:
+                yield ordinal
+            value >>= 1
+            ordinal += 1
+
+    def __contains__(self, ordinal):
+        return self.test(ordinal)
+
+    def __len__(self):
+        return self.popcount()
+
+    def __bytes__(self):
+        return bytes(self.data.rstrip(b"\0"))
+
+
+#################################################################################
+# Vectorized cohort-wide aggregation (requires NumPy).
+
+
+def require_numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImproperlyConfigured(
+            "NumPy is required for cohort-wide bitmap aggregation."
+        ) from exc
+    return numpy
+
+
+def cohort_matrix(bitmaps, nbits):
+    """Pack a sequence of bitmaps into a ``(len(bitmaps), ceil(nbits / 8))`` uint8 matrix."""
+    np = require_numpy()
+    width = (nbits + 7) >> 3
+    matrix = np.zeros((len(bitmaps), width), dtype=np.uint8)
+    for row, data in enumerate(bitmaps):
+        data = bytes(data or b"")[:width]
+        matrix[row, : len(data)] = np.frombuffer(data, dtype=np.uint8)
+    return matrix
+
+
+def ordinal_mask(ordinals, nbits):
+    """Build a single packed row with the bits of ``ordinals`` set."""
+    return cohort_matrix([bytes(ContentBitmap.from_ordinals(ordinals))], nbits)[0]
+
+
+def popcounts(matrix):
+    """Number of set bits of every row."""
+    np = require_numpy()
+    return np.unpackbits(matrix, axis=1, bitorder="little").sum(axis=1)
+
+
+def rows_containing(matrix, mask):
+    """Boolean vector of the rows that have every bit of ``mask`` set (AND)."""
+    np = require_numpy()
+    return np.all((matrix & mask) == mask, axis=1)
+
+
+def rows_intersecting(matrix, mask):
+    """Boolean vector of the rows that have at least one bit of ``mask`` set (OR)."""
+    np = require_numpy()
+    return np.any(matrix & mask, axis=1)
+
+
+def completed_by_anyone(matrix):
+    """OR of every row: the contents at least one student completed."""
+    np = require_numpy()
+    return np.bitwise_or.reduce(matrix, axis=0)
+
+
+def completed_by_everyone(matrix):
+    """AND of every row: the contents every student completed."""
+    np = require_numpy()
+    return np.bitwise_and.reduce(matrix, axis=0)
+
+
+def load_cohort(course, nbits=None):
+    """
+    Return ``(student_ids, matrix)`` for every progress record of ``course``.
+
+    ``nbits`` defaults to the length of the longest stored bitmap.
+    """
+    np = require_numpy()
+    from .models import CourseProgress
+
+    rows = list(
+        CourseProgress.objects.filter(course=course)
+        .order_by("student_id")
+        .values_list("student_id", "completed_bitmap")
+    )
+    if nbits is None:
+        nbits = max((len(bitmap or b"") for _, bitmap in rows), default=0) * 8
+    student_ids = np.array([student_id for student_id, _ in rows], dtype=np.int64)
+    matrix = cohort_matrix([bitmap for _, bitmap in rows], nbits)
+    return student_ids, matrix
+
+
+def students_who_finished(module):
+    """
+    Ids of the students who completed every content of ``module``, in bitmap
+    storage mode.
+    """
+    ordinals = list(
+        module.contents.exclude(ordinal=None).values_list("ordinal", flat=True)
+    )
+    if not ordinals:
+        return []
+    nbits = max(ordinals) + 1
+    student_ids, matrix = load_cohort(module.course_id, nbits)
+    mask = ordinal_mask(ordinals, nbits)
+    return student_ids[rows_containing(matrix, mask)].tolist()
+
+
+#################################################################################
+# Migration path from the completed_contents M2M rows.
+
+
+def assign_content_ordinals(course_ids=None, apps=global_apps):
+    """Give every content without an ordinal the next free ordinal of its course."""
+    Course = apps.get_model("lessons", "Course")
+    Content = apps.get_model("lessons", "Content")
+
+    courses = Course.objects.order_by("id")
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+
+    for course in courses.iterator():
+        contents = list(
+            Content.objects.filter(module__course=course, ordinal=None)
+            .order_by("module__order", "order", "id")
+            .only("id")
+        )
+        if not contents:
+            continue
+        for offset, content in enumerate(contents):
+            content.ordinal = course.content_ordinals + offset
+        Content.objects.bulk_update(contents, ["ordinal"], batch_size=500)
+        course.content_ordinals += len(contents)
+        course.save(update_fields=["content_ordinals"])
+
+
+def rebuild_progress_bitmaps(
+    course_ids=None, apps=global_apps, batch_size=500, drop_rows=False
+):
+    """
+    Build the completed content bitmaps of every CourseProgress from the M2M rows,
+    and delete the rows afterwards when ``drop_rows`` is set.
+
+    Returns the number of CourseProgress rows rewritten.
+    """
+    CourseProgress = apps.get_model("lessons", "CourseProgress")
+    CompletedContents = CourseProgress.completed_contents.through
+
+    assign_content_ordinals(course_ids, apps=apps)
+
+    progresses = CourseProgress.objects.order_by("id")
+    if course_ids is not None:
+        progresses = progresses.filter(course_id__in=course_ids)
+
+    updated = 0
+    batch = []
+    for progress in progresses.only("id").iterator(chunk_size=batch_size):
+        batch.append(progress)
+        if len(batch) == batch_size:
+            updated += _write_bitmaps(CourseProgress, CompletedContents, batch)
+            batch = []
+    if batch:
+        updated += _write_bitmaps(CourseProgress, CompletedContents, batch)
+    if drop_rows:
+        rows = CompletedContents.objects.all()
+        if course_ids is not None:
+            rows = rows.filter(courseprogress__course_id__in=course_ids)
+        rows.delete()
+    return updated
+
+
+def _write_bitmaps(CourseProgress, CompletedContents, progresses):
+    ordinals = defaultdict(list)
+    for progress_id, ordinal in CompletedContents.objects.filter(
+        courseprogress_id__in=[progress.id for progress in progresses]
+    ).values_list("courseprogress_id", "content__ordinal"):
+        ordinals[progress_id].append(ordinal)
+    for progress in progresses:
+        progress.completed_bitmap = bytes(
+            ContentBitmap.from_ordinals(ordinals.get(progress.id, ()))
+        )
+    CourseProgress.objects.bulk_update(progresses, ["completed_bitmap"])
+    return len(progresses)
+
+
+def restore_completed_rows(course_ids=None, apps=global_apps, batch_size=500):
+    """
+    Write the completed_contents rows back from the bitmaps, to leave the bitmap
+    storage mode. Existing rows are kept, so it can run again after disabling
+    PROGRESS_CONTENT_BITMAP to pick up the last completions.
+
+    Returns the number of CourseProgress rows read.
+    """
+    Content = apps.get_model("lessons", "Content")
+    CourseProgress = apps.get_model("lessons", "CourseProgress")
+    CompletedContents = CourseProgress.completed_contents.through
+
+    progresses = CourseProgress.objects.exclude(completed_bitmap=b"").order_by("id")
+    if course_ids is not None:
+        progresses = progresses.filter(course_id__in=course_ids)
+
+    content_ids = {}
+    updated = 0
+    for progress in progresses.only("id", "course_id", "completed_bitmap").iterator(
+        chunk_size=batch_size
+    ):
+        if progress.course_id not in content_ids:
+            content_ids[progress.course_id] = dict(
+                Content.objects.filter(module__course_id=progress.course_id)
+                .exclude(ordinal=None)
+                .values_list("ordinal", "id")
+            )
+        ordinals = content_ids[progress.course_id]
+        CompletedContents.objects.bulk_create(
+            [
+                CompletedContents(
+                    courseprogress_id=progress.id, content_id=ordinals[ordinal]
+                )
+                for ordinal in ContentBitmap(progress.completed_bitmap).ordinals()
+                if ordinal in ordinals
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        updated += 1
+    return updated
@@ -0,0 +1,40 @@
+import time
+
+from django.core.cache import cache
+
+# Version stamps of cached documents, kept in the cache itself. A document
+# stores the stamps it was built from and is stale once any of them changed.
+# Stamps are unique tokens rather than counters, so a stamp lost to eviction is
+# simply replaced and never matches an old document again.
+#
+#   "outline": structure of a course (course, modules, contents and their
+#              items), bumped by lessons.signals
+#   "course":  the same, plus the enrollments and progress rows of the course
+#   "user":    enrollments and progress rows of a user
+
+
+def _key(namespace, pk):
+    return f"version:{namespace}:{pk}"
+
+
+def get_versions(namespace, ids):
+    """``{id: stamp}``, missing stamps are created."""
+    keys = {_key(namespace, pk): pk for pk in ids}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: stamp for key, stamp in found.items()}
+
+
+def bump_versions(namespace, ids):
+    stamp = time.time_ns()
+    cache.set_many({_key(namespace, pk): stamp for pk in set(ids) if pk}, None)
+
+
+def bump_course_structure(course_ids):
+    """A course, or one of its modules, contents or items changed."""
+    course_ids = list(course_ids)
+    bump_versions("outline", course_ids)
+    bump_versions("course", course_ids)
@@ -0,0 +1,70 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "catalog-version"
+CATALOG_TIMEOUT = getattr(settings, "CATALOG_CACHE_TIMEOUT", 60 * 60)
+# How long a rebuild may hold the lock, and how long the others wait for it.
+LOCK_TIMEOUT = 10
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.05
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A new epoch rather than 1, so pages of a lost version are never reused.
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version(*args, **kwargs):
+    """Invalidate every cached catalog page; also a Course/Subject signal receiver."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def page_key(params):
+    digest = hashlib.md5(urlencode(sorted(params.items())).encode()).hexdigest()
+    return f"catalog:{{version}}:{digest}"
+
+
+def cached_page(params, build):
+    """
+    Return the catalog page for the query ``params``, calling ``build()`` on a
+    miss. Pages are keyed on the catalog version.
+
+    Only one request rebuilds a missing page: the others answer with the page
+    of the previous version while there is one, or wait for the rebuild (and
+    build it themselves if it takes longer than WAIT_TIMEOUT).
+    """
+    template = page_key(params)
+    key = template.format(version=catalog_version())
+    page = cache.get(key)
+    if page is not None:
+        return page
+
+    stale_key = template.format(version="stale")
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        page = cache.get(stale_key)
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while page is None and time.monotonic() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            page = cache.get(key)
+        if page is not None:
+            return page
+        return build()
+
+    try:
+        page = build()
+        cache.set_many({key: page, stale_key: page}, CATALOG_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return page
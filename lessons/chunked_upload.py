@@ -0,0 +1,214 @@
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .content_registry import content_types
+from .models import ChunkedUpload, Content, Module
+from .serializers import ContentSerializer
+
+STREAM_BLOCK_SIZE = 64 * 1024
+MAX_UPLOAD_SIZE = getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 2 * 1024**3)
+
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+def _state(upload):
+    return {
+        "upload_id": str(upload.id),
+        "offset": upload.offset,
+        "size": upload.size,
+        "completed": upload.completed is not None,
+    }
+
+
+def _get_upload(request, upload_id):
+    return get_object_or_404(ChunkedUpload, id=upload_id, owner=request.user)
+
+
+def write_range(upload, start, stream, length):
+    """
+    Copy ``length`` bytes of ``stream`` into the temp file at ``start``, block by
+    block, and return the number of bytes written (fewer if the client went away).
+    """
+    os.makedirs(os.path.dirname(upload.temp_path), exist_ok=True)
+    mode = "r+b" if os.path.exists(upload.temp_path) else "wb"
+    written = 0
+    with open(upload.temp_path, mode) as temp:
+        temp.seek(start)
+        while written < length:
+            try:
+                block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+            except OSError:
+                break
+            if not block:
+                break
+            temp.write(block)
+            written += len(block)
+        temp.flush()
+        os.fsync(temp.fileno())
+    return written
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def initiate_upload(request, module_id):
+    """
+    Start a chunked upload of a File or Image content into a module.
+
+    Expects ``{"content_type": "file" | "image", "filename": ..., "size": <bytes>,
+    "title": ...}``. The bytes are then sent with ``PUT uploads/<upload_id>/`` and
+    a ``Content-Range: bytes <start>-<end>/<size>`` header, and the content is
+    created with ``POST uploads/<upload_id>/complete/``.
+    """
+    module = get_object_or_404(Module.objects.select_related("course"), id=module_id)
+    if module.course.owner != request.user:
+        return Response(
+            {"error": "Você não tem permissão para adicionar conteúdo a este módulo."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    content_type = str(request.data.get("content_type", "")).lower()
+    filename = os.path.basename(str(request.data.get("filename", "")))
+    try:
+        size = int(request.data.get("size"))
+    except (TypeError, ValueError):
+        size = 0
+    if content_type not in ("file", "image") or not filename:
+        return Response(
+            {"error": "Informe content_type ('file' ou 'image') e filename."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not 0 < size <= MAX_UPLOAD_SIZE:
+        return Response(
+            {"error": f"size deve estar entre 1 e {MAX_UPLOAD_SIZE} bytes."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    upload = ChunkedUpload.objects.create(
+        owner=request.user,
+        module=module,
+        content_type=content_type,
+        title=request.data.get("title") or filename,
+        filename=filename,
+        size=size,
+    )
+    return Response(_state(upload), status=status.HTTP_201_CREATED)
+
+
+@api_view(["GET", "PUT", "DELETE"])
+@permission_classes([permissions.IsAuthenticated])
+def upload_chunk(request, upload_id):
+    """
+    ``GET`` returns the offset to resume from, ``PUT`` appends the byte range of
+    the ``Content-Range`` header (it must start at the current offset) and
+    ``DELETE`` abandons the upload.
+    """
+    upload = _get_upload(request, upload_id)
+
+    if request.method == "GET":
+        return Response(_state(upload), status=status.HTTP_200_OK)
+
+    if request.method == "DELETE":
+        if os.path.exists(upload.temp_path):
+            os.remove(upload.temp_path)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if upload.completed:
+        return Response(
+            {"error": "Upload já concluído.", **_state(upload)},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    match = CONTENT_RANGE.match(request.headers.get("Content-Range", ""))
+    if not match:
+        return Response(
+            {"error": "Cabeçalho Content-Range inválido."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    start, end, total = (int(group) for group in match.groups())
+    if total != upload.size or end < start or end >= upload.size:
+        return Response(
+            {"error": "Intervalo fora do tamanho do upload."},
+            status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+    if length != end - start + 1 or request.stream is None:
+        return Response(
+            {"error": "O corpo deve conter exatamente os bytes do Content-Range."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if start != upload.offset:
+        # The client resumes from the offset returned here.
+        return Response(
+            {"error": "O intervalo deve começar no offset atual.", **_state(upload)},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    # request.stream is the WSGI input, the body is never loaded in memory.
+    written = write_range(upload, start, request.stream, end - start + 1)
+    # Only advance if no other request moved the offset meanwhile.
+    ChunkedUpload.objects.filter(id=upload.id, offset=start).update(
+        offset=start + written, updated=timezone.now()
+    )
+    upload.refresh_from_db(fields=["offset"])
+    return Response(_state(upload), status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def complete_upload(request, upload_id):
+    """
+    Create the File/Image item and its Content from a fully received upload.
+    """
+    upload = _get_upload(request, upload_id)
+
+    if upload.completed:
+        return Response(
+            {"error": "Upload já concluído.", **_state(upload)},
+            status=status.HTTP_409_CONFLICT,
+        )
+    if upload.offset != upload.size:
+        return Response(
+            {"error": "Upload incompleto.", **_state(upload)},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    # Claim the upload so that a repeated request cannot create a second content.
+    claimed = ChunkedUpload.objects.filter(id=upload.id, completed=None).update(
+        completed=timezone.now()
+    )
+    if not claimed:
+        return Response(
+            {"error": "Upload já concluído."}, status=status.HTTP_409_CONFLICT
+        )
+
+    model = content_types.model(upload.content_type)
+    item = model(owner=request.user, title=upload.title)
+    try:
+        with open(upload.temp_path, "rb") as temp:
+            # Copies the temp file to the storage block by block.
+            item.file.save(upload.filename, DjangoFile(temp), save=False)
+        with transaction.atomic():
+            item.save()
+            content = Content.objects.create(module_id=upload.module_id, item=item)
+            ChunkedUpload.objects.filter(id=upload.id).update(content=content)
+    except Exception:
+        if item.file:
+            item.file.delete(save=False)
+        ChunkedUpload.objects.filter(id=upload.id).update(completed=None)
+        raise
+    os.remove(upload.temp_path)
+
+    return Response(ContentSerializer(content).data, status=status.HTTP_201_CREATED)
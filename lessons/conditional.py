@@ -0,0 +1,87 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.generics import get_object_or_404
+
+from .cache_versions import get_versions
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+
+
+def stamp_datetime(stamp):
+    """When a version stamp of lessons.cache_versions was created."""
+    return datetime.fromtimestamp(stamp / 1e9, tz=timezone.utc)
+
+
+def outline_validators(course_id, *moments):
+    """
+    ``(etag, last_modified)`` of data derived from a course's structure, from its
+    "outline" version stamp and the other given datetimes (e.g. ``Course.created``).
+    """
+    stamp = get_versions("outline", [course_id])[course_id]
+    last_modified = max([stamp_datetime(stamp), *[m for m in moments if m]])
+    return make_etag("outline", course_id, stamp), last_modified
+
+
+def conditional(request, etag, last_modified, build):
+    """
+    Answer a GET with ``304 Not Modified`` when its If-None-Match (or
+    If-Modified-Since) matches the validators, without calling ``build``;
+    otherwise return ``build()`` with ETag and Last-Modified headers.
+
+    Run it after authentication and permission checks. An ``etag`` of ``None``
+    (e.g. the object does not exist) always builds the response.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = build()
+    if etag and response.status_code in (200, 304):
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        # Clients keep the body and revalidate it on each use.
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Generic view whose GET is answered by ``conditional`` from the
+    ``(etag, last_modified)`` returned by ``get_validators``; the queryset is
+    only evaluated and serialized when the client's copy is stale.
+
+    Detail views look the object up and check its permissions first, so
+    ``get_validators`` can read ``self.object``.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def check_object(self):
+        """
+        ``get_object`` without the prefetches of the queryset: the lookup and
+        object permission checks, at the cost of one row.
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        obj = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def get(self, request, *args, **kwargs):
+        if (self.lookup_url_kwarg or self.lookup_field) in kwargs:
+            self.object = self.check_object()
+        etag, last_modified = self.get_validators()
+        return conditional(
+            request,
+            etag,
+            last_modified,
+            lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs),
+        )
@@ -3,7 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.exceptions import ValidationError, PermissionDenied
 from rest_framework.response import Response
-from django.contrib.contenttypes.models import ContentType
+from .content_registry import content_types
 from .models import Module, Text, Video, Image, File, Content
 from .serializers import ContentSerializer
 
@@ -55,7 +55,7 @@ class CreateContentView(generics.CreateAPIView):
             )
             serializer.save(
                 module=module,
-                content_type=ContentType.objects.get_for_model(Text),
+                content_type=content_types.get("text"),
                 object_id=text_content.id,
             )
 
@@ -67,7 +67,7 @@ class CreateContentView(generics.CreateAPIView):
             )
             serializer.save(
                 module=module,
-                content_type=ContentType.objects.get_for_model(Video),
+                content_type=content_types.get("video"),
                 object_id=video_content.id,
             )
 
@@ -82,7 +82,7 @@ class CreateContentView(generics.CreateAPIView):
             )
             serializer.save(
                 module=module,
-                content_type=ContentType.objects.get_for_model(Image),
+                content_type=content_types.get("image"),
                 object_id=image_content.id,
             )
 
@@ -97,7 +97,7 @@ class CreateContentView(generics.CreateAPIView):
             )
             serializer.save(
                 module=module,
-                content_type=ContentType.objects.get_for_model(File),
+                content_type=content_types.get("file"),
                 object_id=file_content.id,
             )
 
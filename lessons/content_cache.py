@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .content_registry import content_types
+
+# Payloads of the same item are serialized differently for tutors (lessons) and
+# students, each variant is cached under its own key.
+PAYLOAD_VARIANTS = ("lessons", "students")
+
+CONTENT_PAYLOAD_TIMEOUT = getattr(
+    settings, "CONTENT_PAYLOAD_CACHE_TIMEOUT", 60 * 60 * 24
+)
+
+
+def payload_key(variant, content_type_id, object_id, updated):
+    stamp = int(updated.timestamp() * 1_000_000)
+    return f"content-payload:{variant}:{content_type_id}:{object_id}:{stamp}"
+
+
+def content_payloads(contents, variant, serializers):
+    """
+    Return ``{content.pk: payload}`` with the serialized item of each content.
+
+    ``serializers`` maps content names (see content_registry) to the serializer of
+    the item; contents of other types, or whose item is gone, are left out.
+    Cached fragments are read with one ``get_many`` and the misses are serialized
+    and stored with one ``set_many``. Since the key holds ``item.updated``, an
+    edited item is never served stale.
+    """
+    entries = {}
+    for content in contents:
+        serializer = serializers.get(content_types.name_for_id(content.content_type_id))
+        item = content.item
+        if serializer is None or item is None:
+            continue
+        key = payload_key(variant, content.content_type_id, item.pk, item.updated)
+        entries[key] = (content.pk, serializer, item)
+
+    cached = cache.get_many(entries)
+    missing = {}
+    payloads = {}
+    for key, (content_id, serializer, item) in entries.items():
+        if key not in cached:
+            cached[key] = missing[key] = dict(serializer(item).data)
+        payloads[content_id] = cached[key]
+    if missing:
+        cache.set_many(missing, CONTENT_PAYLOAD_TIMEOUT)
+    return payloads
+
+
+def invalidate_item(sender, instance, **kwargs):
+    """post_save/post_delete receiver of the ItemBase subclasses."""
+    content_type = content_types.get(content_types.name_for_model(sender))
+    if content_type is None or instance.updated is None:
+        return
+    cache.delete_many(
+        [
+            payload_key(variant, content_type.id, instance.pk, instance.updated)
+            for variant in PAYLOAD_VARIANTS
+        ]
+    )
@@ -0,0 +1,73 @@
+import threading
+
+from django.contrib.contenttypes.models import ContentType
+
+
+class ContentTypeRegistry:
+    """
+    Process-wide map between the content names (text, video, image, file, live),
+    their models and their ContentType rows.
+
+    The rows are loaded with a single query on first use (or by ``warm``) and kept
+    for the lifetime of the process; ContentType ids never change once created.
+    """
+
+    NAMES = ("text", "video", "image", "file", "live")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._names_by_id = {}
+
+    def warm(self):
+        from django.apps import apps
+
+        models = {name: apps.get_model("lessons", name) for name in self.NAMES}
+        content_types = ContentType.objects.get_for_models(*models.values())
+        by_name = {name: content_types[model] for name, model in models.items()}
+        with self._lock:
+            self._by_name = by_name
+            self._names_by_id = {ct.id: name for name, ct in by_name.items()}
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._by_name = {}
+            self._names_by_id = {}
+
+    def _loaded(self):
+        if not self._by_name:
+            self.warm()
+        return self._by_name
+
+    def get(self, name):
+        """ContentType of a content name, or ``None`` if it is not a content model."""
+        return self._loaded().get(name)
+
+    def model(self, name):
+        content_type = self.get(name)
+        return content_type.model_class() if content_type else None
+
+    def name_for_id(self, content_type_id):
+        self._loaded()
+        return self._names_by_id.get(content_type_id)
+
+    def name_for_model(self, model):
+        name = model._meta.model_name
+        return (
+            name if model._meta.app_label == "lessons" and name in self.NAMES else None
+        )
+
+    def ids(self):
+        """``{name: content_type_id}`` of every content model."""
+        return {name: ct.id for name, ct in self._loaded().items()}
+
+
+content_types = ContentTypeRegistry()
+
+
+def warm_on_first_request(sender, **kwargs):
+    # Connected by LessonsConfig.ready; queries outside of app initialization.
+    from django.core.signals import request_started
+
+    request_started.disconnect(warm_on_first_request)
+    content_types.warm()
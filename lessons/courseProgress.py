@@ -1,8 +1,9 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Course, Module, CourseProgress
+from .progress_buffer import progress_buffer, write_behind_enabled
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -19,6 +20,11 @@ def mark_module_complete(request, course_id, module_id):
         if not course.students.filter(id=student.id).exists():
             return Response({"error": "Você não está inscrito neste curso."}, status=status.HTTP_403_FORBIDDEN)
 
+        if write_behind_enabled():
+            # Acknowledge now, the buffer writes the completion in a later batch
+            progress_buffer.record(student.id, course.id, module_ids=[module.id])
+            return Response({"success": "Módulo marcado como completo."}, status=status.HTTP_200_OK)
+
         # Get or create progress record for the student
         progress, created = CourseProgress.objects.get_or_create(student=student, course=course)
 
@@ -31,3 +37,15 @@ def mark_module_complete(request, course_id, module_id):
         return Response({"error": "Curso não encontrado."}, status=status.HTTP_404_NOT_FOUND)
     except Module.DoesNotExist:
         return Response({"error": "Módulo não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def progress_buffer_metrics(request):
+    """
+    Returns the flush and lag metrics of the progress write-behind buffer.
+    """
+    return Response(
+        {"enabled": write_behind_enabled(), **progress_buffer.metrics()},
+        status=status.HTTP_200_OK,
+    )
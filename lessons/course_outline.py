@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .cache_versions import get_versions
+from .conditional import conditional, outline_validators
+from .models import Content, Course
+from .serializers import ContentSerializer, CourseSerializer, ModuleSerializer
+
+OUTLINE_TIMEOUT = getattr(settings, "COURSE_OUTLINE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def outline_version(course_id):
+    return get_versions("outline", [course_id])[course_id]
+
+
+def build_outline(course):
+    """
+    ``{"course": ..., "modules": [{..., "contents": [...]}]}`` of a course, in
+    order, with the lessons serializers; the contents are loaded in bulk.
+    """
+    modules = course.modules.prefetch_related(
+        Prefetch("contents", queryset=Content.objects.with_items())
+    )
+    return {
+        "course": dict(CourseSerializer(course).data),
+        "modules": [
+            {
+                **ModuleSerializer(module).data,
+                "contents": list(
+                    ContentSerializer(module.contents.all(), many=True).data
+                ),
+            }
+            for module in modules
+        ],
+    }
+
+
+# Media fields of the serialized course and content items.
+URL_FIELDS = ("image", "file")
+
+
+def absolute_urls(data, request):
+    """
+    Copy of a cached outline, or of a part of it, with the media URLs made
+    absolute for ``request``, as the serializers do when given the request.
+    The cache holds the relative URLs, which do not depend on the host.
+    """
+    if isinstance(data, list):
+        return [absolute_urls(value, request) for value in data]
+    if isinstance(data, dict):
+        return {
+            key: (
+                request.build_absolute_uri(value)
+                if key in URL_FIELDS and isinstance(value, str) and value
+                else absolute_urls(value, request)
+            )
+            for key, value in data.items()
+        }
+    return data
+
+
+def get_outline(course_id, refresh=False):
+    """
+    The cached outline of a course, or ``None`` if there is no such course.
+
+    Stored as one entry per course, keyed on its "outline" version stamp (see
+    lessons.cache_versions), which any change of the course, its modules,
+    contents or content items replaces. ``refresh`` rebuilds the entry.
+    """
+    key = f"course-outline:{course_id}:{outline_version(course_id)}"
+    outline = None if refresh else cache.get(key)
+    if outline is None:
+        course = Course.objects.filter(pk=course_id).first()
+        if course is None:
+            return None
+        outline = build_outline(course)
+        cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
+
+
+def module_outline(outline, module_id):
+    return next(
+        (module for module in outline["modules"] if module["id"] == module_id), None
+    )
+
+
+def get_module_outline(course_id, module_id):
+    """
+    A module of the cached outline of its course, or ``None`` if there is no
+    such module. The outline is rebuilt once when the module is missing from it,
+    e.g. an entry stored while the module was being created.
+    """
+    for refresh in (False, True):
+        outline = get_outline(course_id, refresh=refresh)
+        if outline is None:
+            return None
+        module = module_outline(outline, module_id)
+        if module is not None:
+            return module
+    return None
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def course_outline(request, course_id):
+    """
+    The ordered course → modules → contents tree, for the course owner and the
+    enrolled students.
+    """
+    course = Course.objects.filter(pk=course_id).only("owner_id").first()
+    if course is None:
+        return Response(
+            {"error": "Curso não encontrado."}, status=status.HTTP_404_NOT_FOUND
+        )
+    if (
+        course.owner_id != request.user.id
+        and not course.students.filter(id=request.user.id).exists()
+    ):
+        return Response(
+            {"error": "Você não tem permissão para acessar esse curso."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    return conditional(
+        request,
+        *outline_validators(course_id),
+        lambda: Response(
+            absolute_urls(get_outline(course_id), request), status=status.HTTP_200_OK
+        ),
+    )
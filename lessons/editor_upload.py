@@ -0,0 +1,24 @@
+import json
+import mimetypes
+
+from django_ckeditor_5.views import upload_file
+
+from .image_variants import schedule_file_variants
+from .text_render import _media_name
+
+# Formats Pillow resizes; SVG and the other uploads are embedded as they are.
+RASTER_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "image/bmp"}
+
+
+def upload_editor_image(request):
+    """
+    The CKEditor 5 image upload of django_ckeditor_5, which also generates the
+    resized variants of the image. The texts embedding it are then rendered
+    with a srcset (see lessons.text_render).
+    """
+    response = upload_file(request)
+    if response.status_code == 200:
+        name = _media_name(json.loads(response.content)["url"])
+        if name and mimetypes.guess_type(name)[0] in RASTER_TYPES:
+            schedule_file_variants(name)
+    return response
@@ -3,13 +3,26 @@ from django.core.exceptions import ObjectDoesNotExist
 
 
 class OrderField(models.PositiveIntegerField):
-    def __init__(self, for_fields=None, *args, **kwargs):
+    """
+    Position of a row among the rows sharing the values of ``for_fields``.
+
+    With ``sequence=True`` new positions come from a per-parent counter row
+    (see OrderSequence) incremented atomically, instead of ``latest()`` on the
+    table, so concurrent inserts never get the same order.
+    """
+
+    def __init__(self, for_fields=None, sequence=False, *args, **kwargs):
         self.for_fields = for_fields
+        self.sequence = sequence
         super().__init__(*args, **kwargs)
 
     def pre_save(self, model_instance, add):
         if getattr(model_instance, self.attname) is None:
             # no current value
+            if self.sequence:
+                value = self.reserve(model_instance)
+                setattr(model_instance, self.attname, value)
+                return value
             try:
                 qs = self.model.objects.all()
                 if self.for_fields:
@@ -29,3 +42,27 @@ class OrderField(models.PositiveIntegerField):
             return value
         else:
             return super().pre_save(model_instance, add)
+
+    def reserve(self, model_instance, count=1):
+        """
+        Reserve ``count`` consecutive orders in the parent of ``model_instance``
+        and return the first one. Only ``for_fields`` of the instance are read.
+        """
+        from .models import OrderSequence
+
+        attnames = [
+            self.model._meta.get_field(field).attname for field in self.for_fields or ()
+        ]
+        scope = {attname: getattr(model_instance, attname) for attname in attnames}
+
+        def first_free():
+            # Seeds the counter of a parent whose rows predate sequence mode.
+            last = self.model._default_manager.filter(**scope).aggregate(
+                last=models.Max(self.attname)
+            )["last"]
+            return 0 if last is None else last + 1
+
+        key = ",".join(f"{attname}={value}" for attname, value in scope.items())
+        return OrderSequence.allocate(
+            self.model._meta.label_lower, key, count, first_free
+        )
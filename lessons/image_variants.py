@@ -0,0 +1,201 @@
+import glob
+import logging
+import multiprocessing
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+
+logger = logging.getLogger(__name__)
+
+# Pillow format name and file extension of each variant format.
+VARIANT_FORMATS = {"webp": ("WEBP", "webp"), "jpeg": ("JPEG", "jpg")}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_widths():
+    return tuple(getattr(settings, "IMAGE_VARIANT_WIDTHS", (320, 640, 1280)))
+
+
+def render_variants(source_path, media_root, widths, quality=80):
+    """
+    Write the resized WebP and JPEG variants of an image next to it, under
+    ``variants/<stem>.<width>.<ext>``, and return ``{format: [[width, name]]}``
+    with names relative to ``media_root``.
+
+    Runs in the worker processes, so it only takes and returns plain values.
+    Widths larger than the original are clamped to its width, so it is never
+    upscaled.
+    """
+    from PIL import Image as PILImage, ImageOps
+
+    with PILImage.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)
+        targets = sorted({min(width, original.width) for width in widths})
+        directory = os.path.join(os.path.dirname(source_path), "variants")
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+
+        variants = {name: [] for name in VARIANT_FORMATS}
+        for width in targets:
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), PILImage.LANCZOS)
+            for name, (pil_format, extension) in VARIANT_FORMATS.items():
+                image = resized
+                if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                elif image.mode not in ("RGB", "RGBA", "L"):
+                    image = image.convert("RGBA")
+                path = os.path.join(directory, f"{stem}.{width}.{extension}")
+                image.save(path, pil_format, quality=quality)
+                variants[name].append(
+                    [width, os.path.relpath(path, media_root).replace(os.sep, "/")]
+                )
+    return variants
+
+
+def get_executor():
+    """The process pool shared by the process, started on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=getattr(settings, "IMAGE_VARIANT_WORKERS", 2),
+                # Forking a threaded server process is unsafe.
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _generate(source_path, name, on_done):
+    """Render the variants of a file off the request path, then ``on_done(variants)``."""
+    args = (source_path, settings.MEDIA_ROOT, variant_widths())
+    if not getattr(settings, "IMAGE_VARIANT_WORKERS", 2):
+        try:
+            variants = render_variants(*args)
+        except Exception:
+            logger.exception("Failed to generate the variants of %s.", name)
+            return
+        on_done(variants)
+        return
+
+    future = get_executor().submit(render_variants, *args)
+
+    def done(future):
+        from django.db import connection
+
+        try:
+            on_done(future.result())
+        except Exception:
+            logger.exception("Failed to generate the variants of %s.", name)
+        finally:
+            # Runs in a thread of the executor, which owns its own connection.
+            connection.close()
+
+    future.add_done_callback(done)
+
+
+def schedule_variants(instance, field_name):
+    """
+    Generate the variants of ``instance.<field_name>`` off the request path and
+    store them in ``instance.variants`` when done.
+
+    With ``IMAGE_VARIANT_WORKERS = 0`` the variants are generated inline.
+    """
+    field = getattr(instance, field_name)
+    if not field:
+        return
+    _generate(
+        field.path,
+        field.name,
+        lambda variants: store_variants(
+            type(instance), instance.pk, field_name, field.name, variants
+        ),
+    )
+
+
+def schedule_file_variants(name):
+    """
+    Generate the variants of a media file no row refers to, such as a CKEditor
+    upload, then render the texts embedding it again. They are found on disk by
+    ``variants_on_disk``.
+    """
+    from django.core.files.storage import default_storage
+
+    from .text_render import render_texts_embedding
+
+    _generate(
+        default_storage.path(name),
+        name,
+        lambda variants: render_texts_embedding([name]),
+    )
+
+
+def variants_on_disk(name):
+    """``{"source": name, format: [[width, name]]}`` of the variants written next to a file."""
+    from django.core.files.storage import default_storage
+
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    prefix = f"{directory}/variants/" if directory else "variants/"
+    try:
+        base = default_storage.path(prefix + stem)
+    except SuspiciousFileOperation:  # The name comes from the HTML of a text.
+        return {}
+    extensions = {extension: fmt for fmt, (_, extension) in VARIANT_FORMATS.items()}
+    variants = {}
+    for path in glob.glob(glob.escape(base) + ".*"):
+        width, _, extension = os.path.basename(path)[len(stem) + 1 :].partition(".")
+        if width.isdigit() and extension in extensions:
+            variants.setdefault(extensions[extension], []).append(
+                [int(width), prefix + os.path.basename(path)]
+            )
+    if not variants:
+        return {}
+    return {"source": name, **{fmt: sorted(found) for fmt, found in variants.items()}}
+
+
+def store_variants(model, pk, field_name, source, variants):
+    from django.utils import timezone
+
+    updates = {"variants": {"source": source, **variants}}
+    if any(field.name == "updated" for field in model._meta.fields):
+        # New cache keys for the payloads of content items (see content_cache).
+        updates["updated"] = timezone.now()
+    # Skip the update if the file was replaced in the meantime.
+    updated = model.objects.filter(pk=pk, **{field_name: source}).update(**updates)
+    if updated:
+        from .signals import course_changed, item_changed
+        from .text_render import render_texts_embedding
+
+        # Point the texts embedding the image at the new variants.
+        render_texts_embedding([source])
+
+        # The cached documents listing the srcset, as a save would.
+        if model._meta.label == "lessons.Course":
+            from .catalog_cache import bump_catalog_version
+
+            bump_catalog_version()
+            course_changed(model, model(pk=pk))
+        else:
+            item_changed(model, model(pk=pk))
+
+
+def needs_variants(instance, field_name):
+    field = getattr(instance, field_name)
+    return bool(field) and instance.variants.get("source") != field.name
+
+
+def srcset(variants, variant_format):
+    """``srcset`` attribute value of the variants in one format, or ``""``."""
+    from django.core.files.storage import default_storage
+
+    return ", ".join(
+        f"{default_storage.url(name)} {width}w"
+        for width, name in variants.get(variant_format, [])
+    )
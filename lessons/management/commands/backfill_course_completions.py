@@ -0,0 +1,51 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from lessons.models import CourseProgress, stamp_completions
+
+
+class Command(BaseCommand):
+    help = (
+        "Stamp date_completed on course progress records whose counters show a "
+        "completed course, and clear it where the course is no longer complete. "
+        "Run rebuild_progress_counters first if the counters may be stale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Only backfill the given course id (can be repeated).",
+        )
+        parser.add_argument(
+            "--date",
+            help=(
+                "Completion date (YYYY-MM-DD) to stamp on historic records. "
+                "Defaults to now, since the original completion time is unknown."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        when = None
+        if options["date"]:
+            try:
+                day = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date must use the YYYY-MM-DD format.")
+            when = timezone.make_aware(datetime.combine(day, time.min))
+
+        progresses = CourseProgress.objects.all()
+        if options["course_ids"]:
+            progresses = progresses.filter(course_id__in=options["course_ids"])
+
+        stamped, cleared = stamp_completions(progresses, when=when)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stamped {stamped} completed and cleared {cleared} incomplete "
+                "progress records."
+            )
+        )
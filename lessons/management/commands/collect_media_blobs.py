@@ -0,0 +1,64 @@
+import glob
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from lessons.storage import (
+    BLOB_PREFIX,
+    blob_reference_counts,
+    content_addressed_storage,
+    iter_blobs,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the content-addressed media blobs (and their resized variants) "
+        "that no File, Image or Course references anymore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help=(
+                "Keep unreferenced blobs younger than this, their row may not be "
+                "committed yet."
+            ),
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options["grace_hours"] * 3600
+        references = blob_reference_counts()
+        storage = content_addressed_storage
+
+        kept = deleted = freed = 0
+        for name, path in iter_blobs(storage):
+            if references.get(name) or os.path.getmtime(path) > cutoff:
+                kept += 1
+                continue
+            digest = os.path.splitext(os.path.basename(path))[0]
+            variants = glob.glob(
+                os.path.join(os.path.dirname(path), "variants", f"{digest}.*")
+            )
+            for target in [path, *variants]:
+                freed += os.path.getsize(target)
+                if not options["dry_run"]:
+                    os.remove(target)
+            deleted += 1
+
+        temp_dir = storage.path(f"{BLOB_PREFIX}tmp")
+        for path in glob.glob(os.path.join(temp_dir, "*")):
+            # Leftovers of interrupted uploads.
+            if os.path.getmtime(path) < cutoff and not options["dry_run"]:
+                os.remove(path)
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {deleted} unreferenced blobs ({freed} bytes), kept {kept}."
+            )
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from lessons.progress_buffer import progress_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply every pending completion stored by the progress write-behind "
+        "buffer. Schedule it to drain events left behind by idle workers, or "
+        "after disabling PROGRESS_WRITE_BEHIND."
+    )
+
+    def handle(self, *args, **options):
+        flushed = progress_buffer.flush()
+        self.stdout.write(self.style.SUCCESS(f"Applied {flushed} pending events."))
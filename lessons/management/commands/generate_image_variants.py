@@ -0,0 +1,54 @@
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lessons.image_variants import (
+    get_executor,
+    needs_variants,
+    render_variants,
+    store_variants,
+    variant_widths,
+)
+from lessons.models import Course, Image
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized variants of Image contents and course images that "
+        "have none yet (or whose file changed), using the process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate existing variants too."
+        )
+
+    def handle(self, *args, **options):
+        futures = {}
+        for model, field_name in ((Image, "file"), (Course, "image")):
+            for instance in model.objects.exclude(**{field_name: ""}).iterator():
+                if options["force"] or needs_variants(instance, field_name):
+                    field = getattr(instance, field_name)
+                    future = get_executor().submit(
+                        render_variants,
+                        field.path,
+                        settings.MEDIA_ROOT,
+                        variant_widths(),
+                    )
+                    futures[future] = (model, instance.pk, field_name, field.name)
+
+        generated = failed = 0
+        for future in as_completed(futures):
+            model, pk, field_name, name = futures[future]
+            try:
+                store_variants(model, pk, field_name, name, future.result())
+                generated += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{name}: {exc}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated variants of {generated} images, {failed} failed."
+            )
+        )
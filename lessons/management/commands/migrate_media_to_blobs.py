@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lessons.cache_versions import bump_course_structure
+from lessons.catalog_cache import bump_catalog_version
+from lessons.content_registry import content_types
+from lessons.models import Content, Course, File, Image
+from lessons.storage import BLOB_PREFIX, content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the File, Image and Course uploads stored before content addressing "
+        "into the deduplicated blob store. The original files are kept unless "
+        "--delete-originals is given. Run generate_image_variants afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delete-originals", action="store_true")
+
+    def handle(self, *args, **options):
+        storage = content_addressed_storage
+        moved = missing = 0
+        rewritten = {File: [], Image: [], Course: []}
+        for model, field_name in ((File, "file"), (Image, "file"), (Course, "image")):
+            rows = (
+                model.objects.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__startswith": BLOB_PREFIX})
+                .values_list("pk", field_name)
+            )
+            for pk, name in rows.iterator():
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"Missing file: {name}")
+                    continue
+                with storage.open(name) as original:
+                    blob = storage.save(name, original)
+                # update() skips the signals, the caches are invalidated below.
+                changes = {field_name: blob}
+                if model is not Course:
+                    changes["updated"] = timezone.now()
+                if model.objects.filter(pk=pk, **{field_name: name}).update(**changes):
+                    rewritten[model].append(pk)
+                if options["delete_originals"]:
+                    storage.delete(name)
+                moved += 1
+        self.invalidate_caches(rewritten)
+        self.stdout.write(
+            self.style.SUCCESS(f"Moved {moved} files into blobs, {missing} missing.")
+        )
+
+    def invalidate_caches(self, rewritten):
+        """
+        Invalidate the payloads and documents that embed the old URLs: item
+        payloads follow "updated", the outlines, dashboards and catalog pages
+        follow the version stamps of the courses.
+        """
+        course_ids = set(rewritten[Course])
+        for model in (File, Image):
+            content_type = content_types.get(content_types.name_for_model(model))
+            course_ids.update(
+                Content.objects.filter(
+                    content_type=content_type, object_id__in=rewritten[model]
+                ).values_list("module__course_id", flat=True)
+            )
+        bump_course_structure(course_ids)
+        if rewritten[Course]:
+            bump_catalog_version()
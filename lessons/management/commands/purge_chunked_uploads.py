@@ -0,0 +1,28 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lessons.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete chunked uploads, and their temp files, that were not completed "
+        "and received no bytes for the given number of hours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        stale = ChunkedUpload.objects.filter(completed=None, updated__lt=cutoff)
+        purged = 0
+        for upload in stale.iterator():
+            if os.path.exists(upload.temp_path):
+                os.remove(upload.temp_path)
+            upload.delete()
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} stale uploads."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lessons.bitmap import bitmap_enabled, rebuild_progress_bitmaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Assign missing content ordinals and build the completed content bitmaps "
+        "of course progress records from the completed_contents rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Only rebuild the given course id (can be repeated).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--drop-rows",
+            action="store_true",
+            help=(
+                "Delete the completed_contents rows once the bitmaps are built. "
+                "Requires PROGRESS_CONTENT_BITMAP."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["drop_rows"] and not bitmap_enabled():
+            raise CommandError(
+                "Enable PROGRESS_CONTENT_BITMAP before dropping the "
+                "completed_contents rows."
+            )
+        updated = rebuild_progress_bitmaps(
+            course_ids=options["course_ids"],
+            batch_size=options["batch_size"],
+            drop_rows=options["drop_rows"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt bitmaps for {updated} progress records.")
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lessons.models import CourseProgress, stamp_completions
+from lessons.progress_counters import rebuild_progress_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized progress counters of modules and course progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Only rebuild the given course id (can be repeated).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = rebuild_progress_counters(
+            course_ids=options["course_ids"], batch_size=options["batch_size"]
+        )
+        progresses = CourseProgress.objects.all()
+        if options["course_ids"]:
+            progresses = progresses.filter(course_id__in=options["course_ids"])
+        stamp_completions(progresses)
+        # bulk_update skips auto_now; let the snapshot refresh pick the rows up.
+        progresses.update(updated=timezone.now())
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt counters for {updated} progress records.")
+        )
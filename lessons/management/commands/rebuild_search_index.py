@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from lessons.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search documents of every course, module and Text content, "
+        "e.g. after loading data without signals."
+    )
+
+    def handle(self, *args, **options):
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from lessons.progress_snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the materialized students progress snapshots with the progress "
+        "and enrollment changes since the previous run. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the snapshots of every course instead of the changes only.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        run = refresh_snapshots(full=options["full"], batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {run.refreshed} and deleted {run.deleted} snapshots "
+                f"in {(run.finished - run.started).total_seconds():.1f}s."
+            )
+        )
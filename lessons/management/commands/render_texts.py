@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from lessons.models import Text
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the sanitized and compressed HTML of Text contents again, e.g. for "
+        "texts created before it existed or once their images have variants."
+    )
+
+    def handle(self, *args, **options):
+        rendered = 0
+        for text in Text.objects.iterator():
+            previous = text.rendered
+            text.render()
+            if text.rendered != previous or not text.rendered_gzip:
+                text.save(update_fields=[*Text.RENDERED_FIELDS, "updated"])
+                rendered += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} texts."))
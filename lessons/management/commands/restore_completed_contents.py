@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from lessons.bitmap import restore_completed_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the completed_contents rows of course progress records back from "
+        "their bitmaps when leaving the PROGRESS_CONTENT_BITMAP storage mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Only restore the given course id (can be repeated).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated = restore_completed_rows(
+            course_ids=options["course_ids"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Restored rows for {updated} progress records.")
+        )
@@ -0,0 +1,313 @@
+import glob
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .content_registry import content_types
+from .models import Content, Course
+from .storage import BLOB_PREFIX
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Only served without a check: the CKEditor uploads, saved at the root of
+# MEDIA_ROOT, and the course images of before content addressing. Any other file
+# is served to the people who can see a row referencing it, see can_access().
+PUBLIC_PREFIXES = ("courses/",)
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+VARIANT_NAME = re.compile(
+    r"^(?:(?P<directory>.*)/)?variants/(?P<stem>[^/]+)\.\d+\.\w+$"
+)
+
+
+MEDIA_TOKEN_SALT = "lessons.media"
+
+
+def media_token_max_age():
+    return getattr(settings, "MEDIA_TOKEN_MAX_AGE", 3600)
+
+
+def media_token(user, name):
+    """Signed token letting ``user`` download the media file ``name`` for a while."""
+    return signing.dumps({"user": user.pk, "name": name}, salt=MEDIA_TOKEN_SALT)
+
+
+def _user(request, name):
+    """
+    The session user, the user of a ``Token`` given in the Authorization header,
+    or the user of a ``media_token`` of ``name`` given in the ``token`` query
+    parameter (``<video>`` and ``<img>`` tags cannot send headers). The account
+    token is never accepted in the query string, which ends up in logs.
+    """
+    if request.user.is_authenticated:
+        return request.user
+    header = request.headers.get("Authorization", "").split()
+    if len(header) == 2 and header[0].lower() == "token":
+        token = Token.objects.select_related("user").filter(key=header[1]).first()
+        return token.user if token else None
+    key = request.GET.get("token")
+    if not key:
+        return None
+    try:
+        payload = signing.loads(
+            key, salt=MEDIA_TOKEN_SALT, max_age=media_token_max_age()
+        )
+    except signing.BadSignature:  # Also when expired
+        return None
+    if payload.get("name") != name:
+        return None
+    return User.objects.filter(pk=payload.get("user"), is_active=True).first()
+
+
+def _media_name(path):
+    """The normalized name of a media path, ``None`` if it leaves MEDIA_ROOT."""
+    name = posixpath.normpath(path).lstrip("/")
+    if name.startswith(("../", f"{BLOB_PREFIX}tmp/")) or name in (".", ".."):
+        return None
+    return name
+
+
+def is_public(name):
+    return "/" not in name or name.startswith(PUBLIC_PREFIXES)
+
+
+def _source_names(name):
+    """``name``, or the names of the images on disk whose variant it is."""
+    match = VARIANT_NAME.match(name)
+    if not match:
+        return [name]
+    prefix = f"{match['directory']}/" if match["directory"] else ""
+    pattern = glob.escape(default_storage.path(prefix + match["stem"]))
+    return [prefix + os.path.basename(path) for path in glob.glob(f"{pattern}.*")]
+
+
+def can_access(user, name):
+    """
+    Whether ``user`` (``None`` when anonymous) may download the media file
+    ``name``: anyone for a public file or a course image, otherwise the owner of
+    a File or Image using it, the owner of a course using it or an enrolled
+    student. Files no row references (temp files, chunked uploads, collected
+    blobs) are refused.
+
+    Blobs are shared between rows, access to any of them is enough. The rows
+    are looked up by exact (indexed) name.
+    """
+    if is_public(name):
+        return True
+    names = _source_names(name)
+    if not names:
+        return False
+    if any(is_public(source) for source in names):  # Variant of a CKEditor upload
+        return True
+    if Course.objects.filter(image__in=names).exists():
+        return True
+
+    items = {}
+    for content_name in ("file", "image"):
+        model = content_types.model(content_name)
+        rows = list(model.objects.filter(file__in=names).values_list("id", "owner_id"))
+        if rows:
+            items[content_types.get(content_name).id] = rows
+    if not items or user is None:
+        return False
+    if any(owner_id == user.id for rows in items.values() for _, owner_id in rows):
+        return True
+
+    used_by = Q()
+    for content_type_id, rows in items.items():
+        used_by |= Q(
+            content_type_id=content_type_id, object_id__in=[pk for pk, _ in rows]
+        )
+    return (
+        Content.objects.filter(used_by)
+        .filter(Q(module__course__owner=user) | Q(module__course__students=user))
+        .exists()
+    )
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` of a single byte range, ``None`` to send the whole file
+    (no header, several ranges or an unknown unit) or ``False`` if unsatisfiable.
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix or not size:
+            return False
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _etag(name, stat):
+    if name.startswith(BLOB_PREFIX):
+        # The file name is (or starts with) the SHA-256 of its content.
+        return '"%s"' % os.path.splitext(posixpath.basename(name))[0]
+    return '"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+
+
+def _stream(path, start, length):
+    with open(path, "rb") as source:
+        source.seek(start)
+        while length > 0:
+            block = source.read(min(STREAM_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _offload(name, path, content_type):
+    """Hand the file to the front server, which deals with Range and caching."""
+    backend = getattr(settings, "MEDIA_SENDFILE", None)
+    response = HttpResponse(content_type=content_type)
+    if backend == "x-accel-redirect":
+        prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = quote(prefix + name)
+    elif backend == "x-sendfile":
+        response["X-Sendfile"] = path
+    else:
+        return None
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file of MEDIA_ROOT to the users allowed to see it (see ``can_access``).
+
+    With ``MEDIA_SENDFILE = "x-accel-redirect"`` (nginx, the internal location
+    being MEDIA_ACCEL_REDIRECT_PREFIX) or ``"x-sendfile"`` (Apache, lighttpd)
+    only the authorization happens here. Otherwise the file is streamed with
+    an ETag and Last-Modified, ``If-None-Match``/``If-Modified-Since`` answer
+    304 and a single ``Range`` answers 206, so that players can seek and
+    downloads can resume.
+    """
+    name = _media_name(path)
+    if name is None:
+        raise Http404
+    try:
+        full_path = default_storage.path(name)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(full_path) or not can_access(_user(request, name), name):
+        # Same answer whether the file exists or not.
+        raise Http404
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    response = _offload(name, full_path, content_type)
+    if response is not None:
+        return response
+
+    etag = _etag(name, stat)
+    cache_control = "public" if is_public(name) else "private"
+    if name.startswith(BLOB_PREFIX):
+        cache_control += ", max-age=31536000, immutable"
+    else:
+        cache_control += ", no-cache"
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        not_modified = "*" in tags or etag in tags
+    else:
+        not_modified = not was_modified_since(
+            request.headers.get("If-Modified-Since"), stat.st_mtime
+        )
+    if not_modified:
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if if_range is None or if_range in (etag, headers["Last-Modified"]):
+        byte_range = parse_range(request.headers.get("Range", ""), stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+    elif byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _stream(full_path, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        # FileResponse uses the server's wsgi.file_wrapper (sendfile) if any.
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def media_url(request):
+    """
+    A signed URL of the media file ``?path=`` for ``<video>``/``<img>`` tags,
+    valid MEDIA_TOKEN_MAX_AGE seconds and only for that file and user.
+    """
+    name = _media_name(request.GET.get("path", "").removeprefix(settings.MEDIA_URL))
+    if (
+        name is None
+        or not default_storage.exists(name)
+        or not can_access(request.user, name)
+    ):
+        return Response(
+            {"error": "Arquivo não encontrado."}, status=status.HTTP_404_NOT_FOUND
+        )
+    token = media_token(request.user, name)
+    return Response(
+        {
+            "url": request.build_absolute_uri(
+                f"{settings.MEDIA_URL}{quote(name)}?token={token}"
+            ),
+            "expires_in": media_token_max_age(),
+        }
+    )
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+def rebuild_counters(apps, schema_editor):
+    from lessons.progress_counters import rebuild_progress_counters
+
+    rebuild_progress_counters(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0004_courseprogress_date_completed_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="courseprogress",
+            name="completed_contents_by_module",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="courseprogress",
+            name="completed_contents_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="courseprogress",
+            name="completed_modules_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="courseprogress",
+            name="total_contents",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="courseprogress",
+            name="total_modules",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="module",
+            name="contents_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(rebuild_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+def assign_ordinals(apps, schema_editor):
+    from lessons.bitmap import assign_content_ordinals
+
+    assign_content_ordinals(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0005_progress_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="ordinal",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="content_ordinals",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="courseprogress",
+            name="completed_bitmap",
+            field=models.BinaryField(blank=True, default=b""),
+        ),
+        migrations.RunPython(assign_ordinals, migrations.RunPython.noop),
+    ]
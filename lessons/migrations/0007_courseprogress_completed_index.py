@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0006_content_ordinals_and_progress_bitmap"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="courseprogress",
+            index=models.Index(
+                fields=["course", "date_completed"],
+                name="progress_course_completed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0007_courseprogress_completed_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgressSnapshotRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started", models.DateTimeField()),
+                ("high_water", models.DateTimeField()),
+                ("full", models.BooleanField(default=False)),
+                ("refreshed", models.PositiveIntegerField(default=0)),
+                ("deleted", models.PositiveIntegerField(default=0)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "get_latest_by": "started",
+            },
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="enrollment_updated",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="courseprogress",
+            name="updated",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name="CourseProgressSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("progress_percentage", models.FloatField(default=0)),
+                ("completed_modules", models.PositiveIntegerField(default=0)),
+                ("total_modules", models.PositiveIntegerField(default=0)),
+                ("completed_contents", models.PositiveIntegerField(default=0)),
+                ("total_contents", models.PositiveIntegerField(default=0)),
+                ("is_active", models.BooleanField(default=False)),
+                ("date_completed", models.DateTimeField(blank=True, null=True)),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_snapshots",
+                        to="lessons.course",
+                    ),
+                ),
+                (
+                    "last_accessed_module",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="lessons.module",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_snapshots",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("course", "student"), name="unique_progress_snapshot"
+                    )
+                ],
+            },
+        ),
+    ]
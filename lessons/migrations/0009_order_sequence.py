@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0008_progress_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100)),
+                ("key", models.CharField(max_length=200)),
+                ("next_value", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("model", "key"), name="unique_order_sequence"
+                    )
+                ],
+            },
+        ),
+    ]
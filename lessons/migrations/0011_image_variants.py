@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0010_chunked_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
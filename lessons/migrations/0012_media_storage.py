@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import lessons.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0011_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="course",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                storage=lessons.storage.media_storage,
+                upload_to="courses/%Y/%m/%d",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="file",
+            name="file",
+            field=models.FileField(
+                storage=lessons.storage.media_storage, upload_to="files"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="image",
+            name="file",
+            field=models.FileField(
+                storage=lessons.storage.media_storage, upload_to="images"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0012_media_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="text",
+            name="rendered",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="text",
+            name="rendered_brotli",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="text",
+            name="rendered_gzip",
+            field=models.BinaryField(blank=True),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def install_index(apps, schema_editor):
+    from lessons.search import get_backend
+
+    table = apps.get_model("lessons", "SearchDocument")._meta.db_table
+    get_backend(schema_editor.connection.vendor).install(schema_editor, table)
+
+
+def uninstall_index(apps, schema_editor):
+    from lessons.search import get_backend
+
+    table = apps.get_model("lessons", "SearchDocument")._meta.db_table
+    get_backend(schema_editor.connection.vendor).uninstall(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0013_text_rendered"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("course", "Course"),
+                            ("module", "Module"),
+                            ("content", "Content"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("title", models.CharField(max_length=250)),
+                ("body", models.TextField(blank=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="lessons.course",
+                    ),
+                ),
+                (
+                    "module",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="lessons.module",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"), name="unique_search_document"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(install_index, uninstall_index),
+    ]
@@ -1,8 +1,17 @@
-from django.db import models
+import os
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from .bitmap import ContentBitmap, bitmap_enabled
 from .fields import OrderField
+from .storage import media_storage
 
 # Core models for subjects, courses, modules, and content.
 
@@ -30,11 +39,19 @@ class Course(models.Model):
         Subject, related_name="courses", on_delete=models.CASCADE
     )
     title = models.CharField(max_length=200)
-    image = models.ImageField(upload_to="courses/%Y/%m/%d", blank=True)
+    image = models.ImageField(
+        upload_to="courses/%Y/%m/%d", blank=True, storage=media_storage, db_index=True
+    )
     slug = models.SlugField(max_length=200, unique=True)
     overview = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
     students = models.ManyToManyField(User, related_name="courses_joined", blank=True)
+    # Number of content ordinals handed out so far, see Content.ordinal.
+    content_ordinals = models.PositiveIntegerField(default=0, editable=False)
+    # Last change of the enrolled students, read by the progress snapshot refresh.
+    enrollment_updated = models.DateTimeField(null=True, blank=True, editable=False)
+    # Resized copies of "image", see lessons.image_variants.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["-created"]
@@ -45,40 +62,89 @@ class Course(models.Model):
     def get_students_progress(self):
         """
         Get progress of all students enrolled in the course.
+
+        Reads CourseProgressSnapshot instead of the live tables when
+        settings.STUDENTS_PROGRESS_FROM_SNAPSHOT is enabled.
+        """
+        from .progress_buffer import progress_buffer
+        from .progress_report import build_students_progress
+        from .progress_snapshots import snapshot_students_progress, snapshots_enabled
+
+        if snapshots_enabled():
+            return snapshot_students_progress(self)
+        progress_buffer.flush_course(self.id)
+        return build_students_progress(self)
+
+    def get_completion_matrix(self):
+        """
+        Build the students x modules matrix of content completion percentages.
+
+        Returns ``(students, modules, matrix)`` where ``students`` and ``modules``
+        are lists of ``(id, label)`` tuples for the rows and columns and ``matrix``
+        is a dense ``uint8`` NumPy array of percentages (0-100). The completion
+        pairs come from a single grouped query on the completed_contents table,
+        or from the per-module counters in bitmap storage mode.
         """
-        progress_list = []
-        for student in self.students.all():
-            progress = CourseProgress.objects.filter(
-                student=student, course=self
-            ).first()
-            if progress:
-                student_progress = {
-                    "student_id": student.id,
-                    "student": student.username,
-                    "progress_percentage": progress.get_progress_percentage(),
-                    "completed_modules": progress.completed_modules.count(),
-                    "total_modules": self.modules.count(),
-                    "completed_contents": progress.completed_contents.count(),
-                    "total_contents": sum(
-                        module.contents.count() for module in self.modules.all()
-                    ),
-                }
-            else:
-                student_progress = {
-                    "student_id": student.id,
-                    "student": student.username,
-                    "progress_percentage": 0,
-                    "completed_modules": 0,
-                    "total_modules": self.modules.count(),
-                    "completed_contents": 0,
-                    "total_contents": sum(
-                        module.contents.count() for module in self.modules.all()
-                    ),
-                }
-
-            progress_list.append(student_progress)
-
-        return progress_list
+        from .bitmap import require_numpy
+
+        np = require_numpy()
+        students = list(self.students.order_by("id").values_list("id", "username"))
+        modules = list(self.modules.values_list("id", "title", "contents_count"))
+
+        if bitmap_enabled():
+            completions = [
+                (student_id, int(module_id), total)
+                for student_id, by_module in CourseProgress.objects.filter(
+                    course=self
+                ).values_list("student_id", "completed_contents_by_module")
+                for module_id, total in by_module.items()
+            ]
+        else:
+            completions = (
+                CourseProgress.completed_contents.through.objects.filter(
+                    courseprogress__course=self, content__module__course=self
+                )
+                .values("courseprogress__student_id", "content__module_id")
+                .annotate(total=Count("content_id", distinct=True))
+                .values_list(
+                    "courseprogress__student_id", "content__module_id", "total"
+                )
+            )
+        pairs = np.array(list(completions), dtype=np.int64).reshape(-1, 3)
+
+        matrix = np.zeros((len(students), len(modules)), dtype=np.uint8)
+        if len(pairs) and students and modules:
+            student_ids = np.array([pk for pk, _ in students], dtype=np.int64)
+            module_ids = np.array([pk for pk, _, _ in modules], dtype=np.int64)
+            contents_count = np.array([n for _, _, n in modules], dtype=np.int64)
+            module_order = np.argsort(module_ids)
+
+            rows = np.searchsorted(student_ids, pairs[:, 0])
+            rows = np.minimum(rows, len(student_ids) - 1)
+            sorted_cols = np.searchsorted(module_ids[module_order], pairs[:, 1])
+            sorted_cols = np.minimum(sorted_cols, len(module_ids) - 1)
+            cols = module_order[sorted_cols]
+            # Drop completions of students who are no longer enrolled.
+            keep = student_ids[rows] == pairs[:, 0]
+            keep &= module_ids[cols] == pairs[:, 1]
+            rows, cols, totals = rows[keep], cols[keep], pairs[keep, 2]
+
+            percentages = np.minimum(
+                totals * 100 // np.maximum(contents_count[cols], 1), 100
+            )
+            matrix[rows, cols] = percentages
+
+        return students, [(pk, title) for pk, title, _ in modules], matrix
+
+    def get_completions_per_day(self):
+        """Number of students who completed the course, per completion day."""
+        return (
+            self.progress.filter(date_completed__isnull=False)
+            .annotate(day=TruncDate("date_completed"))
+            .values("day")
+            .annotate(completed=Count("id"))
+            .order_by("day")
+        )
 
 
 class Module(models.Model):
@@ -87,7 +153,9 @@ class Module(models.Model):
     course = models.ForeignKey(Course, related_name="modules", on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    order = OrderField(blank=True, for_fields=["course"])
+    order = OrderField(blank=True, for_fields=["course"], sequence=True)
+    # Maintained by lessons.signals, rebuilt by "rebuild_progress_counters".
+    contents_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["order"]
@@ -96,6 +164,16 @@ class Module(models.Model):
         return f"{self.order}. {self.title}"
 
 
+class ContentQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Load the content items in bulk: the generic ``item`` is prefetched with one
+        ``IN`` query per content type (Text, Video, Image, File, Live) instead of
+        one query per row, and ``content_type`` is joined.
+        """
+        return self.select_related("content_type").prefetch_related("item")
+
+
 class Content(models.Model):
     """Generic content model for different types of course contents (text, video, image, file)."""
 
@@ -109,11 +187,71 @@ class Content(models.Model):
     )
     object_id = models.PositiveIntegerField()
     item = GenericForeignKey("content_type", "object_id")
-    order = OrderField(blank=True, for_fields=["module"])
+    order = OrderField(blank=True, for_fields=["module"], sequence=True)
+    # Stable position of the content within its course, never reused. Indexes
+    # the bits of CourseProgress.completed_bitmap.
+    ordinal = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    objects = ContentQuerySet.as_manager()
 
     class Meta:
         ordering = ["order"]
 
+    def save(self, *args, **kwargs):
+        if self.ordinal is None and self.module_id:
+            self.ordinal = Content.allocate_ordinals(self.module_id)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def allocate_ordinals(module_id, count=1):
+        """Reserve ``count`` consecutive ordinals in the module's course, return the first."""
+        with transaction.atomic():
+            courses = Course.objects.filter(modules=module_id)
+            courses.update(content_ordinals=F("content_ordinals") + count)
+            return courses.values_list("content_ordinals", flat=True).get() - count
+
+
+class OrderSequence(models.Model):
+    """Next free order of an OrderField in sequence mode, one row per parent."""
+
+    model = models.CharField(max_length=100)
+    key = models.CharField(max_length=200)
+    next_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model", "key"], name="unique_order_sequence"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.model} [{self.key}]: {self.next_value}"
+
+    @classmethod
+    def allocate(cls, model, key, count, first_free):
+        """
+        Reserve ``count`` values of a sequence and return the first one.
+
+        The counter row is incremented with an F() expression, which locks it
+        until the transaction ends. A missing row is created from
+        ``first_free()``, the next order after the existing rows.
+        """
+        sequence = cls.objects.filter(model=model, key=key)
+        with transaction.atomic():
+            if not sequence.update(next_value=F("next_value") + count):
+                try:
+                    with transaction.atomic():
+                        first = first_free()
+                        cls.objects.create(
+                            model=model, key=key, next_value=first + count
+                        )
+                        return first
+                except IntegrityError:
+                    # Created concurrently, increment that row instead.
+                    sequence.update(next_value=F("next_value") + count)
+            return sequence.values_list("next_value", flat=True).get() - count
+
 
 class ItemBase(models.Model):
     """Abstract model for different types of content items like text, video, image, and file."""
@@ -135,14 +273,36 @@ class ItemBase(models.Model):
 # Concrete content types inheriting from ItemBase.
 class Text(ItemBase):
     content = models.TextField()
+    # Sanitized HTML of "content" and its compressed bodies, see lessons.text_render.
+    rendered = models.TextField(blank=True, editable=False)
+    rendered_gzip = models.BinaryField(blank=True, editable=False)
+    rendered_brotli = models.BinaryField(null=True, blank=True, editable=False)
+
+    RENDERED_FIELDS = ("rendered", "rendered_gzip", "rendered_brotli")
+
+    def render(self):
+        from .text_render import compress, sanitize_html
+
+        self.rendered = sanitize_html(self.content)
+        self.rendered_gzip, self.rendered_brotli = compress(self.rendered)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            self.render()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *self.RENDERED_FIELDS}
+        super().save(*args, **kwargs)
 
 
 class File(ItemBase):
-    file = models.FileField(upload_to="files")
+    file = models.FileField(upload_to="files", storage=media_storage, db_index=True)
 
 
 class Image(ItemBase):
-    file = models.FileField(upload_to="images")
+    file = models.FileField(upload_to="images", storage=media_storage, db_index=True)
+    # Resized copies of "file", see lessons.image_variants.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
 
 class Video(ItemBase):
@@ -178,25 +338,366 @@ class CourseProgress(models.Model):
     )  # Automatically set when the progress is created
     date_completed = models.DateTimeField(
         null=True, blank=True
-    )  # Set when the course is completed
+    )  # Set when the course is completed, see update_completion()
+
+    # Denormalized counters, maintained by lessons.signals and rebuilt in bulk
+    # by the "rebuild_progress_counters" management command.
+    completed_modules_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_contents_count = models.PositiveIntegerField(default=0, editable=False)
+    total_modules = models.PositiveIntegerField(default=0, editable=False)
+    total_contents = models.PositiveIntegerField(default=0, editable=False)
+    # Completed contents per module, keyed by the module id as a string.
+    completed_contents_by_module = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
+    # Completed contents as a bitset over Content.ordinal, which replaces the
+    # completed_contents rows when settings.PROGRESS_CONTENT_BITMAP is enabled
+    # (see lessons.bitmap). Read and write them through get_completed_contents,
+    # complete_contents and uncomplete_contents.
+    completed_bitmap = models.BinaryField(default=b"", blank=True, editable=False)
+    # Last change of the record, the high-water mark of the snapshot refresh.
+    # Queryset .update() calls on progress rows must set it explicitly.
+    updated = models.DateTimeField(auto_now=True, db_index=True)
 
-    # Your existing methods...
+    class Meta:
+        indexes = [
+            # Covers "completed learners per course per day" without table reads.
+            models.Index(
+                fields=["course", "date_completed"],
+                name="progress_course_completed_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.course_id:
+            self.total_modules = Module.objects.filter(course_id=self.course_id).count()
+            self.total_contents = Content.objects.filter(
+                module__course_id=self.course_id
+            ).count()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "updated" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "updated"]
+        super().save(*args, **kwargs)
 
     def get_progress_percentage(self):
         """Calculate overall progress as a percentage based on completed modules."""
-        total_modules = self.course.modules.count()
-        if total_modules == 0:
+        self.sync_pending()
+        if self.total_modules == 0:
             return 0
-        completed_modules_count = self.completed_modules.count()
-        return (completed_modules_count / total_modules) * 100
+        return (self.completed_modules_count / self.total_modules) * 100
 
     def get_content_progress_percentage(self, module):
         """Calculate progress within a specific module based on completed content."""
-        total_contents = module.contents.count()
-        if total_contents == 0:
+        self.sync_pending()
+        if module.contents_count == 0:
             return 0
-        completed_content_count = self.completed_contents.filter(module=module).count()
-        return (completed_content_count / total_contents) * 100
+        completed_content_count = self.completed_contents_by_module.get(
+            str(module.id), 0
+        )
+        return (completed_content_count / module.contents_count) * 100
+
+    def sync_pending(self):
+        """Apply stored completions of this student and course (read-your-writes)."""
+        from .progress_buffer import progress_buffer
+
+        if progress_buffer.has_pending(self.student_id, self.course_id):
+            progress_buffer.flush_for(self.student_id, self.course_id)
+            self.refresh_from_db()
+
+    def refresh_counters(self):
+        """Recompute the denormalized counters of this progress from the live tables."""
+        self.total_modules = Module.objects.filter(course_id=self.course_id).count()
+        self.total_contents = Content.objects.filter(
+            module__course_id=self.course_id
+        ).count()
+        self.completed_modules_count = self.completed_modules.count()
+        self.refresh_completed_contents()
+        self.save(
+            update_fields=[
+                "total_modules",
+                "total_contents",
+                "completed_modules_count",
+                *COMPLETED_CONTENTS_FIELDS,
+            ]
+        )
+        self.update_completion()
+
+    def is_complete(self):
+        """A course is complete once all its modules are completed (100% progress)."""
+        return 0 < self.total_modules <= self.completed_modules_count
+
+    def update_completion(self):
+        """Stamp or clear date_completed from the counters. Costs no query if unchanged."""
+        complete = self.is_complete()
+        if complete == (self.date_completed is not None):
+            return
+        self.date_completed = timezone.now() if complete else None
+        self.save(update_fields=["date_completed"])
+
+    def refresh_completed_contents(self):
+        """
+        Recompute the completed contents counters without saving them. In bitmap
+        storage mode, the bits of deleted contents are dropped as well.
+        """
+        completed = self.get_completed_contents()
+        if bitmap_enabled():
+            self.completed_bitmap = bytes(
+                ContentBitmap.from_ordinals(completed.values_list("ordinal", flat=True))
+            )
+        by_module = {
+            str(module_id): total
+            for module_id, total in completed.order_by()
+            .values("module_id")
+            .annotate(total=Count("id"))
+            .values_list("module_id", "total")
+        }
+        self.completed_contents_by_module = by_module
+        self.completed_contents_count = sum(by_module.values())
+
+    def get_completed_bitmap(self):
+        return ContentBitmap(self.completed_bitmap)
+
+    def get_completed_contents(self):
+        """
+        The completed contents, from the completed_contents rows or, in bitmap
+        storage mode (settings.PROGRESS_CONTENT_BITMAP), from the bitmap.
+        """
+        if bitmap_enabled():
+            return Content.objects.filter(
+                module__course_id=self.course_id,
+                ordinal__in=list(self.get_completed_bitmap().ordinals()),
+            ).with_items()
+        return self.completed_contents.all()
+
+    def complete_contents(self, contents):
+        """Mark contents (instances or ids) of the course as completed."""
+        if bitmap_enabled():
+            self._update_bitmap(contents, completed=True)
+        else:
+            self.completed_contents.add(*contents)
+
+    def uncomplete_contents(self, contents):
+        """Mark contents (instances or ids) of the course as not completed."""
+        if bitmap_enabled():
+            self._update_bitmap(contents, completed=False)
+        else:
+            self.completed_contents.remove(*contents)
+
+    def _update_bitmap(self, contents, completed):
+        pks = [getattr(content, "pk", content) for content in contents]
+        targets = Content.objects.filter(
+            module__course_id=self.course_id, pk__in=pks
+        ).values_list("ordinal", "module_id")
+        # Lock the row so concurrent completions don't lose bits.
+        with transaction.atomic():
+            progress = CourseProgress.objects.select_for_update().get(pk=self.pk)
+            bitmap = progress.get_completed_bitmap()
+            by_module = progress.completed_contents_by_module
+            changed = False
+            for ordinal, module_id in targets:
+                if ordinal is None or (ordinal in bitmap) == completed:
+                    continue
+                if completed:
+                    bitmap.set(ordinal)
+                else:
+                    bitmap.clear(ordinal)
+                key = str(module_id)
+                by_module[key] = by_module.get(key, 0) + (1 if completed else -1)
+                if not by_module[key]:
+                    del by_module[key]
+                changed = True
+            if changed:
+                progress.completed_bitmap = bytes(bitmap)
+                progress.completed_contents_by_module = by_module
+                progress.completed_contents_count = sum(by_module.values())
+                progress.save(update_fields=COMPLETED_CONTENTS_FIELDS)
+                progress.update_completion()
+        for field in [*COMPLETED_CONTENTS_FIELDS, "date_completed", "updated"]:
+            setattr(self, field, getattr(progress, field))
 
     def __str__(self):
         return f"{self.student.username}'s progress in {self.course.title}"
+
+
+# Fields of CourseProgress rewritten when its completed contents change.
+COMPLETED_CONTENTS_FIELDS = [
+    "completed_contents_count",
+    "completed_contents_by_module",
+    "completed_bitmap",
+]
+
+
+def stamp_completions(progresses, when=None):
+    """
+    Stamp or clear date_completed of a CourseProgress queryset with two UPDATEs.
+
+    Used when course totals change for every learner at once and to backfill.
+    """
+    complete = Q(total_modules__gt=0, completed_modules_count__gte=F("total_modules"))
+    now = timezone.now()
+    stamped = progresses.filter(complete, date_completed=None).update(
+        date_completed=when or now, updated=now
+    )
+    cleared = (
+        progresses.filter(date_completed__isnull=False)
+        .exclude(complete)
+        .update(date_completed=None, updated=now)
+    )
+    return stamped, cleared
+
+
+class CourseProgressSnapshot(models.Model):
+    """
+    Materialized progress of one enrolled student in one course, read by reports.
+
+    Refreshed incrementally by the "refresh_progress_snapshots" command, see
+    lessons.progress_snapshots.
+    """
+
+    course = models.ForeignKey(
+        Course, related_name="progress_snapshots", on_delete=models.CASCADE
+    )
+    student = models.ForeignKey(
+        User, related_name="progress_snapshots", on_delete=models.CASCADE
+    )
+    progress_percentage = models.FloatField(default=0)
+    completed_modules = models.PositiveIntegerField(default=0)
+    total_modules = models.PositiveIntegerField(default=0)
+    completed_contents = models.PositiveIntegerField(default=0)
+    total_contents = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=False)
+    last_accessed_module = models.ForeignKey(
+        Module, null=True, blank=True, related_name="+", on_delete=models.SET_NULL
+    )
+    date_completed = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "student"], name="unique_progress_snapshot"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of {self.student_id} in course {self.course_id}"
+
+
+class ProgressSnapshotRun(models.Model):
+    """One run of the snapshot refresh; the next run starts from its ``high_water``."""
+
+    started = models.DateTimeField()
+    high_water = models.DateTimeField()
+    full = models.BooleanField(default=False)
+    refreshed = models.PositiveIntegerField(default=0)
+    deleted = models.PositiveIntegerField(default=0)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        get_latest_by = "started"
+
+    def __str__(self):
+        return f"Snapshot refresh at {self.started}"
+
+
+class PendingCompletion(models.Model):
+    """
+    A "mark complete" event acknowledged by the write-behind buffer and not yet
+    applied to CourseProgress, see lessons.progress_buffer.
+
+    Exactly one of ``content`` and ``module`` is set. The unique constraints
+    coalesce repeated events (NULLs never conflict).
+    """
+
+    student = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, related_name="+", on_delete=models.CASCADE)
+    content = models.ForeignKey(
+        Content, null=True, blank=True, related_name="+", on_delete=models.CASCADE
+    )
+    module = models.ForeignKey(
+        Module, null=True, blank=True, related_name="+", on_delete=models.CASCADE
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course", "content"],
+                name="unique_pending_content",
+            ),
+            models.UniqueConstraint(
+                fields=["student", "course", "module"],
+                name="unique_pending_module",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Pending completion of {self.student_id} in course {self.course_id}"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A File or Image upload received in byte ranges, see lessons.chunked_upload.
+
+    The bytes are written to ``temp_path`` under MEDIA_ROOT; ``offset`` counts the
+    bytes received so far, so an interrupted upload resumes from there.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        User, related_name="chunked_uploads", on_delete=models.CASCADE
+    )
+    module = models.ForeignKey(
+        Module, related_name="chunked_uploads", on_delete=models.CASCADE
+    )
+    content_type = models.CharField(max_length=10)
+    title = models.CharField(max_length=250)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    content = models.ForeignKey(
+        Content, null=True, blank=True, related_name="+", on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    completed = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.MEDIA_ROOT, "chunked_uploads", f"{self.id}.part")
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a course, module or Text content, indexed by the full-text
+    engine of the database (see lessons.search). Content documents are keyed by
+    the Content row, so that results can be scoped to a course and a module.
+    """
+
+    COURSE = "course"
+    MODULE = "module"
+    CONTENT = "content"
+    KIND_CHOICES = [(COURSE, "Course"), (MODULE, "Module"), (CONTENT, "Content")]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    course = models.ForeignKey(Course, related_name="+", on_delete=models.CASCADE)
+    module = models.ForeignKey(
+        Module, null=True, blank=True, related_name="+", on_delete=models.CASCADE
+    )
+    title = models.CharField(max_length=250)
+    body = models.TextField(blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="unique_search_document"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
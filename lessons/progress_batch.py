@@ -0,0 +1,195 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .bitmap import bitmap_enabled
+from .models import Content, Course, CourseProgress, Module
+
+MAX_BATCH_SIZE = 1000
+
+CompletedModules = CourseProgress.completed_modules.through
+CompletedContents = CourseProgress.completed_contents.through
+
+
+def apply_completions(progress, content_ids=(), module_ids=()):
+    """
+    Insert completed contents/modules of a progress record with one bulk INSERT
+    per through table, ignoring rows that already exist, then refresh its counters.
+
+    ``bulk_create`` does not send ``m2m_changed``, so the counters are rebuilt here.
+    In bitmap storage mode the contents are set in the progress bitmap instead.
+    """
+    with transaction.atomic():
+        if content_ids and bitmap_enabled():
+            progress.complete_contents(content_ids)
+        elif content_ids:
+            CompletedContents.objects.bulk_create(
+                [
+                    CompletedContents(courseprogress_id=progress.id, content_id=pk)
+                    for pk in content_ids
+                ],
+                ignore_conflicts=True,
+            )
+        if module_ids:
+            CompletedModules.objects.bulk_create(
+                [
+                    CompletedModules(courseprogress_id=progress.id, module_id=pk)
+                    for pk in module_ids
+                ],
+                ignore_conflicts=True,
+            )
+        if content_ids or module_ids:
+            progress.refresh_counters()
+
+
+def _parse_item(item):
+    if not isinstance(item, dict):
+        return None, "Item inválido."
+    try:
+        course_id = int(item["course_id"])
+    except (KeyError, TypeError, ValueError):
+        return None, "course_id é obrigatório."
+    kinds = [kind for kind in ("content_id", "module_id") if item.get(kind) is not None]
+    if len(kinds) != 1:
+        return None, "Informe exatamente um de content_id ou module_id."
+    try:
+        object_id = int(item[kinds[0]])
+    except (TypeError, ValueError):
+        return None, f"{kinds[0]} inválido."
+    return (course_id, kinds[0], object_id), None
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def mark_progress_batch(request):
+    """
+    Marks many contents and/or modules as completed by the student in one request.
+
+    Expects ``{"items": [{"course_id": 1, "content_id": 2}, {"course_id": 1,
+    "module_id": 3}, ...]}`` and answers with one result per item, in order.
+    """
+    items = request.data.get("items")
+    if not isinstance(items, list) or not items:
+        return Response(
+            {"error": "Envie uma lista de itens não vazia em 'items'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > MAX_BATCH_SIZE:
+        return Response(
+            {"error": f"No máximo {MAX_BATCH_SIZE} itens por requisição."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    student = request.user
+    parsed = [_parse_item(item) for item in items]
+    course_ids = {entry[0] for entry, error in parsed if entry}
+
+    # Existence and enrollment of every course with a single query.
+    enrollment = dict(
+        Course.objects.filter(id__in=course_ids)
+        .annotate(
+            enrolled=Exists(
+                Course.students.through.objects.filter(
+                    course_id=OuterRef("pk"), user_id=student.id
+                )
+            )
+        )
+        .values_list("id", "enrolled")
+    )
+    enrolled_ids = [course_id for course_id, enrolled in enrollment.items() if enrolled]
+
+    content_rows = list(
+        Content.objects.filter(
+            id__in={
+                entry[2] for entry, _ in parsed if entry and entry[1] == "content_id"
+            },
+            module__course_id__in=enrolled_ids,
+        ).values_list("id", "module__course_id", "ordinal")
+    )
+    content_courses = {pk: course_id for pk, course_id, _ in content_rows}
+    module_courses = dict(
+        Module.objects.filter(
+            id__in={
+                entry[2] for entry, _ in parsed if entry and entry[1] == "module_id"
+            },
+            course_id__in=enrolled_ids,
+        ).values_list("id", "course_id")
+    )
+
+    progresses = {}
+    for progress in CourseProgress.objects.filter(
+        student=student, course_id__in=enrolled_ids
+    ).order_by("id"):
+        progresses.setdefault(progress.course_id, progress)
+
+    progress_ids = [progress.id for progress in progresses.values()]
+    if bitmap_enabled():
+        bitmaps = {
+            course_id: progress.get_completed_bitmap()
+            for course_id, progress in progresses.items()
+        }
+        completed_contents = {
+            pk
+            for pk, course_id, ordinal in content_rows
+            if ordinal is not None
+            and course_id in bitmaps
+            and ordinal in bitmaps[course_id]
+        }
+    else:
+        completed_contents = CompletedContents.objects.filter(
+            courseprogress_id__in=progress_ids, content_id__in=content_courses
+        ).values_list("content_id", flat=True)
+    already_done = {("content_id", pk) for pk in completed_contents} | {
+        ("module_id", pk)
+        for pk in CompletedModules.objects.filter(
+            courseprogress_id__in=progress_ids, module_id__in=module_courses
+        ).values_list("module_id", flat=True)
+    }
+
+    results = []
+    pending = {}
+    for item, (entry, error) in zip(items, parsed):
+        fields = item if isinstance(item, dict) else {}
+        result = {
+            key: fields[key]
+            for key in ("course_id", "content_id", "module_id")
+            if fields.get(key) is not None
+        }
+        if entry:
+            course_id, kind, object_id = entry
+            owners = content_courses if kind == "content_id" else module_courses
+            if course_id not in enrollment:
+                error = "Curso não encontrado."
+            elif not enrollment[course_id]:
+                error = "Você não está inscrito neste curso."
+            elif owners.get(object_id) != course_id:
+                error = (
+                    "Conteúdo não encontrado."
+                    if kind == "content_id"
+                    else "Módulo não encontrado."
+                )
+            else:
+                contents, modules = pending.setdefault(course_id, (set(), set()))
+                (contents if kind == "content_id" else modules).add(object_id)
+        if error:
+            result.update({"status": "error", "error": error})
+        elif (kind, object_id) in already_done:
+            result["status"] = "already_completed"
+        else:
+            result["status"] = "completed"
+            # A repetition later in the same request is already completed.
+            already_done.add((kind, object_id))
+        results.append(result)
+
+    for course_id, (contents, modules) in pending.items():
+        progress = progresses.get(course_id)
+        if progress is None:
+            progress, _ = CourseProgress.objects.get_or_create(
+                student=student, course_id=course_id
+            )
+        apply_completions(progress, content_ids=contents, module_ids=modules)
+
+    return Response({"results": results}, status=status.HTTP_200_OK)
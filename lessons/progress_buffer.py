@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def write_behind_enabled():
+    return getattr(settings, "PROGRESS_WRITE_BEHIND", False)
+
+
+class ProgressBuffer:
+    """
+    Write-behind buffer for "mark complete" events.
+
+    Events are acknowledged once stored as PendingCompletion rows, a single
+    INSERT shared by every worker process; repeated events of a (student,
+    course) are coalesced by the table's unique constraints. The rows are
+    applied in batches through ``apply_completions`` and deleted in the same
+    transaction, so an event is never lost nor applied twice, even when the
+    worker that stored it is killed.
+
+    The in-process timer only triggers the flushes: a background thread flushes
+    ``flush_interval`` seconds after this process stored an event, or at once
+    when it stored ``max_pending`` events. Readers call ``flush_for``,
+    ``flush_student`` or ``flush_course`` to see their own writes, whichever
+    worker stored them; ``manage.py flush_progress_buffer`` drains the table.
+    """
+
+    def __init__(self, max_pending=500, flush_interval=2.0):
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._unflushed = 0
+        self._timer = None
+        self._flushing = False
+        self._stats = {
+            "recorded_events": 0,
+            "flushes": 0,
+            "flushed_events": 0,
+            "failed_flushes": 0,
+            "last_flush_at": None,
+            "last_flush_duration": None,
+        }
+
+    def record(self, student_id, course_id, content_ids=(), module_ids=()):
+        """Store completed contents/modules of a student in a course."""
+        self._store(student_id, course_id, content_ids, module_ids)
+        with self._lock:
+            received = len(content_ids) + len(module_ids)
+            self._stats["recorded_events"] += received
+            self._unflushed += received
+            if self._unflushed >= self.max_pending:
+                self._start_flush()
+            else:
+                self._start_timer()
+
+    def _store(self, student_id, course_id, content_ids, module_ids):
+        from .models import PendingCompletion
+
+        PendingCompletion.objects.bulk_create(
+            [
+                PendingCompletion(
+                    student_id=student_id, course_id=course_id, content_id=pk
+                )
+                for pk in content_ids
+            ]
+            + [
+                PendingCompletion(
+                    student_id=student_id, course_id=course_id, module_id=pk
+                )
+                for pk in module_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+    def pending_for(self, student_id, course_id):
+        """Return the unflushed ``(content_ids, module_ids)`` of a student in a course."""
+        from .models import PendingCompletion
+
+        contents, modules = set(), set()
+        for content_id, module_id in PendingCompletion.objects.filter(
+            student_id=student_id, course_id=course_id
+        ).values_list("content_id", "module_id"):
+            if content_id is not None:
+                contents.add(content_id)
+            else:
+                modules.add(module_id)
+        return contents, modules
+
+    def has_pending(self, student_id, course_id=None):
+        """Whether events of the student are stored and not applied yet."""
+        from .models import PendingCompletion
+
+        if not write_behind_enabled():
+            return False
+        filters = {"student_id": student_id}
+        if course_id is not None:
+            filters["course_id"] = course_id
+        return PendingCompletion.objects.filter(**filters).exists()
+
+    def flush_for(self, student_id, course_id):
+        return self._flush_read(student_id=student_id, course_id=course_id)
+
+    def flush_student(self, student_id):
+        return self._flush_read(student_id=student_id)
+
+    def flush_course(self, course_id):
+        return self._flush_read(course_id=course_id)
+
+    def _flush_read(self, **filters):
+        # Nothing is stored while write-behind is off, so readers skip the query.
+        # Leftovers of a disabled buffer are drained by flush_progress_buffer.
+        if not write_behind_enabled():
+            return 0
+        return self.flush(**filters)
+
+    def flush(self, **filters):
+        """
+        Apply the stored events (all, or those matching ``filters``) in batches of
+        ``max_pending`` and delete them. Returns the number of events applied.
+
+        Flushes for a reader wait for the rows another worker is applying; the
+        background flush skips them.
+        """
+        flushed = 0
+        with self._flush_lock:
+            if not filters:
+                with self._lock:
+                    self._unflushed = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    events = self._flush_batch(filters)
+                except Exception:
+                    logger.exception("Failed to flush progress events.")
+                    with self._lock:
+                        self._stats["failed_flushes"] += 1
+                        self._start_timer()
+                    return flushed
+                if not events:
+                    return flushed
+                flushed += events
+                with self._lock:
+                    self._stats["flushes"] += 1
+                    self._stats["flushed_events"] += events
+                    self._stats["last_flush_at"] = time.time()
+                    self._stats["last_flush_duration"] = time.monotonic() - started
+                if events < self.max_pending:
+                    return flushed
+
+    def _flush_batch(self, filters):
+        from .models import PendingCompletion
+
+        with transaction.atomic():
+            rows = list(
+                PendingCompletion.objects.filter(**filters)
+                .select_for_update(skip_locked=not filters)
+                .order_by("id")
+                .values_list(
+                    "id", "student_id", "course_id", "content_id", "module_id"
+                )[: self.max_pending]
+            )
+            if not rows:
+                return 0
+            batch = {}
+            for _, student_id, course_id, content_id, module_id in rows:
+                entry = batch.setdefault(
+                    (student_id, course_id), {"contents": set(), "modules": set()}
+                )
+                if content_id is not None:
+                    entry["contents"].add(content_id)
+                else:
+                    entry["modules"].add(module_id)
+            self._write(batch)
+            PendingCompletion.objects.filter(id__in=[row[0] for row in rows]).delete()
+        return len(rows)
+
+    def _write(self, batch):
+        from .models import CourseProgress
+        from .progress_batch import apply_completions
+
+        for (student_id, course_id), entry in batch.items():
+            progress = (
+                CourseProgress.objects.filter(
+                    student_id=student_id, course_id=course_id
+                )
+                .order_by("id")
+                .first()
+            )
+            if progress is None:
+                progress = CourseProgress.objects.create(
+                    student_id=student_id, course_id=course_id
+                )
+            apply_completions(
+                progress, content_ids=entry["contents"], module_ids=entry["modules"]
+            )
+
+    def _start_timer(self):
+        # Called with self._lock held.
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _start_flush(self):
+        # Called with self._lock held. Enough events are waiting: flush them now,
+        # but off the request thread that stored them.
+        if not self._flushing:
+            self._flushing = True
+            threading.Thread(target=self._flush_in_background, daemon=True).start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread owns its own database connection.
+            connection.close()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._flushing = False
+            connection.close()
+
+    def metrics(self):
+        """
+        Flush counters of this process plus the pending events of every worker
+        and their lag (age of the oldest pending event).
+        """
+        from .models import PendingCompletion
+
+        pending = PendingCompletion.objects.aggregate(
+            events=Count("id"), oldest=Min("created")
+        )
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "pending_keys": PendingCompletion.objects.values("student_id", "course_id")
+            .distinct()
+            .count(),
+            "pending_events": pending["events"],
+            "lag_seconds": (
+                0
+                if pending["oldest"] is None
+                else (timezone.now() - pending["oldest"]).total_seconds()
+            ),
+        }
+
+
+progress_buffer = ProgressBuffer(
+    max_pending=getattr(settings, "PROGRESS_WRITE_BEHIND_MAX_PENDING", 500),
+    flush_interval=getattr(settings, "PROGRESS_WRITE_BEHIND_INTERVAL", 2.0),
+)
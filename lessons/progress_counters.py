@@ -0,0 +1,99 @@
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db.models import Count
+
+from .bitmap import ContentBitmap, bitmap_enabled
+
+
+def rebuild_progress_counters(course_ids=None, apps=global_apps, batch_size=500):
+    """
+    Recompute the denormalized counters of Module and CourseProgress in bulk.
+
+    Works one course at a time with grouped queries and ``bulk_update``, so it
+    can also run from a data migration with the historical ``apps``.
+    Returns the number of CourseProgress rows rewritten.
+    """
+    Course = apps.get_model("lessons", "Course")
+    Module = apps.get_model("lessons", "Module")
+    Content = apps.get_model("lessons", "Content")
+    CourseProgress = apps.get_model("lessons", "CourseProgress")
+    CompletedModules = CourseProgress.completed_modules.through
+    CompletedContents = CourseProgress.completed_contents.through
+
+    # Migrations older than the bitmap field still count the rows.
+    use_bitmap = bitmap_enabled() and any(
+        field.name == "completed_bitmap" for field in CourseProgress._meta.fields
+    )
+
+    courses = Course.objects.order_by("id")
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+
+    updated = 0
+    for course_id in courses.values_list("id", flat=True).iterator():
+        contents_per_module = dict(
+            Content.objects.filter(module__course_id=course_id)
+            .order_by()
+            .values("module_id")
+            .annotate(total=Count("id"))
+            .values_list("module_id", "total")
+        )
+        modules = list(Module.objects.filter(course_id=course_id).only("id"))
+        for module in modules:
+            module.contents_count = contents_per_module.get(module.id, 0)
+        Module.objects.bulk_update(modules, ["contents_count"], batch_size=batch_size)
+
+        completed_modules = dict(
+            CompletedModules.objects.filter(courseprogress__course_id=course_id)
+            .values("courseprogress_id")
+            .annotate(total=Count("id"))
+            .values_list("courseprogress_id", "total")
+        )
+        completed_contents = defaultdict(dict)
+        if use_bitmap:
+            # Count the bits of contents that still exist, per module.
+            content_modules = dict(
+                Content.objects.filter(module__course_id=course_id)
+                .exclude(ordinal=None)
+                .values_list("ordinal", "module_id")
+            )
+            for progress_id, data in CourseProgress.objects.filter(
+                course_id=course_id
+            ).values_list("id", "completed_bitmap"):
+                by_module = completed_contents[progress_id]
+                for ordinal in ContentBitmap(data).ordinals():
+                    if ordinal in content_modules:
+                        key = str(content_modules[ordinal])
+                        by_module[key] = by_module.get(key, 0) + 1
+        else:
+            for progress_id, module_id, total in (
+                CompletedContents.objects.filter(courseprogress__course_id=course_id)
+                .values("courseprogress_id", "content__module_id")
+                .annotate(total=Count("id"))
+                .values_list("courseprogress_id", "content__module_id", "total")
+            ):
+                completed_contents[progress_id][str(module_id)] = total
+
+        progresses = list(CourseProgress.objects.filter(course_id=course_id).only("id"))
+        for progress in progresses:
+            by_module = completed_contents.get(progress.id, {})
+            progress.total_modules = len(modules)
+            progress.total_contents = sum(contents_per_module.values())
+            progress.completed_modules_count = completed_modules.get(progress.id, 0)
+            progress.completed_contents_count = sum(by_module.values())
+            progress.completed_contents_by_module = by_module
+        CourseProgress.objects.bulk_update(
+            progresses,
+            [
+                "total_modules",
+                "total_contents",
+                "completed_modules_count",
+                "completed_contents_count",
+                "completed_contents_by_module",
+            ],
+            batch_size=batch_size,
+        )
+        updated += len(progresses)
+
+    return updated
@@ -0,0 +1,115 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .models import Course
+from .progress_buffer import progress_buffer
+from .progress_report import iter_students_progress
+
+EXPORT_COLUMNS = [
+    "student_id",
+    "student",
+    "progress_percentage",
+    "completed_modules",
+    "total_modules",
+    "completed_contents",
+    "total_contents",
+    "is_active",
+    "date_joined",
+    "date_completed",
+]
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_rows(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row[column] for column in columns])
+
+
+def _ndjson_rows(rows, columns):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode({column: row[column] for column in columns}) + "\n"
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def export_students_progress(request, course_id):
+    """
+    Stream the progress of all students in a course as CSV or NDJSON.
+
+    Query parameters: ``output`` (``csv`` or ``ndjson``; ``format`` is taken by
+    DRF's renderer override), ``columns`` (comma separated subset of
+    EXPORT_COLUMNS) and ``is_active`` (``true``/``false``).
+    """
+    course = get_object_or_404(Course, id=course_id)
+
+    if course.owner_id != request.user.id:
+        return Response(
+            {"error": "Você não tem permissão para acessar esse curso."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    export_format = request.query_params.get("output", "csv").lower()
+    if export_format not in ("csv", "ndjson"):
+        return Response(
+            {"error": "Formato inválido. Use 'csv' ou 'ndjson'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    columns = EXPORT_COLUMNS
+    if request.query_params.get("columns"):
+        columns = [
+            column.strip()
+            for column in request.query_params["columns"].split(",")
+            if column.strip()
+        ]
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown or not columns:
+            return Response(
+                {
+                    "error": f"Colunas inválidas: {', '.join(unknown)}.",
+                    "available_columns": EXPORT_COLUMNS,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    is_active = request.query_params.get("is_active")
+    if is_active is not None:
+        if is_active.lower() not in ("true", "false", "1", "0"):
+            return Response(
+                {"error": "is_active deve ser 'true' ou 'false'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        is_active = is_active.lower() in ("true", "1")
+
+    progress_buffer.flush_course(course.id)
+    rows = iter_students_progress(course, is_active=is_active)
+
+    if export_format == "csv":
+        response = StreamingHttpResponse(
+            _csv_rows(rows, columns), content_type="text/csv; charset=utf-8"
+        )
+        extension = "csv"
+    else:
+        response = StreamingHttpResponse(
+            _ndjson_rows(rows, columns), content_type="application/x-ndjson"
+        )
+        extension = "ndjson"
+    response["Content-Disposition"] = (
+        f'attachment; filename="{course.slug}-progress.{extension}"'
+    )
+    return response
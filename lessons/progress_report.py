@@ -0,0 +1,281 @@
+import base64
+import json
+
+from django.db.models import Count, F, FilteredRelation, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Content, CourseProgress
+
+
+def build_students_progress(course):
+    """
+    Build the students progress report of a course with a fixed number of queries.
+
+    Returns the same payload as the original per-student loop, one dict per
+    enrolled student ordered by student id.
+    """
+    total_modules = course.modules.count()
+    total_contents = Content.objects.filter(module__course=course).count()
+
+    # The original report used ``.first()``, i.e. the oldest progress row of a student.
+    # Completed contents come from the counters, which also hold in bitmap
+    # storage mode where there are no completed_contents rows.
+    progress_ids = {}
+    completed_contents = {}
+    for progress_id, student_id, contents_done in (
+        CourseProgress.objects.filter(course=course)
+        .order_by("id")
+        .values_list("id", "student_id", "completed_contents_count")
+    ):
+        progress_ids.setdefault(student_id, progress_id)
+        completed_contents.setdefault(progress_id, contents_done)
+
+    completed_modules = _count_by_progress(
+        CourseProgress.completed_modules.through, course
+    )
+
+    progress_list = []
+    for student_id, username in course.students.order_by("id").values_list(
+        "id", "username"
+    ):
+        progress_id = progress_ids.get(student_id)
+        modules_done = completed_modules.get(progress_id, 0)
+        progress_list.append(
+            {
+                "student_id": student_id,
+                "student": username,
+                "progress_percentage": (
+                    (modules_done / total_modules) * 100 if total_modules else 0
+                ),
+                "completed_modules": modules_done,
+                "total_modules": total_modules,
+                "completed_contents": completed_contents.get(progress_id, 0),
+                "total_contents": total_contents,
+            }
+        )
+
+    return progress_list
+
+
+def _count_by_progress(through, course):
+    """Count the rows of a CourseProgress M2M through table grouped by progress."""
+    return dict(
+        through.objects.filter(courseprogress__course=course)
+        .values("courseprogress_id")
+        .annotate(total=Count("id"))
+        .values_list("courseprogress_id", "total")
+    )
+
+
+def iter_students_progress(course, is_active=None, chunk_size=1000):
+    """
+    Yield the progress of every enrolled student, reading the denormalized counters.
+
+    Students are walked by id in chunks of ``chunk_size`` (keyset on the id), with
+    one query for the students and one for their progress records per chunk, so
+    memory stays flat whatever the cohort size. ``is_active`` filters on
+    ``CourseProgress.is_active``; students without a progress record count as
+    inactive.
+    """
+    total_modules = course.modules.count()
+    total_contents = Content.objects.filter(module__course=course).count()
+    students = course.students.order_by("id")
+
+    last_id = 0
+    while True:
+        chunk = list(
+            students.filter(id__gt=last_id).values_list("id", "username")[:chunk_size]
+        )
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+
+        progresses = {}
+        for progress in (
+            CourseProgress.objects.filter(
+                course=course, student_id__in=[student_id for student_id, _ in chunk]
+            )
+            .order_by("id")
+            .only(
+                "student_id",
+                "course_id",
+                "is_active",
+                "date_joined",
+                "date_completed",
+                "completed_modules_count",
+                "completed_contents_count",
+                "total_modules",
+                "total_contents",
+            )
+        ):
+            progresses.setdefault(progress.student_id, progress)
+
+        for student_id, username in chunk:
+            progress = progresses.get(student_id)
+            active = bool(progress and progress.is_active)
+            if is_active is not None and active != is_active:
+                continue
+            yield {
+                "student_id": student_id,
+                "student": username,
+                "progress_percentage": (
+                    progress.get_progress_percentage() if progress else 0
+                ),
+                "completed_modules": (
+                    progress.completed_modules_count if progress else 0
+                ),
+                "total_modules": progress.total_modules if progress else total_modules,
+                "completed_contents": (
+                    progress.completed_contents_count if progress else 0
+                ),
+                "total_contents": (
+                    progress.total_contents if progress else total_contents
+                ),
+                "is_active": active,
+                "date_joined": progress.date_joined if progress else None,
+                "date_completed": progress.date_completed if progress else None,
+            }
+
+        if len(chunk) < chunk_size:
+            return
+
+
+PAGE_ORDERINGS = {
+    "student": ("id",),
+    "progress": ("progress_key", "id"),
+    "-progress": ("-progress_key", "-id"),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order, row):
+    key = [row["progress_key"], row["id"]] if "progress" in order else [row["id"]]
+    payload = json.dumps({"order": order, "key": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(order, cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key = [int(value) for value in payload["key"]]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Cursor inválido.")
+    if payload.get("order") != order or len(key) != len(PAGE_ORDERINGS[order]):
+        raise InvalidCursor("O cursor não corresponde à ordenação pedida.")
+    return key
+
+
+def students_progress_page(
+    course,
+    order="student",
+    cursor=None,
+    limit=50,
+    is_active=None,
+    completed=None,
+    username=None,
+):
+    """
+    Return one keyset-paginated page of the students progress report.
+
+    Enrolled students are joined to their progress record in the course and read
+    its denormalized counters, so the database filters, sorts and slices the
+    cohort and only the ``limit`` returned rows are materialized. ``order`` is
+    one of PAGE_ORDERINGS; ordering by progress sorts on completed modules, which
+    is equivalent to the percentage since every learner of a course shares the
+    same module total. Returns ``(rows, next_cursor)``.
+    """
+    # Like the full report, only the oldest progress row of a student counts.
+    first_progress = (
+        CourseProgress.objects.filter(course=course, student=OuterRef("pk"))
+        .order_by("id")
+        .values("id")[:1]
+    )
+    students = (
+        course.students.annotate(
+            course_progress=FilteredRelation(
+                "progress", condition=Q(progress__course=course)
+            )
+        )
+        .filter(
+            Q(course_progress__isnull=True)
+            | Q(course_progress__id=Subquery(first_progress))
+        )
+        .annotate(
+            progress_key=Coalesce("course_progress__completed_modules_count", 0),
+            progress_total_modules=F("course_progress__total_modules"),
+            progress_completed_contents=Coalesce(
+                "course_progress__completed_contents_count", 0
+            ),
+            progress_total_contents=F("course_progress__total_contents"),
+            progress_is_active=Coalesce("course_progress__is_active", False),
+            progress_date_completed=F("course_progress__date_completed"),
+        )
+    )
+
+    if is_active is not None:
+        students = students.filter(progress_is_active=is_active)
+    if completed is not None:
+        students = students.filter(progress_date_completed__isnull=not completed)
+    if username:
+        students = students.filter(username__startswith=username)
+
+    if cursor:
+        key = decode_cursor(order, cursor)
+        if order == "student":
+            students = students.filter(id__gt=key[0])
+        elif order == "progress":
+            students = students.filter(
+                Q(progress_key__gt=key[0]) | Q(progress_key=key[0], id__gt=key[1])
+            )
+        else:
+            students = students.filter(
+                Q(progress_key__lt=key[0]) | Q(progress_key=key[0], id__lt=key[1])
+            )
+
+    page = list(
+        students.order_by(*PAGE_ORDERINGS[order]).values(
+            "id",
+            "username",
+            "progress_key",
+            "progress_total_modules",
+            "progress_completed_contents",
+            "progress_total_contents",
+            "progress_is_active",
+            "progress_date_completed",
+        )[: limit + 1]
+    )
+    next_cursor = encode_cursor(order, page[limit - 1]) if len(page) > limit else None
+    page = page[:limit]
+
+    course_totals = None
+    if any(row["progress_total_modules"] is None for row in page):
+        course_totals = (
+            course.modules.count(),
+            Content.objects.filter(module__course=course).count(),
+        )
+
+    rows = []
+    for row in page:
+        total_modules = row["progress_total_modules"]
+        total_contents = row["progress_total_contents"]
+        if total_modules is None:
+            total_modules, total_contents = course_totals
+        rows.append(
+            {
+                "student_id": row["id"],
+                "student": row["username"],
+                "progress_percentage": (
+                    (row["progress_key"] / total_modules) * 100 if total_modules else 0
+                ),
+                "completed_modules": row["progress_key"],
+                "total_modules": total_modules,
+                "completed_contents": row["progress_completed_contents"],
+                "total_contents": total_contents,
+                "is_active": row["progress_is_active"],
+                "date_completed": row["progress_date_completed"],
+            }
+        )
+    return rows, next_cursor
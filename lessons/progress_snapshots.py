@@ -0,0 +1,225 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import (
+    Course,
+    CourseProgress,
+    CourseProgressSnapshot,
+    Module,
+    ProgressSnapshotRun,
+)
+
+# Progress rows committed late (long transactions) may carry an ``updated`` older
+# than the previous high-water mark; re-reading a short window catches them.
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+SNAPSHOT_FIELDS = [
+    "progress_percentage",
+    "completed_modules",
+    "total_modules",
+    "completed_contents",
+    "total_contents",
+    "is_active",
+    "last_accessed_module",
+    "date_completed",
+    "refreshed_at",
+]
+
+
+def snapshots_enabled():
+    return getattr(settings, "STUDENTS_PROGRESS_FROM_SNAPSHOT", False)
+
+
+def refresh_snapshots(full=False, batch_size=500):
+    """
+    Bring CourseProgressSnapshot up to date and return the ProgressSnapshotRun.
+
+    Incremental runs only upsert the progress records changed since the previous
+    run (``CourseProgress.updated``) and reconcile the courses whose enrollment
+    changed (``Course.enrollment_updated``). ``full`` rebuilds every course.
+    """
+    started = timezone.now()
+    previous = (
+        None if full else ProgressSnapshotRun.objects.order_by("-started").first()
+    )
+    run = ProgressSnapshotRun(
+        started=started, high_water=started, full=previous is None
+    )
+
+    if previous is None:
+        course_ids = set(Course.objects.values_list("id", flat=True))
+        for course_id in course_ids:
+            run.refreshed += _upsert(
+                CourseProgress.objects.filter(course_id=course_id), batch_size
+            )
+    else:
+        since = previous.high_water - REFRESH_OVERLAP
+        run.refreshed += _upsert(
+            CourseProgress.objects.filter(updated__gt=since), batch_size
+        )
+        course_ids = set(
+            Course.objects.filter(enrollment_updated__gt=since).values_list(
+                "id", flat=True
+            )
+        )
+        for course_id in course_ids:
+            run.refreshed += _upsert(
+                CourseProgress.objects.filter(course_id=course_id), batch_size
+            )
+        course_ids |= set(
+            CourseProgress.objects.filter(updated__gt=since)
+            .order_by()
+            .values_list("course_id", flat=True)
+            .distinct()
+        )
+
+    for course_id in course_ids:
+        created, deleted = _reconcile_course(course_id, batch_size)
+        run.refreshed += created
+        run.deleted += deleted
+
+    run.finished = timezone.now()
+    run.save()
+    return run
+
+
+def _upsert(progresses, batch_size):
+    """Write the snapshots of enrolled students from a CourseProgress queryset."""
+    snapshots = {}
+    # Like the live report, a student's oldest progress record wins.
+    for progress in (
+        progresses.filter(course__students=F("student_id"))
+        .order_by("-id")
+        .only(
+            "course_id",
+            "student_id",
+            "completed_modules_count",
+            "total_modules",
+            "completed_contents_count",
+            "total_contents",
+            "is_active",
+            "last_accessed_module_id",
+            "date_completed",
+        )
+        .iterator(chunk_size=batch_size)
+    ):
+        snapshots[(progress.course_id, progress.student_id)] = _snapshot_of(progress)
+    _bulk_upsert(list(snapshots.values()), batch_size)
+    return len(snapshots)
+
+
+def _snapshot_of(progress):
+    total_modules = progress.total_modules
+    return CourseProgressSnapshot(
+        course_id=progress.course_id,
+        student_id=progress.student_id,
+        progress_percentage=(
+            (progress.completed_modules_count / total_modules) * 100
+            if total_modules
+            else 0
+        ),
+        completed_modules=progress.completed_modules_count,
+        total_modules=total_modules,
+        completed_contents=progress.completed_contents_count,
+        total_contents=progress.total_contents,
+        is_active=progress.is_active,
+        last_accessed_module_id=progress.last_accessed_module_id,
+        date_completed=progress.date_completed,
+        refreshed_at=timezone.now(),
+    )
+
+
+def _bulk_upsert(snapshots, batch_size):
+    options = {"update_conflicts": True, "update_fields": SNAPSHOT_FIELDS}
+    # MySQL upserts on any unique key and rejects an explicit conflict target.
+    if connection.features.supports_update_conflicts_with_target:
+        options["unique_fields"] = ["course", "student"]
+    CourseProgressSnapshot.objects.bulk_create(
+        snapshots, batch_size=batch_size, **options
+    )
+
+
+def _reconcile_course(course_id, batch_size):
+    """
+    Match the snapshots of a course with its enrolled students.
+
+    Enrolled students without a progress record get a zero snapshot (with the
+    course totals) and the snapshots of students who left are deleted.
+    Returns ``(created, deleted)``.
+    """
+    total_modules = Module.objects.filter(course_id=course_id).count()
+    total_contents = (
+        Module.objects.filter(course_id=course_id).aggregate(
+            total=Sum("contents_count")
+        )["total"]
+        or 0
+    )
+    snapshots = CourseProgressSnapshot.objects.filter(course_id=course_id)
+    enrolled = Course.students.through.objects.filter(course_id=course_id)
+
+    with transaction.atomic():
+        deleted, _ = snapshots.exclude(
+            student_id__in=enrolled.values("user_id")
+        ).delete()
+        progress_students = CourseProgress.objects.filter(course_id=course_id).values(
+            "student_id"
+        )
+        snapshots.exclude(student_id__in=progress_students).update(
+            progress_percentage=0,
+            completed_modules=0,
+            total_modules=total_modules,
+            completed_contents=0,
+            total_contents=total_contents,
+            is_active=False,
+            last_accessed_module=None,
+            date_completed=None,
+            refreshed_at=timezone.now(),
+        )
+        missing = enrolled.exclude(user_id__in=snapshots.values("student_id"))
+        created = CourseProgressSnapshot.objects.bulk_create(
+            [
+                CourseProgressSnapshot(
+                    course_id=course_id,
+                    student_id=student_id,
+                    total_modules=total_modules,
+                    total_contents=total_contents,
+                )
+                for student_id in missing.values_list("user_id", flat=True)
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+    return len(created), deleted
+
+
+def snapshot_students_progress(course):
+    """
+    The students progress report of ``Course.get_students_progress`` read from the
+    snapshots: one query, as fresh as the last refresh.
+    """
+    return [
+        {
+            "student_id": row["student_id"],
+            "student": row["student__username"],
+            "progress_percentage": row["progress_percentage"],
+            "completed_modules": row["completed_modules"],
+            "total_modules": row["total_modules"],
+            "completed_contents": row["completed_contents"],
+            "total_contents": row["total_contents"],
+        }
+        for row in CourseProgressSnapshot.objects.filter(course=course)
+        .order_by("student_id")
+        .values(
+            "student_id",
+            "student__username",
+            "progress_percentage",
+            "completed_modules",
+            "total_modules",
+            "completed_contents",
+            "total_contents",
+        )
+    ]
@@ -0,0 +1,381 @@
+import html
+import itertools
+import re
+
+from django.apps import apps as global_apps
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+from .content_registry import content_types
+from .models import Content, Module, SearchDocument
+
+TERM = re.compile(r"\w+")
+
+
+def terms(query):
+    return TERM.findall((query or "").lower())
+
+
+class SearchBackend:
+    """
+    Ranked matches over SearchDocument with the full-text engine of a database.
+
+    ``install``/``uninstall`` create the engine's index and run from the
+    migrations; after that the database keeps it current on every write to the
+    documents table. Subclasses implement ``_match``.
+    """
+
+    def install(self, schema_editor, table):
+        pass
+
+    def uninstall(self, schema_editor, table):
+        pass
+
+    def rebuild(self):
+        """Called after the documents were rebuilt in bulk."""
+
+    @staticmethod
+    def _filters(course_ids, kinds, alias):
+        sql, params = [], []
+        for column, values in (("course_id", course_ids), ("kind", kinds)):
+            if values is not None:
+                sql.append(f"{alias}.{column} IN ({', '.join(['%s'] * len(values))})")
+                params.extend(values)
+        return sql, params
+
+    def match(self, query, course_ids=None, kinds=None, limit=None, offset=0):
+        """
+        ``(total, [(document_id, score)])`` of the documents matching every term
+        of ``query``, best first, optionally restricted to courses and kinds.
+        """
+        words = terms(query)
+        if not words or course_ids == [] or kinds == []:
+            return 0, []
+        return self._match(words, course_ids, kinds, limit, offset)
+
+    def _run(self, count_sql, count_params, rows_sql, rows_params, limit, offset):
+        with connection.cursor() as cursor:
+            cursor.execute(count_sql, count_params)
+            total = cursor.fetchone()[0]
+            if limit is not None:
+                rows_sql += " LIMIT %s OFFSET %s"
+                rows_params = [*rows_params, limit, offset]
+            cursor.execute(rows_sql, rows_params)
+            return total, [(row[0], float(row[1])) for row in cursor.fetchall()]
+
+
+class SQLiteBackend(SearchBackend):
+    """FTS5 external content table on the documents, kept in sync by triggers."""
+
+    TOKENIZER = "unicode61 remove_diacritics 2"
+
+    def install(self, schema_editor, table):
+        fts = f"{table}_fts"
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5(title, body, content='{table}', "
+            f"content_rowid='id', tokenize='{self.TOKENIZER}')"
+        )
+        insert = f"INSERT INTO {fts}(rowid, title, body) VALUES (new.id, new.title, new.body);"
+        delete = (
+            f"INSERT INTO {fts}({fts}, rowid, title, body) "
+            "VALUES ('delete', old.id, old.title, old.body);"
+        )
+        for name, event, body in (
+            ("ai", "INSERT", insert),
+            ("ad", "DELETE", delete),
+            ("au", "UPDATE", delete + " " + insert),
+        ):
+            schema_editor.execute(
+                f"CREATE TRIGGER {table}_{name} AFTER {event} ON {table} "
+                f"BEGIN {body} END"
+            )
+
+    def uninstall(self, schema_editor, table):
+        for name in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{name}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+    def rebuild(self):
+        fts = f"{SearchDocument._meta.db_table}_fts"
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    def _match(self, words, course_ids, kinds, limit, offset):
+        table = SearchDocument._meta.db_table
+        fts = f"{table}_fts"
+        # Each term is a quoted prefix query, so FTS5 operators are never parsed.
+        sql, params = self._filters(course_ids, kinds, "d")
+        where = " AND ".join([f"{fts} MATCH %s", *sql])
+        params = [" ".join(f'"{word}"*' for word in words), *params]
+        source = f"FROM {fts} JOIN {table} d ON d.id = {fts}.rowid WHERE {where}"
+        return self._run(
+            f"SELECT COUNT(*) {source}",
+            params,
+            # bm25 is lower for better matches; titles weigh more than bodies.
+            f"SELECT d.id, -bm25({fts}, 5.0, 1.0) AS score {source} ORDER BY score DESC",
+            params,
+            limit,
+            offset,
+        )
+
+
+class MySQLBackend(SearchBackend):
+    """
+    InnoDB FULLTEXT index on (title, body). Queried in boolean mode with every
+    term required and prefix-matched, as the SQLite backend does.
+    """
+
+    def install(self, schema_editor, table):
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD FULLTEXT INDEX {table}_fulltext (title, body)"
+        )
+
+    def uninstall(self, schema_editor, table):
+        schema_editor.execute(f"ALTER TABLE {table} DROP INDEX {table}_fulltext")
+
+    def _match(self, words, course_ids, kinds, limit, offset):
+        table = SearchDocument._meta.db_table
+        against = "MATCH (d.title, d.body) AGAINST (%s IN BOOLEAN MODE)"
+        sql, params = self._filters(course_ids, kinds, "d")
+        where = " AND ".join([against, *sql])
+        # Terms are \w+ runs, so no boolean operator comes from the user.
+        query = " ".join(f"+{word}*" for word in words)
+        source = f"FROM {table} d WHERE {where}"
+        return self._run(
+            f"SELECT COUNT(*) {source}",
+            [query, *params],
+            # MATCH appears twice, in the score and in the filter.
+            f"SELECT d.id, {against} AS score {source} ORDER BY score DESC",
+            [query, query, *params],
+            limit,
+            offset,
+        )
+
+
+class FallbackBackend(SearchBackend):
+    """Unranked ``icontains`` lookups, for databases without an engine wired here."""
+
+    def _match(self, words, course_ids, kinds, limit, offset):
+        documents = SearchDocument.objects.all()
+        for word in words:
+            documents = documents.filter(
+                Q(title__icontains=word) | Q(body__icontains=word)
+            )
+        if course_ids is not None:
+            documents = documents.filter(course_id__in=course_ids)
+        if kinds is not None:
+            documents = documents.filter(kind__in=kinds)
+        ids = documents.order_by("-updated").values_list("id", flat=True)
+        total = ids.count()
+        if limit is not None:
+            ids = ids[offset : offset + limit]
+        return total, [(pk, 0.0) for pk in ids]
+
+
+BACKENDS = {"sqlite": SQLiteBackend, "mysql": MySQLBackend}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackBackend)()
+
+
+#################################################################################
+# Documents, kept current by lessons.signals.
+
+
+def _text_body(text):
+    return html.unescape(strip_tags(text.rendered or text.content))
+
+
+def index_course(course):
+    SearchDocument.objects.update_or_create(
+        kind=SearchDocument.COURSE,
+        object_id=course.pk,
+        defaults={"course": course, "title": course.title, "body": course.overview},
+    )
+
+
+def index_module(module):
+    SearchDocument.objects.update_or_create(
+        kind=SearchDocument.MODULE,
+        object_id=module.pk,
+        defaults={
+            "course_id": module.course_id,
+            "module": module,
+            "title": module.title,
+            "body": module.description,
+        },
+    )
+    # The module may have moved to another course.
+    SearchDocument.objects.filter(kind=SearchDocument.CONTENT, module=module).exclude(
+        course_id=module.course_id
+    ).update(course_id=module.course_id)
+
+
+def index_contents(contents):
+    """Index the Text contents among ``contents``, other types are skipped."""
+    text_type = content_types.get("text")
+    contents = [
+        content for content in contents if content.content_type_id == text_type.id
+    ]
+    if not contents:
+        return
+    modules = {
+        module.pk: module.course_id
+        for module in Module.objects.filter(
+            pk__in={content.module_id for content in contents}
+        ).only("course_id")
+    }
+    texts = text_type.model_class().objects.in_bulk(
+        {content.object_id for content in contents}
+    )
+    for content in contents:
+        text = texts.get(content.object_id)
+        if text is None:
+            continue
+        SearchDocument.objects.update_or_create(
+            kind=SearchDocument.CONTENT,
+            object_id=content.pk,
+            defaults={
+                "course_id": modules[content.module_id],
+                "module_id": content.module_id,
+                "title": text.title,
+                "body": _text_body(text),
+            },
+        )
+
+
+def index_text(text):
+    index_contents(
+        Content.objects.filter(
+            content_type=content_types.get("text"), object_id=text.pk
+        )
+    )
+
+
+def unindex(kind, object_ids):
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def rebuild_index():
+    """Rebuild every document from the courses, modules and Text contents."""
+    SearchDocument.objects.all().delete()
+    total = build_documents()
+    get_backend().rebuild()
+    return total
+
+
+def build_documents(apps=global_apps, batch_size=500):
+    """
+    Insert the documents of every course, module and Text content in bulk.
+
+    Works with the historical ``apps`` of a data migration. Documents that
+    already exist are kept. Returns the number of documents inserted.
+    """
+    Document = apps.get_model("lessons", "SearchDocument")
+    documents = _course_and_module_documents(Document, apps, batch_size)
+    documents = itertools.chain(
+        documents, _content_documents(Document, apps, batch_size)
+    )
+    total = 0
+    while batch := list(itertools.islice(documents, batch_size)):
+        Document.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+    return total
+
+
+def _course_and_module_documents(Document, apps, batch_size):
+    for course in (
+        apps.get_model("lessons", "Course")
+        .objects.order_by("pk")
+        .only("title", "overview")
+        .iterator(chunk_size=batch_size)
+    ):
+        yield Document(
+            kind=SearchDocument.COURSE,
+            object_id=course.pk,
+            course_id=course.pk,
+            title=course.title,
+            body=course.overview,
+        )
+    for module in (
+        apps.get_model("lessons", "Module")
+        .objects.order_by("pk")
+        .only("course_id", "title", "description")
+        .iterator(chunk_size=batch_size)
+    ):
+        yield Document(
+            kind=SearchDocument.MODULE,
+            object_id=module.pk,
+            course_id=module.course_id,
+            module_id=module.pk,
+            title=module.title,
+            body=module.description,
+        )
+
+
+def _content_documents(Document, apps, batch_size):
+    text_type = (
+        apps.get_model("contenttypes", "ContentType")
+        .objects.filter(app_label="lessons", model="text")
+        .first()
+    )
+    if text_type is None:
+        return
+    Text = apps.get_model("lessons", "Text")
+    contents = (
+        apps.get_model("lessons", "Content")
+        .objects.filter(content_type_id=text_type.pk)
+        .order_by("pk")
+        .values_list("pk", "object_id", "module_id", "module__course_id")
+        .iterator(chunk_size=batch_size)
+    )
+    while batch := list(itertools.islice(contents, batch_size)):
+        texts = Text.objects.only("title", "content", "rendered").in_bulk(
+            {object_id for _, object_id, _, _ in batch}
+        )
+        for pk, object_id, module_id, course_id in batch:
+            text = texts.get(object_id)
+            if text is not None:
+                yield Document(
+                    kind=SearchDocument.CONTENT,
+                    object_id=pk,
+                    course_id=course_id,
+                    module_id=module_id,
+                    title=text.title,
+                    body=_text_body(text),
+                )
+
+
+#################################################################################
+# Queries.
+
+
+def snippet(body, words, width=160):
+    """About ``width`` characters of ``body`` around the first matching term."""
+    lowered = body.lower()
+    positions = [lowered.find(word) for word in words]
+    position = min((p for p in positions if p >= 0), default=0)
+    start = max(0, position - width // 3)
+    text = body[start : start + width].strip()
+    if start > 0:
+        text = "…" + text
+    if start + width < len(body):
+        text += "…"
+    return text
+
+
+def search(query, course_ids=None, kinds=None, limit=20, offset=0):
+    """``(total, [(SearchDocument, score)])`` of a query, best first."""
+    total, matches = get_backend().match(query, course_ids, kinds, limit, offset)
+    documents = SearchDocument.objects.in_bulk([pk for pk, _ in matches])
+    return total, [(documents[pk], score) for pk, score in matches if pk in documents]
+
+
+def matching_object_ids(query, kind):
+    """Ids of the courses, modules or Content rows whose document matches ``query``."""
+    _, matches = get_backend().match(query, kinds=[kind])
+    return SearchDocument.objects.filter(pk__in=[pk for pk, _ in matches]).values_list(
+        "object_id", flat=True
+    )
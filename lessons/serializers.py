@@ -1,11 +1,36 @@
+from django.db import models
 from rest_framework import serializers
+from .content_cache import content_payloads
+from .image_variants import VARIANT_FORMATS, srcset
 from .models import CourseProgress, Course, Module, Content, Text, File, Image, Video
 
 
+class SrcsetField(serializers.Field):
+    """Read-only ``{"webp": srcset, "jpeg": srcset}`` of the resized variants."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "variants")
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        return {name: srcset(variants, name) for name in VARIANT_FORMATS}
+
+
 class CourseSerializer(serializers.ModelSerializer):
+    image_srcset = SrcsetField()
+
     class Meta:
         model = Course
-        fields = ["id", "title", "subject", "overview", "image", "created"]
+        fields = [
+            "id",
+            "title",
+            "subject",
+            "overview",
+            "image",
+            "image_srcset",
+            "created",
+        ]
 
 
 class ModuleSerializer(serializers.ModelSerializer):
@@ -22,9 +47,11 @@ class TextSerializer(serializers.ModelSerializer):
 
 
 class ImageSerializer(serializers.ModelSerializer):
+    srcset = SrcsetField()
+
     class Meta:
         model = Image
-        fields = ["id", "title", "file", "created", "updated"]
+        fields = ["id", "title", "file", "srcset", "created", "updated"]
 
 
 class VideoSerializer(serializers.ModelSerializer):
@@ -39,6 +66,24 @@ class FileSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "file", "created", "updated"]
 
 
+ITEM_SERIALIZERS = {
+    "text": TextSerializer,
+    "image": ImageSerializer,
+    "video": VideoSerializer,
+    "file": FileSerializer,
+}
+
+
+class ContentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Fetch the cached item payloads of the whole list at once
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        contents = list(data)
+        self.child.payloads = content_payloads(contents, "lessons", ITEM_SERIALIZERS)
+        return super().to_representation(contents)
+
+
 class ContentSerializer(serializers.ModelSerializer):
     # Add dynamic fields for the content types
     content_data = serializers.SerializerMethodField()
@@ -52,27 +97,22 @@ class ContentSerializer(serializers.ModelSerializer):
             "object_id",
             "content_data",
         ]  # Add 'content_data' field
+        list_serializer_class = ContentListSerializer
 
     def get_content_data(self, obj):
-        # Check the type of content and return the appropriate data
-        content_type = obj.content_type.model
-
-        if content_type == "text":
-            return TextSerializer(obj.item).data
-        elif content_type == "image":
-            return ImageSerializer(obj.item).data
-        elif content_type == "video":
-            return VideoSerializer(obj.item).data
-        elif content_type == "file":
-            return FileSerializer(obj.item).data
-        else:
-            return None  # Handle cases where the content type is not recognized
+        # Cached payload of the item, None if the content type is not recognized
+        payloads = getattr(self, "payloads", None)
+        if payloads is None or obj.pk not in payloads:
+            payloads = content_payloads([obj], "lessons", ITEM_SERIALIZERS)
+        return payloads.get(obj.pk)
 
 
 class CourseProgressSerializer(serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     completed_modules = ModuleSerializer(many=True, read_only=True)
-    completed_contents = ContentSerializer(many=True, read_only=True)
+    completed_contents = ContentSerializer(
+        many=True, read_only=True, source="get_completed_contents"
+    )
     progress_percentage = serializers.SerializerMethodField()
 
     class Meta:
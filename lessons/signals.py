@@ -0,0 +1,357 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .bitmap import ContentBitmap, bitmap_enabled
+from .cache_versions import bump_course_structure, bump_versions
+from .catalog_cache import bump_catalog_version
+from .content_cache import invalidate_item
+from .content_registry import content_types
+from .image_variants import needs_variants, schedule_variants
+from .models import (
+    Content,
+    Course,
+    CourseProgress,
+    Image,
+    ItemBase,
+    Module,
+    COMPLETED_CONTENTS_FIELDS,
+    SearchDocument,
+    Subject,
+    Text,
+    stamp_completions,
+)
+from .search import index_contents, index_course, index_module, index_text, unindex
+
+# Keep the denormalized progress counters of CourseProgress and Module in sync.
+
+CompletedModules = CourseProgress.completed_modules.through
+CompletedContents = CourseProgress.completed_contents.through
+
+
+def _contents_per_module(content_ids):
+    return (
+        Content.objects.filter(pk__in=content_ids)
+        .order_by()
+        .values("module_id")
+        .annotate(total=Count("id"))
+        .values_list("module_id", "total")
+    )
+
+
+def _refresh_completed_modules(progress_ids):
+    for progress in CourseProgress.objects.filter(pk__in=progress_ids):
+        progress.completed_modules_count = progress.completed_modules.count()
+        progress.save(update_fields=["completed_modules_count"])
+        progress.update_completion()
+
+
+def _refresh_completed_contents(progress_ids):
+    for progress in CourseProgress.objects.filter(pk__in=progress_ids):
+        progress.refresh_completed_contents()
+        progress.save(update_fields=COMPLETED_CONTENTS_FIELDS)
+        progress.update_completion()
+
+
+@receiver(m2m_changed, sender=CompletedModules)
+def completed_modules_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action == "pre_clear":
+            instance._cleared_progress_ids = list(
+                CompletedModules.objects.filter(module=instance).values_list(
+                    "courseprogress_id", flat=True
+                )
+            )
+        elif action == "post_clear":
+            _refresh_completed_modules(
+                instance.__dict__.pop("_cleared_progress_ids", [])
+            )
+        elif action in ("post_add", "post_remove"):
+            _refresh_completed_modules(pk_set)
+        return
+
+    if action == "post_add" and pk_set:
+        with transaction.atomic():
+            progress = CourseProgress.objects.select_for_update().get(pk=instance.pk)
+            progress.completed_modules_count += len(pk_set)
+            progress.save(update_fields=["completed_modules_count"])
+            progress.update_completion()
+    elif action in ("post_remove", "post_clear"):
+        _refresh_completed_modules([instance.pk])
+    else:
+        return
+    instance.refresh_from_db(fields=["completed_modules_count", "date_completed"])
+
+
+@receiver(m2m_changed, sender=CompletedContents)
+def completed_contents_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        if action == "pre_clear":
+            instance._cleared_progress_ids = list(
+                CompletedContents.objects.filter(content=instance).values_list(
+                    "courseprogress_id", flat=True
+                )
+            )
+        elif action == "post_clear":
+            _refresh_completed_contents(
+                instance.__dict__.pop("_cleared_progress_ids", [])
+            )
+        elif action in ("post_add", "post_remove"):
+            _refresh_completed_contents(pk_set)
+        return
+
+    if action == "post_add" and pk_set:
+        # Lock the row so concurrent additions don't lose per-module updates.
+        with transaction.atomic():
+            progress = CourseProgress.objects.select_for_update().get(pk=instance.pk)
+            by_module = progress.completed_contents_by_module
+            for module_id, total in _contents_per_module(pk_set):
+                by_module[str(module_id)] = by_module.get(str(module_id), 0) + total
+            progress.completed_contents_count = sum(by_module.values())
+            progress.save(update_fields=COMPLETED_CONTENTS_FIELDS)
+            progress.update_completion()
+    elif action in ("post_remove", "post_clear"):
+        _refresh_completed_contents([instance.pk])
+    else:
+        return
+    instance.refresh_from_db(fields=COMPLETED_CONTENTS_FIELDS + ["date_completed"])
+
+
+@receiver(post_save, sender=Module)
+def module_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        progresses = CourseProgress.objects.filter(course_id=instance.course_id)
+        progresses.update(total_modules=F("total_modules") + 1, updated=timezone.now())
+        stamp_completions(progresses)
+
+
+@receiver(pre_delete, sender=Module)
+def module_pre_delete(sender, instance, **kwargs):
+    instance._completed_progress_ids = list(
+        CompletedModules.objects.filter(module=instance).values_list(
+            "courseprogress_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Module)
+def module_deleted(sender, instance, **kwargs):
+    progresses = CourseProgress.objects.filter(course_id=instance.course_id)
+    progresses.filter(total_modules__gt=0).update(
+        total_modules=F("total_modules") - 1, updated=timezone.now()
+    )
+    _refresh_completed_modules(instance.__dict__.pop("_completed_progress_ids", []))
+    stamp_completions(progresses)
+
+
+@receiver(post_save, sender=Content)
+def content_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contents_added(instance.module_id)
+
+
+def contents_added(module_id, count=1):
+    """Count new contents of a module; also called after Content bulk_create."""
+    Module.objects.filter(pk=module_id).update(
+        contents_count=F("contents_count") + count
+    )
+    progresses = CourseProgress.objects.filter(course__modules=module_id)
+    progresses.update(
+        total_contents=F("total_contents") + count, updated=timezone.now()
+    )
+    stamp_completions(progresses)
+    _bump_module_courses([module_id])
+
+
+@receiver(pre_delete, sender=Content)
+def content_pre_delete(sender, instance, **kwargs):
+    if bitmap_enabled():
+        instance._completed_progress_ids = _progress_ids_with_bit(instance)
+        return
+    instance._completed_progress_ids = list(
+        CompletedContents.objects.filter(content=instance).values_list(
+            "courseprogress_id", flat=True
+        )
+    )
+
+
+def _progress_ids_with_bit(content):
+    if content.ordinal is None:
+        return []
+    return [
+        progress_id
+        for progress_id, data in CourseProgress.objects.filter(
+            course__modules=content.module_id
+        ).values_list("id", "completed_bitmap")
+        if content.ordinal in ContentBitmap(data)
+    ]
+
+
+@receiver(post_delete, sender=Content)
+def content_deleted(sender, instance, **kwargs):
+    Module.objects.filter(pk=instance.module_id, contents_count__gt=0).update(
+        contents_count=F("contents_count") - 1
+    )
+    progresses = CourseProgress.objects.filter(course__modules=instance.module_id)
+    progresses.filter(total_contents__gt=0).update(
+        total_contents=F("total_contents") - 1, updated=timezone.now()
+    )
+    _refresh_completed_contents(instance.__dict__.pop("_completed_progress_ids", []))
+    stamp_completions(progresses)
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def enrollment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Marks the courses whose progress snapshots need an enrollment reconcile.
+    if reverse:
+        if action == "pre_clear":
+            instance._cleared_course_ids = list(
+                instance.courses_joined.values_list("id", flat=True)
+            )
+            return
+        if action == "post_clear":
+            course_ids = instance.__dict__.pop("_cleared_course_ids", [])
+        elif action in ("post_add", "post_remove"):
+            course_ids = pk_set
+        else:
+            return
+    elif action in ("post_add", "post_remove", "post_clear"):
+        course_ids = [instance.pk]
+    else:
+        return
+    Course.objects.filter(pk__in=course_ids).update(enrollment_updated=timezone.now())
+    bump_versions("course", course_ids)
+    bump_versions("user", [instance.pk] if reverse else pk_set or [])
+
+
+@receiver(post_delete, sender=CourseProgress)
+def progress_deleted(sender, instance, **kwargs):
+    # The snapshot of the student falls back to zero on the next reconcile.
+    Course.objects.filter(pk=instance.course_id).update(
+        enrollment_updated=timezone.now()
+    )
+
+
+# Drop the cached payloads of content items when they change.
+for item_model in ItemBase.__subclasses__():
+    post_save.connect(invalidate_item, sender=item_model)
+    post_delete.connect(invalidate_item, sender=item_model)
+
+
+# Generate resized variants of new or replaced images once the row is committed.
+IMAGE_FIELDS = {Image: "file", Course: "image"}
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=Course)
+def image_saved(sender, instance, raw=False, **kwargs):
+    field_name = IMAGE_FIELDS[sender]
+    if not raw and needs_variants(instance, field_name):
+        transaction.on_commit(lambda: schedule_variants(instance, field_name))
+
+
+def images_added(images):
+    """The image_saved of Image items inserted with bulk_create, which sends no post_save."""
+    for image in images:
+        image_saved(Image, image)
+
+
+# Keep the search documents current (see lessons.search). Deleting a course or a
+# module cascades to its documents.
+
+
+@receiver(post_save, sender=Course)
+def course_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_course(instance)
+
+
+@receiver(post_save, sender=Module)
+def module_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_module(instance)
+
+
+@receiver(post_save, sender=Content)
+def content_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_contents([instance])
+
+
+@receiver(post_save, sender=Text)
+def text_indexed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_text(instance)
+
+
+@receiver(post_delete, sender=Content)
+def content_unindexed(sender, instance, **kwargs):
+    unindex(SearchDocument.CONTENT, [instance.pk])
+
+
+@receiver(post_delete, sender=Text)
+def text_unindexed(sender, instance, **kwargs):
+    content_ids = Content.objects.filter(
+        content_type=content_types.get("text"), object_id=instance.pk
+    ).values_list("pk", flat=True)
+    unindex(SearchDocument.CONTENT, list(content_ids))
+
+
+# Invalidate the cached public catalog pages (see lessons.catalog_cache).
+for catalog_model in (Course, Subject):
+    post_save.connect(bump_catalog_version, sender=catalog_model)
+    post_delete.connect(bump_catalog_version, sender=catalog_model)
+
+
+# Invalidate the cached documents built from a course or a user's enrollments
+# (see lessons.cache_versions).
+
+
+def _bump_module_courses(module_ids):
+    bump_course_structure(
+        Module.objects.filter(pk__in=module_ids).values_list("course_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    bump_course_structure([instance.pk])
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_changed(sender, instance, **kwargs):
+    bump_course_structure([instance.course_id])
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def content_changed(sender, instance, created=False, **kwargs):
+    if not created:  # contents_added bumped it already
+        _bump_module_courses([instance.module_id])
+
+
+def item_changed(sender, instance, **kwargs):
+    content_type = content_types.get(content_types.name_for_model(sender))
+    if content_type is not None:
+        _bump_module_courses(
+            Content.objects.filter(
+                content_type=content_type, object_id=instance.pk
+            ).values_list("module_id", flat=True)
+        )
+
+
+for item_model in ItemBase.__subclasses__():
+    post_save.connect(item_changed, sender=item_model)
+    post_delete.connect(item_changed, sender=item_model)
+
+
+@receiver(post_save, sender=CourseProgress)
+@receiver(post_delete, sender=CourseProgress)
+def progress_changed(sender, instance, created=True, **kwargs):
+    bump_versions("user", [instance.student_id])
+    if created:  # The course lists its progress rows
+        bump_versions("course", [instance.course_id])
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import Count
+
+BLOB_PREFIX = "blobs/"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps each distinct file once, under its SHA-256.
+
+    Uploads are hashed while they are streamed to a temp file next to the blobs
+    and then renamed to ``blobs/ab/cd/<digest><ext>``; an upload whose blob
+    already exists is dropped. The name given by ``upload_to`` is only used for
+    its extension. Blobs are shared between rows, so ``delete`` leaves them in
+    place and the "collect_media_blobs" command removes the unreferenced ones.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name only depends on the content, see _save().
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(f"{BLOB_PREFIX}tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temp.write(chunk)
+        hexdigest = digest.hexdigest()
+        blob = f"{BLOB_PREFIX}{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{extension}"
+
+        path = self.path(blob)
+        try:
+            # The blob may be unreferenced and about to be collected: restart the
+            # grace period of "collect_media_blobs" until our row is committed.
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp.name, self.file_permissions_mode)
+            # Atomic on the same file system, concurrent identical uploads are fine.
+            os.replace(temp.name, path)
+        else:
+            os.remove(temp.name)
+        return blob
+
+    def delete(self, name):
+        if name and name.startswith(BLOB_PREFIX):
+            return
+        super().delete(name)
+
+
+def media_storage():
+    """Storage of the uploaded content files, see MEDIA_CONTENT_ADDRESSED."""
+    if getattr(settings, "MEDIA_CONTENT_ADDRESSED", True):
+        return content_addressed_storage
+    return default_storage
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def blob_reference_counts():
+    """``{blob name: number of rows referencing it}`` over every media field."""
+    from .models import Course, File, Image
+
+    counts = {}
+    for model, field_name in ((File, "file"), (Image, "file"), (Course, "image")):
+        for name, total in (
+            model.objects.filter(**{f"{field_name}__startswith": BLOB_PREFIX})
+            .order_by()
+            .values(field_name)
+            .annotate(total=Count("pk"))
+            .values_list(field_name, "total")
+        ):
+            counts[name] = counts.get(name, 0) + total
+    return counts
+
+
+def iter_blobs(storage=content_addressed_storage):
+    """Yield ``(name, path)`` of every blob on disk (variants and temp files excluded)."""
+    root = storage.path(BLOB_PREFIX.rstrip("/"))
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = [
+            name for name in subdirectories if name not in ("tmp", "variants")
+        ]
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, storage.location).replace(os.sep, "/"), path
@@ -1,8 +1,12 @@
+import base64
+
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .models import Course, CourseProgress
+from .progress_buffer import progress_buffer
+from .progress_report import PAGE_ORDERINGS, InvalidCursor, students_progress_page
 
 
 @api_view(["GET"])
@@ -10,16 +14,23 @@ from .models import Course, CourseProgress
 def get_students_progress(request, course_id):
     """
     Retrieve all students' progress in a course.
+
+    Passing any of ``limit``, ``cursor``, ``order`` (``student``, ``progress`` or
+    ``-progress``), ``is_active``, ``completed`` or ``username`` (prefix) switches
+    to a keyset-paginated ``{"results": [...], "next_cursor": ...}`` response.
     """
     try:
         course = get_object_or_404(Course, id=course_id)
 
-        if course.owner != request.user:
+        if course.owner_id != request.user.id:
             return Response(
                 {"error": "Você não tem permissão para acessar esse curso."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        if PAGE_PARAMS.intersection(request.query_params):
+            return _get_students_progress_page(request, course)
+
         progress_data = course.get_students_progress()
 
         return Response(progress_data, status=status.HTTP_200_OK)
@@ -30,6 +41,96 @@ def get_students_progress(request, course_id):
         )
 
 
+PAGE_PARAMS = {"limit", "cursor", "order", "is_active", "completed", "username"}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _parse_bool(value):
+    if value is None:
+        return None
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise ValueError(value)
+
+
+def _get_students_progress_page(request, course):
+    params = request.query_params
+    order = params.get("order", "student")
+    if order not in PAGE_ORDERINGS:
+        return Response(
+            {"error": f"Ordenação inválida. Use: {', '.join(PAGE_ORDERINGS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        limit = min(int(params.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        is_active = _parse_bool(params.get("is_active"))
+        completed = _parse_bool(params.get("completed"))
+    except ValueError:
+        return Response(
+            {"error": "Parâmetros de paginação ou filtro inválidos."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if limit < 1:
+        return Response(
+            {"error": "limit deve ser maior que zero."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    progress_buffer.flush_course(course.id)
+    try:
+        rows, next_cursor = students_progress_page(
+            course,
+            order=order,
+            cursor=params.get("cursor"),
+            limit=limit,
+            is_active=is_active,
+            completed=completed,
+            username=params.get("username"),
+        )
+    except InvalidCursor as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {"results": rows, "next_cursor": next_cursor}, status=status.HTTP_200_OK
+    )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def get_completion_matrix(request, course_id):
+    """
+    Retrieve the students x modules completion heatmap of a course.
+
+    ``data`` holds the base64 encoded ``uint8`` percentages in row-major order
+    (one row per student, one column per module).
+    """
+    course = get_object_or_404(Course, id=course_id)
+
+    if course.owner != request.user:
+        return Response(
+            {"error": "Você não tem permissão para acessar esse curso."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    progress_buffer.flush_course(course.id)
+    students, modules, matrix = course.get_completion_matrix()
+
+    return Response(
+        {
+            "students": [{"id": pk, "username": name} for pk, name in students],
+            "modules": [{"id": pk, "title": title} for pk, title in modules],
+            "shape": list(matrix.shape),
+            "dtype": "uint8",
+            "order": "row-major",
+            "data": base64.b64encode(matrix.tobytes()).decode("ascii"),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
 import logging
 
 logger = logging.getLogger(__name__)
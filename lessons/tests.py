@@ -1,3 +1,1587 @@
-from django.test import TestCase
+import base64
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as global_apps
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+from rest_framework.authtoken.models import Token
+
+from .bitmap import students_who_finished
+from .cache_versions import bump_course_structure, bump_versions, get_versions
+from .catalog_cache import bump_catalog_version, cached_page, catalog_version, page_key
+from .content_registry import content_types
+from .conditional import make_etag, outline_validators
+from .course_outline import get_outline
+from .models import (
+    Content,
+    Course,
+    CourseProgress,
+    File,
+    Image,
+    Module,
+    SearchDocument,
+    Subject,
+    Text,
+    Video,
+)
+from .progress_buffer import ProgressBuffer, progress_buffer
+from .progress_report import build_students_progress
+from .progress_snapshots import refresh_snapshots
+from .search import MySQLBackend, matching_object_ids, search
+from .serializers import ContentSerializer, CourseProgressSerializer, ImageSerializer
+from .storage import blob_reference_counts, content_addressed_storage
+from .tutor_reorder import reorder
+
+# The query counts below are of the database; in production the cache is its own
+# store (Redis), so the tests run on an in-memory one.
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProgressTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="tutor", password="x")
+        subject = Subject.objects.create(title="Math", slug="math")
+        self.course = Course.objects.create(
+            owner=self.owner,
+            subject=subject,
+            title="Algebra",
+            slug="algebra",
+            overview="Overview",
+        )
+        text_type = ContentType.objects.get_for_model(Text)
+        self.modules = []
+        self.contents = []
+        for index in range(3):
+            module = Module.objects.create(course=self.course, title=f"Module {index}")
+            self.modules.append(module)
+            for _ in range(2):
+                text = Text.objects.create(
+                    owner=self.owner, title="Text", content="..."
+                )
+                self.contents.append(
+                    Content.objects.create(
+                        module=module, content_type=text_type, object_id=text.id
+                    )
+                )
+
+    def enroll(self, count, offset=0):
+        students = []
+        for index in range(offset, offset + count):
+            student = User.objects.create_user(username=f"student{index}", password="x")
+            self.course.students.add(student)
+            progress = CourseProgress.objects.create(
+                student=student, course=self.course
+            )
+            progress.completed_modules.add(*self.modules[: index % 4])
+            progress.complete_contents(self.contents[: index % 7])
+            students.append(student)
+        return students
+
+
+class StudentsProgressReportTests(ProgressTestCase):
+    def test_report_payload(self):
+        self.enroll(4)
+        no_progress = User.objects.create_user(username="newcomer", password="x")
+        self.course.students.add(no_progress)
+
+        report = self.course.get_students_progress()
+
+        self.assertEqual(len(report), 5)
+        self.assertEqual(
+            report[3],
+            {
+                "student_id": report[3]["student_id"],
+                "student": "student3",
+                "progress_percentage": 100.0,
+                "completed_modules": 3,
+                "total_modules": 3,
+                "completed_contents": 3,
+                "total_contents": 6,
+            },
+        )
+        self.assertEqual(report[4]["student"], "newcomer")
+        self.assertEqual(report[4]["progress_percentage"], 0)
+        self.assertEqual(report[4]["completed_contents"], 0)
+        self.assertEqual(report[4]["total_contents"], 6)
+
+    def test_query_count_is_constant(self):
+        self.enroll(2)
+        with self.assertNumQueries(5):
+            self.course.get_students_progress()
+
+        self.enroll(20, offset=2)
+        with self.assertNumQueries(5):
+            report = self.course.get_students_progress()
+        self.assertEqual(len(report), 22)
+
+    def test_export_streams_in_constant_queries(self):
+        self.client.force_login(self.owner)
+        url = reverse("students-progress-export", args=[self.course.id])
+
+        def export(**params):
+            response = self.client.get(url, {"output": "ndjson", **params})
+            return b"".join(response.streaming_content).decode().splitlines()
+
+        self.enroll(5)
+        # Session, user, course, two totals, then students and progress per chunk.
+        with self.assertNumQueries(7):
+            self.assertEqual(len(export()), 5)
+
+        self.enroll(20, offset=5)
+        with self.assertNumQueries(7):
+            rows = export()
+        self.assertEqual(len(rows), 25)
+        self.assertIn('"student": "student3"', rows[3])
+        self.assertIn('"progress_percentage": 100.0', rows[3])
+        self.assertEqual(export(is_active="true"), [])
+
+
+class StudentsProgressPageTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.owner)
+        self.url = reverse("students-progress", args=[self.course.id])
+        # completed_modules cycles 0, 1, 2, 3, so the progress key has many ties.
+        self.students = self.enroll(12)
+        self.newcomer = User.objects.create_user(username="newcomer", password="x")
+        self.course.students.add(self.newcomer)
+        # Only the oldest progress row of a student counts.
+        duplicate = CourseProgress.objects.create(
+            student=self.students[0], course=self.course
+        )
+        duplicate.completed_modules.add(*self.modules)
+
+    def walk(self, **params):
+        usernames, cursor = [], None
+        while True:
+            query = {"limit": 5, **params}
+            if cursor:
+                query["cursor"] = cursor
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, 200)
+            usernames += [row["student"] for row in response.data["results"]]
+            cursor = response.data["next_cursor"]
+            if not cursor:
+                return usernames
+
+    def expected(self, students, descending=False):
+        keys = {s.username: (int(s.username[7:]) % 4, s.id) for s in self.students}
+        keys[self.newcomer.username] = (0, self.newcomer.id)
+        return sorted((s.username for s in students), key=keys.get, reverse=descending)
+
+    def test_pages_with_ties_on_progress(self):
+        everyone = self.students + [self.newcomer]
+        self.assertEqual(self.walk(), [s.username for s in everyone])
+        self.assertEqual(self.walk(order="progress"), self.expected(everyone))
+        self.assertEqual(
+            self.walk(order="-progress"), self.expected(everyone, descending=True)
+        )
+
+        response = self.client.get(self.url, {"order": "progress", "limit": 20})
+        rows = {row["student"]: row for row in response.data["results"]}
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows["student0"]["completed_modules"], 0)
+        self.assertEqual(rows["student3"]["progress_percentage"], 100.0)
+        self.assertEqual(rows["student5"]["completed_contents"], 5)
+        self.assertEqual(rows["newcomer"]["total_modules"], 3)
+        self.assertEqual(rows["newcomer"]["total_contents"], 6)
+
+    def test_pages_with_filters(self):
+        active = self.students[1::2]
+        CourseProgress.objects.filter(student__in=active).update(is_active=True)
+        done = [s for s in self.students if int(s.username[7:]) % 4 == 3]
+
+        self.assertEqual(
+            self.walk(order="progress", is_active="true"), self.expected(active)
+        )
+        self.assertEqual(
+            self.walk(order="-progress", is_active="false"),
+            self.expected(
+                [s for s in self.students if s not in active] + [self.newcomer],
+                descending=True,
+            ),
+        )
+        self.assertEqual(
+            self.walk(order="progress", completed="true"), self.expected(done)
+        )
+        self.assertEqual(
+            self.walk(order="progress", username="student1"),
+            self.expected(self.students[1:2] + self.students[10:]),
+        )
+
+    def test_page_query_count(self):
+        # Session, user, course, the page and the two course totals for the newcomer.
+        with self.assertNumQueries(6):
+            self.client.get(self.url, {"order": "-progress", "limit": 20})
+        with self.assertNumQueries(4):
+            self.client.get(self.url, {"limit": 5})
+
+    def test_invalid_cursor(self):
+        cursor = self.client.get(self.url, {"limit": 5}).data["next_cursor"]
+        for query in (
+            {"cursor": "garbage"},
+            {"cursor": cursor, "order": "progress"},
+        ):
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, 400)
+
+
+class CompletionMatrixTests(ProgressTestCase):
+    def test_matrix_contents_and_ordering(self):
+        students = self.enroll(7)
+        # Completions of a student who left the course are dropped.
+        self.course.students.remove(students[5])
+
+        rows, columns, matrix = self.course.get_completion_matrix()
+
+        kept = [s for s in students if s != students[5]]
+        self.assertEqual(rows, [(s.id, s.username) for s in kept])
+        self.assertEqual(columns, [(m.id, m.title) for m in self.modules])
+        self.assertEqual(matrix.dtype.name, "uint8")
+        # student<i> completed contents[:i], two per module.
+        self.assertEqual(
+            matrix.tolist(),
+            [
+                [0, 0, 0],
+                [50, 0, 0],
+                [100, 0, 0],
+                [100, 50, 0],
+                [100, 100, 0],
+                [100, 100, 100],
+            ],
+        )
+
+    def test_view_payload(self):
+        self.enroll(3)
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse("completion-matrix", args=[self.course.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["shape"], [3, 3])
+        self.assertEqual(
+            list(base64.b64decode(response.data["data"])),
+            [0, 0, 0, 50, 0, 0, 100, 0, 0],
+        )
+
+    def test_course_without_students(self):
+        rows, columns, matrix = self.course.get_completion_matrix()
+        self.assertEqual(rows, [])
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(matrix.shape, (0, 3))
+
+
+class ProgressCountersTests(ProgressTestCase):
+    def assertCountersMatch(self, progress):
+        progress.refresh_from_db()
+        live = {
+            "completed_modules_count": progress.completed_modules.count(),
+            "completed_contents_count": progress.completed_contents.count(),
+            "total_modules": self.course.modules.count(),
+            "total_contents": Content.objects.filter(
+                module__course=self.course
+            ).count(),
+        }
+        self.assertEqual({name: getattr(progress, name) for name in live}, live)
+        for module in Module.objects.filter(course=self.course):
+            self.assertEqual(module.contents_count, module.contents.count())
+            self.assertEqual(
+                progress.completed_contents_by_module.get(str(module.id), 0),
+                progress.completed_contents.filter(module=module).count(),
+            )
+
+    def test_counters_follow_changes(self):
+        student = self.enroll(6)[5]
+        progress = CourseProgress.objects.get(student=student)
+        self.assertCountersMatch(progress)
+
+        progress.completed_contents.remove(self.contents[0])
+        self.modules[1].completed_by_students.remove(progress)
+        self.assertCountersMatch(progress)
+
+        self.contents[1].delete()
+        self.modules[0].delete()
+        Module.objects.create(course=self.course, title="Extra")
+        self.assertCountersMatch(progress)
+
+        progress.completed_contents.clear()
+        self.assertCountersMatch(progress)
+
+    def test_reading_percentages_costs_no_query(self):
+        student = self.enroll(3)[2]
+        progress = CourseProgress.objects.get(student=student)
+        module = Module.objects.get(pk=self.modules[0].pk)
+        with self.assertNumQueries(0):
+            self.assertAlmostEqual(progress.get_progress_percentage(), 200 / 3)
+            self.assertEqual(progress.get_content_progress_percentage(module), 100)
+
+    def test_rebuild_command(self):
+        student = self.enroll(5)[4]
+        CourseProgress.objects.update(
+            completed_modules_count=0, total_modules=0, completed_contents_by_module={}
+        )
+        call_command("rebuild_progress_counters", stdout=StringIO())
+        self.assertCountersMatch(CourseProgress.objects.get(student=student))
+
+
+@override_settings(PROGRESS_CONTENT_BITMAP=True)
+class ProgressBitmapTests(ProgressTestCase):
+    def test_completed_contents_are_stored_in_the_bitmap(self):
+        students = self.enroll(7)
+        self.assertFalse(CourseProgress.completed_contents.through.objects.exists())
+        progress = CourseProgress.objects.get(student=students[6])
+        bitmap = progress.get_completed_bitmap()
+        self.assertEqual(bitmap.popcount(), 6)
+        self.assertEqual(
+            sorted(bitmap.ordinals()), sorted(c.ordinal for c in self.contents)
+        )
+        self.assertEqual(progress.completed_contents_count, 6)
+
+        progress.uncomplete_contents([self.contents[2]])
+        progress.refresh_from_db()
+        self.assertFalse(progress.get_completed_bitmap().test(self.contents[2].ordinal))
+        self.assertEqual(progress.completed_contents_count, 5)
+        self.assertEqual(
+            progress.completed_contents_by_module,
+            {
+                str(self.modules[0].id): 2,
+                str(self.modules[1].id): 1,
+                str(self.modules[2].id): 2,
+            },
+        )
+        self.assertEqual(
+            list(progress.get_completed_contents().order_by("id")),
+            self.contents[:2] + self.contents[3:],
+        )
+
+    def test_serializer_reads_the_bitmap(self):
+        student = self.enroll(4)[3]
+        progress = CourseProgress.objects.get(student=student)
+        data = CourseProgressSerializer(progress).data
+        self.assertEqual(
+            sorted(content["id"] for content in data["completed_contents"]),
+            [content.id for content in self.contents[:3]],
+        )
+
+    def test_deleted_content_is_dropped(self):
+        student = self.enroll(4)[3]
+        self.contents[0].delete()
+        progress = CourseProgress.objects.get(student=student)
+        self.assertEqual(progress.completed_contents_count, 2)
+        self.assertEqual(progress.get_completed_bitmap().popcount(), 2)
+        self.assertEqual(progress.total_contents, 5)
+
+    def test_batch_marks_the_bitmap(self):
+        student = self.enroll(2)[1]
+        self.client.force_login(student)
+        results = self.client.post(
+            reverse("progress_batch"),
+            {
+                "items": [
+                    {"course_id": self.course.id, "content_id": self.contents[0].id},
+                    {"course_id": self.course.id, "content_id": self.contents[3].id},
+                ]
+            },
+            content_type="application/json",
+        ).json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["already_completed", "completed"],
+        )
+        progress = CourseProgress.objects.get(student=student)
+        self.assertEqual(progress.completed_contents_count, 2)
+        self.assertFalse(CourseProgress.completed_contents.through.objects.exists())
+
+    def test_counters_and_matrix_from_the_bitmap(self):
+        students = self.enroll(4)
+        CourseProgress.objects.update(
+            completed_contents_count=0, completed_contents_by_module={}
+        )
+        call_command("rebuild_progress_counters", stdout=StringIO())
+        progress = CourseProgress.objects.get(student=students[3])
+        self.assertEqual(progress.completed_contents_count, 3)
+        _, _, matrix = self.course.get_completion_matrix()
+        self.assertEqual(matrix.tolist()[3], [100, 50, 0])
+
+    def test_students_who_finished_module(self):
+        students = self.enroll(7)
+        finished = students_who_finished(self.modules[1])
+        self.assertEqual(finished, [students[4].id, students[5].id, students[6].id])
+
+    def test_rebuild_from_m2m_rows(self):
+        with self.settings(PROGRESS_CONTENT_BITMAP=False):
+            students = self.enroll(4)
+        rows = CourseProgress.completed_contents.through.objects
+        self.assertEqual(rows.count(), 6)
+        self.assertEqual(
+            CourseProgress.objects.exclude(completed_bitmap=b"").count(), 0
+        )
+        call_command("rebuild_progress_bitmaps", "--drop-rows", stdout=StringIO())
+        self.assertFalse(rows.exists())
+        progress = CourseProgress.objects.get(student=students[3])
+        self.assertEqual(
+            sorted(progress.get_completed_bitmap().ordinals()),
+            sorted(c.ordinal for c in self.contents[:3]),
+        )
+        self.assertEqual(
+            list(progress.get_completed_contents().order_by("id")), self.contents[:3]
+        )
+
+        call_command("restore_completed_contents", stdout=StringIO())
+        self.assertEqual(rows.count(), 6)
+        with self.settings(PROGRESS_CONTENT_BITMAP=False):
+            self.assertEqual(
+                list(progress.get_completed_contents().order_by("id")),
+                self.contents[:3],
+            )
+
+    def test_rows_are_kept_without_the_storage_mode(self):
+        with self.settings(PROGRESS_CONTENT_BITMAP=False):
+            with self.assertRaises(CommandError):
+                call_command(
+                    "rebuild_progress_bitmaps", "--drop-rows", stdout=StringIO()
+                )
+
+
+class ProgressBatchTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.enroll(2)[1]  # Completed the first module and content
+        self.client.force_login(self.student)
+
+    def mark(self, *items):
+        return self.client.post(
+            reverse("progress_batch"), {"items": items}, content_type="application/json"
+        ).json()["results"]
+
+    def test_mixed_items_and_duplicates(self):
+        content, module = self.contents[3], self.modules[1]
+        items = [
+            {"course_id": self.course.id, "content_id": content.id},
+            {"course_id": self.course.id, "module_id": module.id},
+            {"course_id": self.course.id, "content_id": content.id},
+            {"course_id": self.course.id, "content_id": self.contents[0].id},
+        ]
+        results = self.mark(*items)
+
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["completed", "completed", "already_completed", "already_completed"],
+        )
+        progress = CourseProgress.objects.get(student=self.student)
+        self.assertEqual(progress.completed_contents_count, 2)
+        self.assertEqual(progress.completed_modules_count, 2)
+
+    def test_other_courses_are_refused(self):
+        other = Course.objects.create(
+            owner=self.owner,
+            subject=self.course.subject,
+            title="Geometry",
+            slug="geometry",
+            overview="...",
+        )
+        other_module = Module.objects.create(course=other, title="Other")
+        results = self.mark(
+            {"course_id": other.id, "module_id": other_module.id},
+            # A module of another course, claimed for this one.
+            {"course_id": self.course.id, "module_id": other_module.id},
+            {"course_id": 0, "content_id": self.contents[0].id},
+            {"course_id": self.course.id},
+        )
+
+        self.assertEqual(
+            [result["error"] for result in results],
+            [
+                "Você não está inscrito neste curso.",
+                "Módulo não encontrado.",
+                "Curso não encontrado.",
+                "Informe exatamente um de content_id ou module_id.",
+            ],
+        )
+        self.assertFalse(other_module.completed_by_students.exists())
+
+    def test_query_count_does_not_grow_with_the_items(self):
+        def items(contents, modules):
+            return [
+                {"course_id": self.course.id, "content_id": content.id}
+                for content in contents
+            ] + [
+                {"course_id": self.course.id, "module_id": module.id}
+                for module in modules
+            ]
+
+        with self.assertNumQueries(17):
+            self.mark(*items(self.contents[1:2], self.modules[1:2]))
+        with self.assertNumQueries(17):
+            self.mark(*items(self.contents[2:5], self.modules[:2]))
+
+
+class TriggerBuffer(ProgressBuffer):
+    """Buffer that stores nothing and records the flushes its timer triggers."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.flushes = []
+        self.flushed = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def _store(self, student_id, course_id, content_ids, module_ids):
+        pass
+
+    def flush(self, **filters):
+        self.release.wait(5)
+        self.flushes.append(filters)
+        self.flushed.set()
+        return 0
+
+
+class ProgressBufferTriggerTests(SimpleTestCase):
+    def test_timer_flushes_after_the_interval(self):
+        buffer = TriggerBuffer(flush_interval=0.01)
+        buffer.record(1, 10, content_ids=[5])
+        self.assertTrue(buffer.flushed.wait(5))
+        self.assertEqual(buffer.flushes, [{}])
+
+    def test_full_buffer_is_flushed_off_the_request_thread(self):
+        buffer = TriggerBuffer(max_pending=2, flush_interval=60)
+        buffer.release.clear()  # The flush blocks until released.
+        buffer.record(1, 10, content_ids=[5])
+        buffer.record(2, 10, content_ids=[5])  # Returns while the flush blocks.
+        self.assertEqual(buffer.flushes, [])
+
+        buffer.release.set()
+        self.assertTrue(buffer.flushed.wait(5))
+        self.assertEqual(buffer.flushes, [{}])
+
+
+class InlineBuffer(ProgressBuffer):
+    """
+    Buffer flushed by the test only, whose next ``fail`` writes raise as with an
+    unavailable database.
+    """
+
+    fail = 0
+
+    def _start_timer(self):
+        pass
+
+    def _start_flush(self):
+        pass
+
+    def _write(self, batch):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("Database unavailable")
+        super()._write(batch)
+
+
+@override_settings(PROGRESS_WRITE_BEHIND=True)
+class ProgressBufferTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.enroll(1)[0]
+        self.progress = CourseProgress.objects.get(student=self.student)
+        self.buffer = InlineBuffer(flush_interval=60)
+
+    def test_events_are_stored_and_coalesced(self):
+        a, b = self.contents[0].id, self.contents[1].id
+        self.buffer.record(self.student.id, self.course.id, content_ids=[a, b])
+        self.buffer.record(
+            self.student.id,
+            self.course.id,
+            content_ids=[a],
+            module_ids=[self.modules[0].id],
+        )
+
+        self.assertEqual(
+            self.buffer.pending_for(self.student.id, self.course.id),
+            ({a, b}, {self.modules[0].id}),
+        )
+        metrics = self.buffer.metrics()
+        self.assertEqual(metrics["recorded_events"], 4)
+        self.assertEqual(metrics["pending_events"], 3)
+        self.assertEqual(metrics["pending_keys"], 1)
+        self.assertTrue(self.buffer.has_pending(self.student.id))
+        self.assertFalse(self.buffer.has_pending(self.student.id, self.course.id + 1))
+
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertFalse(self.buffer.has_pending(self.student.id))
+        self.assertEqual(self.progress.completed_contents.count(), 2)
+        self.assertEqual(self.progress.completed_modules.get(), self.modules[0])
+
+    def test_events_survive_the_process_that_stored_them(self):
+        self.buffer.record(
+            self.student.id, self.course.id, content_ids=[self.contents[0].id]
+        )
+        del self.buffer  # The worker is killed before its flush.
+
+        other_worker = ProgressBuffer(flush_interval=60)
+        self.assertEqual(other_worker.flush_course(self.course.id), 1)
+        self.assertEqual(self.progress.completed_contents.get(), self.contents[0])
+
+    def test_flushes_are_scoped_and_batched(self):
+        other = self.enroll(1, offset=1)[0]
+        self.buffer.max_pending = 2
+        self.buffer.record(
+            self.student.id,
+            self.course.id,
+            content_ids=[c.id for c in self.contents[:5]],
+        )
+        self.buffer.record(other.id, self.course.id, content_ids=[self.contents[5].id])
+
+        self.assertEqual(self.buffer.flush_for(other.id, self.course.id), 1)
+        self.assertTrue(self.buffer.has_pending(self.student.id))
+        self.assertEqual(self.buffer.flush_student(self.student.id), 5)
+        self.assertEqual(self.buffer.metrics()["flushes"], 4)
+
+    def test_failed_flush_keeps_the_events(self):
+        self.buffer.record(
+            self.student.id, self.course.id, content_ids=[self.contents[0].id]
+        )
+        self.buffer.fail = 1
+        with self.assertLogs("lessons.progress_buffer", "ERROR"):
+            self.assertEqual(self.buffer.flush(), 0)
+
+        self.assertEqual(self.progress.completed_contents.count(), 0)
+        self.assertEqual(
+            self.buffer.pending_for(self.student.id, self.course.id),
+            ({self.contents[0].id}, set()),
+        )
+        self.assertEqual(self.buffer.metrics()["failed_flushes"], 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.progress.completed_contents.get(), self.contents[0])
+
+    def test_flush_command(self):
+        self.buffer.record(
+            self.student.id, self.course.id, module_ids=[self.modules[0].id]
+        )
+        with self.settings(PROGRESS_WRITE_BEHIND=False):
+            # Readers skip the table while write-behind is off...
+            self.assertEqual(progress_buffer.flush_student(self.student.id), 0)
+            # ...the command drains what was left behind.
+            out = StringIO()
+            call_command("flush_progress_buffer", stdout=out)
+        self.assertIn("Applied 1 pending events.", out.getvalue())
+        self.assertEqual(self.progress.completed_modules.get(), self.modules[0])
+
+
+@override_settings(PROGRESS_WRITE_BEHIND=True)
+class WriteBehindTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        # The reads below apply the events; no flush from the timer thread.
+        patcher = mock.patch.object(progress_buffer, "_start_timer")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_buffered_completions_are_read_back(self):
+        student = self.enroll(1)[0]
+        progress = CourseProgress.objects.get(student=student)
+        self.client.force_login(student)
+
+        response = self.client.put(
+            f"/lessons/progress/{progress.id}/content/{self.contents[0].id}/complete/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(progress.completed_contents.count(), 0)
+        self.assertTrue(progress_buffer.has_pending(student.id, self.course.id))
+
+        # Reading the progress applies the stored events first.
+        module = Module.objects.get(pk=self.modules[0].pk)
+        self.assertEqual(progress.get_content_progress_percentage(module), 50)
+        self.assertEqual(progress.completed_contents.get(), self.contents[0])
+        self.assertFalse(progress_buffer.has_pending(student.id))
+
+
+class CourseCompletionTests(ProgressTestCase):
+    def test_last_module_stamps_date_completed(self):
+        student = self.enroll(3)[2]
+        progress = CourseProgress.objects.get(student=student)
+        self.assertIsNone(progress.date_completed)
+
+        progress.completed_modules.add(self.modules[2])
+        self.assertIsNotNone(progress.date_completed)
+        self.assertEqual(
+            [row["completed"] for row in self.course.get_completions_per_day()], [1]
+        )
+
+        Module.objects.create(course=self.course, title="Bonus")
+        progress.refresh_from_db()
+        self.assertIsNone(progress.date_completed)
+
+    def test_completed_contents_alone_do_not_complete(self):
+        # student6 completed every content but only two of the three modules.
+        student = self.enroll(1, offset=6)[0]
+        progress = CourseProgress.objects.get(student=student)
+        self.assertEqual(progress.completed_contents_count, progress.total_contents)
+        self.assertFalse(progress.is_complete())
+        self.assertIsNone(progress.date_completed)
+
+        call_command("backfill_course_completions", stdout=StringIO())
+        progress.refresh_from_db()
+        self.assertIsNone(progress.date_completed)
+
+    def test_backfill_command(self):
+        self.enroll(4)
+        CourseProgress.objects.update(date_completed=None)
+        call_command(
+            "backfill_course_completions", "--date=2024-05-01", stdout=StringIO()
+        )
+        completed = CourseProgress.objects.exclude(date_completed=None)
+        self.assertEqual(completed.count(), 1)
+        self.assertEqual(
+            completed.get().date_completed.date().isoformat(), "2024-05-01"
+        )
+
+
+class ProgressSnapshotTests(ProgressTestCase):
+    def test_snapshots_match_live_report(self):
+        students = self.enroll(5)
+        newcomer = User.objects.create_user(username="newcomer", password="x")
+        self.course.students.add(newcomer)
+        refresh_snapshots()
+
+        with override_settings(STUDENTS_PROGRESS_FROM_SNAPSHOT=True):
+            self.assertEqual(
+                self.course.get_students_progress(),
+                build_students_progress(self.course),
+            )
+
+        # Incremental run: one completion, one student leaving.
+        progress = CourseProgress.objects.get(student=students[0])
+        progress.completed_modules.add(self.modules[0])
+        self.course.students.remove(students[1])
+        refresh_snapshots()
+
+        with override_settings(STUDENTS_PROGRESS_FROM_SNAPSHOT=True):
+            self.assertEqual(
+                self.course.get_students_progress(),
+                build_students_progress(self.course),
+            )
+
+
+class ContentItemsTests(ProgressTestCase):
+    def test_items_are_loaded_per_content_type(self):
+        video_type = ContentType.objects.get_for_model(Video)
+        video = Video.objects.create(
+            owner=self.owner, title="Video", url="https://example.com/v"
+        )
+        Content.objects.create(
+            module=self.modules[0], content_type=video_type, object_id=video.id
+        )
+
+        # Contents with their content type, then one query per item model.
+        with self.assertNumQueries(3):
+            data = ContentSerializer(
+                Content.objects.filter(module__course=self.course).with_items(),
+                many=True,
+            ).data
+
+        self.assertEqual(len(data), 7)
+        self.assertEqual(data[-1]["content_data"]["url"], "https://example.com/v")
+
+    def test_content_types_are_served_from_memory(self):
+        content_types.warm()
+        url = reverse("get-content-types")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(
+            response.json()["video"], ContentType.objects.get_for_model(Video).id
+        )
+        self.assertIn("max-age=86400", response["Cache-Control"])
+
+    def test_payloads_follow_item_changes(self):
+        contents = Content.objects.filter(module=self.modules[0]).with_items()
+        first = ContentSerializer(contents, many=True).data
+        self.assertEqual(first, ContentSerializer(contents, many=True).data)
+
+        text = Text.objects.get(pk=first[0]["object_id"])
+        text.content = "Edited"
+        text.save()
+
+        data = ContentSerializer(contents.all(), many=True).data
+        self.assertEqual(data[0]["content_data"]["content"], "Edited")
+
+
+class BulkContentTests(ProgressTestCase):
+    def test_bulk_create_appends_contents(self):
+        # Completed all modules; completion follows the modules, not the contents.
+        (student,) = self.enroll(1, offset=3)
+        self.assertIsNotNone(CourseProgress.objects.get(student=student).date_completed)
+        token = Token.objects.create(user=self.owner)
+        items = [{"content_type": "text", "content": f"Text {i}"} for i in range(5)]
+        items.append({"content_type": "video", "url": "https://example.com/v"})
+
+        response = self.client.post(
+            reverse("content-bulk-create", args=[self.modules[0].id]),
+            {"token": token.key, "items": items},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        contents = list(Content.objects.filter(module=self.modules[0]))
+        self.assertEqual([content.order for content in contents], list(range(8)))
+        self.assertEqual(len({content.ordinal for content in contents}), 8)
+        self.modules[0].refresh_from_db()
+        self.assertEqual(self.modules[0].contents_count, 8)
+        progress = CourseProgress.objects.get(student=student)
+        self.assertEqual(progress.total_contents, 12)
+        self.assertIsNotNone(progress.date_completed)
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=(64,))
+    def test_bulk_created_images_get_variants(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        PILImage.new("RGB", (100, 50)).save(buffer, "PNG")
+        digest = hashlib.sha256(buffer.getvalue()).hexdigest()
+        blob = f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.png"
+        embedding = f'<img src="/media/{blob}">'
+        token = Token.objects.create(user=self.owner)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("content-bulk-create", args=[self.modules[0].id]),
+                    {
+                        "token": token.key,
+                        "items": json.dumps(
+                            [
+                                {"content_type": "image", "file": "shot"},
+                                {"content_type": "text", "content": embedding},
+                            ]
+                        ),
+                        "shot": SimpleUploadedFile("shot.png", buffer.getvalue()),
+                    },
+                )
+
+        self.assertEqual(response.status_code, 201)
+        image = Image.objects.get()
+        self.assertEqual(image.file.name, blob)
+        self.assertEqual([width for width, _ in image.variants["webp"]], [64])
+        # The text of the same batch now points at the variants.
+        self.assertIn(".64.jpg 64w", Text.objects.latest("pk").rendered)
+
+    def test_invalid_item_creates_nothing(self):
+        token = Token.objects.create(user=self.owner)
+        response = self.client.post(
+            reverse("content-bulk-create", args=[self.modules[0].id]),
+            {"token": token.key, "items": [{"content_type": "text"}]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Content.objects.filter(module=self.modules[0]).count(), 2)
+
+
+class OrderSequenceTests(ProgressTestCase):
+    def test_sequence_continues_after_existing_rows(self):
+        module = Module.objects.create(course=self.course, title="Module 3")
+        self.assertEqual(module.order, 3)
+        Module.objects.filter(pk=module.pk).delete()
+        # Orders are never handed out twice, even after a delete.
+        self.assertEqual(
+            Module.objects.create(course=self.course, title="Module 4").order, 4
+        )
+
+    def test_reorder_contents_in_one_update(self):
+        self.client.force_login(self.owner)
+        ids = [content.id for content in reversed(self.contents[:2])]
+
+        with self.assertNumQueries(1):
+            reorder(Content.objects.filter(module=self.modules[0]), ids)
+
+        response = self.client.post(
+            reverse("content-reorder", args=[self.modules[0].id]),
+            {"order": ids},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(
+                Content.objects.filter(module=self.modules[0]).values_list(
+                    "id", flat=True
+                )
+            ),
+            ids,
+        )
+
+        response = self.client.post(
+            reverse("content-reorder", args=[self.modules[0].id]),
+            {"order": ids[:1]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ChunkedUploadTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client.force_login(self.owner)
+
+    def put_range(self, upload_id, data, start, size):
+        return self.client.put(
+            reverse("chunked-upload", args=[upload_id]),
+            data,
+            content_type="application/octet-stream",
+            headers={"content-range": f"bytes {start}-{start + len(data) - 1}/{size}"},
+        )
+
+    def test_upload_in_ranges_and_resume(self):
+        payload = b"%PDF" + bytes(range(256)) * 40
+        response = self.client.post(
+            reverse("chunked-upload-initiate", args=[self.modules[0].id]),
+            {"content_type": "file", "filename": "slides.pdf", "size": len(payload)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()["upload_id"]
+
+        self.assertEqual(
+            self.put_range(upload_id, payload[:4000], 0, len(payload)).json()["offset"],
+            4000,
+        )
+        # The body must hold exactly the bytes of the range.
+        for body in (b"", payload[4000:4010]):
+            response = self.client.put(
+                reverse("chunked-upload", args=[upload_id]),
+                body,
+                content_type="application/octet-stream",
+                headers={"content-range": f"bytes 4000-4099/{len(payload)}"},
+            )
+            self.assertEqual(response.status_code, 400)
+        # A range that does not start at the offset is refused with the offset.
+        response = self.put_range(upload_id, payload[5000:], 5000, len(payload))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 4000)
+        self.assertEqual(
+            self.put_range(upload_id, payload[4000:], 4000, len(payload)).json()[
+                "offset"
+            ],
+            len(payload),
+        )
+
+        response = self.client.post(
+            reverse("chunked-upload-complete", args=[upload_id])
+        )
+        self.assertEqual(response.status_code, 201)
+        content = Content.objects.get(pk=response.json()["id"])
+        with content.item.file.open("rb") as stored:
+            self.assertEqual(stored.read(), payload)
+        self.assertEqual(
+            self.client.post(
+                reverse("chunked-upload-complete", args=[upload_id])
+            ).status_code,
+            409,
+        )
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=(64, 256))
+class ImageVariantTests(ProgressTestCase):
+    def test_variants_are_generated_on_commit(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        PILImage.new("RGBA", (200, 100), (255, 0, 0, 128)).save(buffer, "PNG")
+
+        with override_settings(MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks(execute=True):
+                image = Image.objects.create(
+                    owner=self.owner,
+                    title="Screenshot",
+                    file=SimpleUploadedFile("shot.png", buffer.getvalue()),
+                )
+            image.refresh_from_db()
+            data = ImageSerializer(image).data
+            # Variants are served to the people who can see the original.
+            variant = f"/media/{image.variants['webp'][0][1]}"
+            self.assertEqual(self.client.get(variant).status_code, 404)
+            self.client.force_login(self.owner)
+            self.assertEqual(self.client.get(variant).status_code, 200)
+
+        self.assertEqual(image.variants["source"], image.file.name)
+        # 256 is wider than the original, it is clamped to 200.
+        self.assertEqual([width for width, _ in image.variants["webp"]], [64, 200])
+        self.assertTrue(data["srcset"]["jpeg"].endswith(".200.jpg 200w"))
+
+    def test_texts_embedding_the_image_are_rendered_again(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        buffer = BytesIO()
+        PILImage.new("RGB", (100, 50)).save(buffer, "PNG")
+
+        with override_settings(MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks() as callbacks:
+                image = Image.objects.create(
+                    owner=self.owner,
+                    title="Diagram",
+                    file=SimpleUploadedFile("diagram.png", buffer.getvalue()),
+                )
+            text = Text.objects.create(
+                owner=self.owner,
+                title="Lesson",
+                content=f'<p><img src="/media/{image.file.name}"></p>',
+            )
+            self.assertNotIn("srcset", text.rendered)
+            for callback in callbacks:
+                callback()
+
+        text.refresh_from_db()
+        self.assertIn('srcset="/media/', text.rendered)
+        self.assertIn(".64.jpg 64w", text.rendered)
+
+
+class ContentAddressedStorageTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self, name, data):
+        return File.objects.create(
+            owner=self.owner, title=name, file=SimpleUploadedFile(name, data)
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload("notes.pdf", b"%PDF same bytes")
+        second = self.upload("copy.PDF", b"%PDF same bytes")
+        other = self.upload("other.pdf", b"%PDF other bytes")
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith("blobs/"))
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual(blob_reference_counts()[first.file.name], 2)
+
+        blob, storage = first.file.name, first.file.storage
+        first.file.delete()  # Shared blobs are only removed by the GC.
+        first.delete()
+        call_command("collect_media_blobs", grace_hours=0, stdout=StringIO())
+        self.assertTrue(storage.exists(blob))
+
+        second.delete()
+        call_command("collect_media_blobs", grace_hours=0, stdout=StringIO())
+        self.assertFalse(storage.exists(blob))
+        self.assertTrue(storage.exists(other.file.name))
+
+    def test_reused_blob_survives_the_grace_period(self):
+        blob = self.upload("notes.pdf", b"%PDF bytes").file
+        File.objects.all().delete()
+        day_ago = time.time() - 2 * 24 * 3600
+        os.utime(blob.path, (day_ago, day_ago))
+
+        # A new upload of the same bytes, whose row is not committed yet.
+        self.assertEqual(
+            content_addressed_storage.save("again.pdf", BytesIO(b"%PDF bytes")),
+            blob.name,
+        )
+        call_command("collect_media_blobs", stdout=StringIO())
+        self.assertTrue(content_addressed_storage.exists(blob.name))
+
+    def test_migrated_files_invalidate_the_cached_payloads(self):
+        file = self.upload("notes.pdf", b"%PDF legacy")
+        legacy = default_storage.save("files/notes.pdf", BytesIO(b"%PDF legacy"))
+        File.objects.filter(pk=file.pk).update(file=legacy)
+        Content.objects.create(
+            module=self.modules[0], item=File.objects.get(pk=file.pk)
+        )
+        before = get_outline(self.course.id)["modules"][0]["contents"][-1]
+
+        call_command("migrate_media_to_blobs", delete_originals=True, stdout=StringIO())
+
+        after = get_outline(self.course.id)["modules"][0]["contents"][-1]
+        self.assertIn(legacy, before["content_data"]["file"])
+        self.assertIn(file.file.name, after["content_data"]["file"])
+        self.assertFalse(default_storage.exists(legacy))
+
+
+class MediaServingTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.file = File.objects.create(
+            owner=self.owner,
+            title="Notes",
+            file=SimpleUploadedFile("notes.txt", b"0123456789"),
+        )
+        Content.objects.create(module=self.modules[0], item=self.file)
+        self.url = f"/media/{self.file.file.name}"
+
+    def test_only_enrolled_students_can_download(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        student = self.enroll(1)[0]
+        self.client.force_login(student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+    def test_unreferenced_files_are_refused(self):
+        self.client.force_login(self.owner)
+        default_storage.save("chunked_uploads/upload.part", BytesIO(b"partial"))
+        orphan = content_addressed_storage.save("orphan.txt", BytesIO(b"orphan"))
+        default_storage.save("editor.png", BytesIO(b"ckeditor upload"))
+
+        self.assertEqual(
+            self.client.get("/media/chunked_uploads/upload.part").status_code, 404
+        )
+        self.assertEqual(self.client.get(f"/media/{orphan}").status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get("/media/editor.png").status_code, 200)
+
+    def signed_url(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse("media-url"), {"path": self.url})
+        self.client.logout()
+        self.assertEqual(response.status_code, 200)
+        return response.json()["url"]
+
+    def test_access_check_queries(self):
+        url = self.signed_url(self.enroll(1)[0])
+        # User, course image, File and Image by name, then the enrollment.
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_signed_urls_are_scoped_and_expire(self):
+        student = self.enroll(1)[0]
+        url = self.signed_url(student)
+        token = url.split("?token=")[1]
+        other = File.objects.create(
+            owner=self.owner,
+            title="Other",
+            file=SimpleUploadedFile("other.txt", b"other"),
+        )
+        Content.objects.create(module=self.modules[0], item=other)
+        self.assertEqual(
+            self.client.get(f"/media/{other.file.name}?token={token}").status_code,
+            404,
+        )
+        # The account token is only accepted in the Authorization header.
+        key = Token.objects.create(user=student).key
+        self.assertEqual(self.client.get(f"{self.url}?token={key}").status_code, 404)
+        response = self.client.get(self.url, headers={"Authorization": f"Token {key}"})
+        self.assertEqual(response.status_code, 200)
+
+        with override_settings(MEDIA_TOKEN_MAX_AGE=0):
+            with mock.patch("time.time", return_value=time.time() + 5):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(User.objects.create_user(username="x", password="x"))
+        response = self.client.get(reverse("media-url"), {"path": self.url})
+        self.assertEqual(response.status_code, 404)
+
+    def test_range_and_etag(self):
+        url = self.signed_url(self.owner)
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, headers={"Range": "bytes=2-5"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+        response = self.client.get(url, headers={"Range": "bytes=-3"})
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+        response = self.client.get(url, headers={"Range": "bytes=10-"})
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class TextRenderTests(ProgressTestCase):
+    def test_html_is_sanitized_on_save(self):
+        text = Text.objects.create(
+            owner=self.owner,
+            title="Unsafe",
+            content=(
+                '<p onclick="steal()">Hi <a href="javascript:alert(1)">x</a>'
+                "<script>alert(1)</script><strong>there</strong></p><ul><li>open"
+            ),
+        )
+        self.assertEqual(
+            text.rendered,
+            "<p>Hi <a>x</a><strong>there</strong></p><ul><li>open</li></ul>",
+        )
+        self.assertEqual(gzip.decompress(text.rendered_gzip).decode(), text.rendered)
+
+    def test_students_get_the_compressed_html(self):
+        text = Text.objects.create(
+            owner=self.owner, title="T", content="<p>a &lt; b</p>"
+        )
+        content = Content.objects.create(module=self.modules[0], item=text)
+        student = self.enroll(1)[0]
+        self.client.force_login(student)
+        url = reverse("text_content_html", args=[content.id])
+
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), b"<p>a &lt; b</p>")
+        response = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 200)  # Identity has its own ETag
+        self.assertNotIn("Content-Encoding", response)
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=(64,))
+    def test_ckeditor_images_are_pointed_at_their_variants(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        buffer = BytesIO()
+        PILImage.new("RGB", (100, 50)).save(buffer, "PNG")
+        figure = '<figure class="image"><img src="/media/editor.png"></figure>'
+        saved_before = Text.objects.create(owner=self.owner, title="T", content=figure)
+        self.owner.is_staff = True
+        self.owner.save()
+        self.client.force_login(self.owner)
+
+        response = self.client.post(
+            "/ckeditor5/image_upload/",
+            {"upload": SimpleUploadedFile("editor.png", buffer.getvalue())},
+        )
+        self.assertEqual(response.json(), {"url": "/media/editor.png"})
+
+        saved_after = Text.objects.create(owner=self.owner, title="T", content=figure)
+        saved_before.refresh_from_db()
+        for text in (saved_before, saved_after):
+            self.assertIn('srcset="/media/variants/editor.64.jpg 64w"', text.rendered)
+        self.client.logout()
+        response = self.client.get("/media/variants/editor.64.jpg")
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchTests(ProgressTestCase):
+    def add_text(self, module, title, content):
+        text = Text.objects.create(owner=self.owner, title=title, content=content)
+        return Content.objects.create(module=module, item=text)
+
+    def test_search_is_ranked_and_scoped_to_enrolled_courses(self):
+        student = self.enroll(1)[0]
+        other = Course.objects.create(
+            owner=self.owner,
+            subject=self.course.subject,
+            title="Geometry",
+            slug="geometry",
+            overview="Polynomials everywhere",
+        )
+        body = self.add_text(self.modules[1], "Notes", "<p>Factoring polynomials</p>")
+        self.modules[2].title = "Polynomials"
+        self.modules[2].save()
+
+        self.client.force_login(student)
+        response = self.client.get(reverse("search"), {"q": "polynom"})
+        results = response.json()["results"]
+        self.assertEqual(response.json()["count"], 2)
+        self.assertNotIn(other.id, [result["course_id"] for result in results])
+        # A title match ranks above a body match.
+        self.assertEqual(
+            [(result["kind"], result["id"]) for result in results],
+            [("module", self.modules[2].id), ("content", body.id)],
+        )
+        self.assertEqual(results[1]["snippet"], "Factoring polynomials")
+
+        body.delete()
+        response = self.client.get(reverse("search"), {"q": "polynomials"})
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_migration_backfills_existing_data(self):
+        self.add_text(self.modules[1], "Notes", "<p>Factoring polynomials</p>")
+        self.modules[2].title = "Polynomials"
+        self.modules[2].save()
+        SearchDocument.objects.all().delete()
+        migration = import_module("lessons.migrations.0018_backfill_search_documents")
+
+        migration.backfill_documents(global_apps, None)
+
+        # The course, its three modules and its seven Text contents.
+        self.assertEqual(SearchDocument.objects.count(), 11)
+        self.assertEqual(search("polynom")[0], 2)
+        self.assertEqual(
+            list(matching_object_ids("algebra", SearchDocument.COURSE)),
+            [self.course.id],
+        )
+
+    def test_mysql_requires_every_term_as_a_prefix(self):
+        class Backend(MySQLBackend):
+            def _run(self, *args):
+                self.args = args
+                return 0, []
+
+        backend = Backend()
+        backend.match("Factoring polynom-ials", course_ids=[1])
+        count_sql, count_params, rows_sql, rows_params = backend.args[:4]
+        self.assertIn("IN BOOLEAN MODE", count_sql)
+        self.assertEqual(count_params, ["+factoring* +polynom* +ials*", 1])
+        self.assertEqual(rows_params[:2], count_params[:1] * 2)
+
+    def test_admin_finds_texts_outside_modules(self):
+        self.add_text(self.modules[0], "Indexed", "Polynomials in a module")
+        Text.objects.create(owner=self.owner, title="Loose", content="Polynomials")
+        admin_user = User.objects.create_superuser(username="admin", password="x")
+        self.client.force_login(admin_user)
+
+        response = self.client.get(
+            reverse("admin:lessons_text_changelist"), {"q": "polynomials"}
+        )
+        self.assertEqual(
+            sorted(text.title for text in response.context["cl"].result_list),
+            ["Indexed", "Loose"],
+        )
+
+
+class CatalogCacheTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_anonymous_pages_are_cached_until_a_course_changes(self):
+        url = reverse("course_list_api")
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        Course.objects.create(
+            owner=self.owner,
+            subject=self.course.subject,
+            title="Geometry",
+            slug="geometry",
+            overview="...",
+        )
+        page = self.client.get(url, {"page_size": 1}).json()
+        self.assertEqual([course["title"] for course in page["results"]], ["Geometry"])
+        self.assertIsNotNone(page["next"])
+        self.assertEqual(len(self.client.get(url, {"subject": "math"}).json()), 2)
+        self.assertEqual(self.client.get(url, {"subject": "none"}).json(), [])
+
+    def test_only_one_request_rebuilds_a_page(self):
+        builds = []
+        self.assertEqual(cached_page({}, lambda: builds.append(1) or "v1"), "v1")
+        bump_catalog_version()
+        # Another request is rebuilding: the previous page is served meanwhile.
+        cache.add(page_key({}).format(version=catalog_version()) + ":lock", 1)
+        self.assertEqual(cached_page({}, lambda: builds.append(2) or "v2"), "v1")
+        self.assertEqual(builds, [1])
+
+
+class SharedCacheTests(TestCase):
+    def test_version_stamps_are_shared_between_processes(self):
+        # Each worker process has its own cache connection; with the configured
+        # backend a stamp bumped by one of them is seen by the others.
+        worker, other_worker = (caches.create_connection("default") for _ in "ab")
+        self.assertNotIn("locmem", type(worker).__module__)
+        stamp = get_versions("course", [1])[1]
+        bump_versions("course", [1])
+        self.assertNotEqual(worker.get("version:course:1"), stamp)
+        self.assertEqual(
+            worker.get("version:course:1"), other_worker.get("version:course:1")
+        )
+
+
+class DashboardTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.student = self.enroll(1)[0]
+        CourseProgress.objects.filter(student=self.student).update(is_active=True)
+        self.token = Token.objects.create(user=self.student)
+
+    def dashboard(self):
+        response = self.client.post(
+            reverse("student_dashboard"), {"token": self.token.key}
+        )
+        return response.json()
+
+    def test_dashboard_is_built_in_bounded_queries_and_cached(self):
+        for module in self.modules:
+            text = Text.objects.create(owner=self.owner, title="Extra", content="x")
+            Content.objects.create(module=module, item=text)
+        # token, user, course ids, courses, progress, modules, contents, texts
+        with self.assertNumQueries(8):
+            data = self.dashboard()
+        self.assertEqual(len(data["courses"][0]["modules"][0]["contents"]), 3)
+        with self.assertNumQueries(2):  # token and user
+            self.dashboard()
+
+        text = Text.objects.filter(title="Extra").first()
+        text.title = "Renamed"
+        text.save()
+        contents = self.dashboard()["courses"][0]["modules"][0]["contents"]
+        self.assertIn("Renamed", [content["title"] for content in contents])
+
+        self.course.students.remove(self.student)
+        CourseProgress.objects.filter(student=self.student).delete()
+        self.assertEqual(self.dashboard(), {"is_active": False, "courses": []})
+
+
+class CourseOutlineTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.owner)
+        self.url = reverse("course-outline", args=[self.course.id])
+
+    def test_outline_is_cached_until_the_course_changes(self):
+        outline = self.client.get(self.url).json()
+        self.assertEqual(
+            [module["id"] for module in outline["modules"]],
+            [module.id for module in self.modules],
+        )
+        with self.assertNumQueries(0):
+            get_outline(self.course.id)
+
+        text = self.contents[0].item
+        text.title = "Edited"
+        text.save()
+        self.client.post(
+            reverse("module-reorder", args=[self.course.id]),
+            {"order": [module.id for module in reversed(self.modules)]},
+            content_type="application/json",
+        )
+        outline = self.client.get(self.url).json()
+        self.assertEqual(outline["modules"][0]["id"], self.modules[-1].id)
+        first = outline["modules"][-1]["contents"][0]
+        self.assertEqual(first["content_data"]["title"], "Edited")
+
+    def test_media_urls_are_absolute_for_each_host(self):
+        Course.objects.filter(pk=self.course.pk).update(image="courses/algebra.png")
+        bump_course_structure([self.course.id])
+        self.client.logout()
+
+        listed = self.client.get(reverse("course_list_api")).json()[0]
+        detail = self.client.get(reverse("course_detail_api", args=[self.course.id]))
+        self.assertEqual(detail.json()["image"], listed["image"])
+        self.assertEqual(listed["image"], "http://testserver/media/courses/algebra.png")
+
+        # The cached outline is shared by every host.
+        other = self.client.get(
+            reverse("course_detail_api", args=[self.course.id]),
+            headers={"host": "cdn.example.com"},
+        )
+        self.assertEqual(
+            other.json()["image"], "http://cdn.example.com/media/courses/algebra.png"
+        )
+        self.assertEqual(
+            get_outline(self.course.id)["course"]["image"], "/media/courses/algebra.png"
+        )
+
+    def test_outline_requires_enrollment(self):
+        self.client.force_login(User.objects.create_user(username="guest"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_stale_outline_is_rebuilt_for_a_new_module(self):
+        # A worker stored the outline under a stamp that the module creation
+        # replaced in another worker's view of the cache.
+        stamp = get_versions("outline", [self.course.id])[self.course.id]
+        get_outline(self.course.id)
+        module = Module.objects.create(course=self.course, title="New")
+        cache.set(f"version:outline:{self.course.id}", stamp, None)
+
+        token = Token.objects.create(user=self.owner)
+        response = self.client.post(
+            reverse("module-contents", args=[module.id]), {"token": token.key}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+        modules = self.client.get(
+            reverse("module-list-create", args=[self.course.id])
+        ).json()
+        self.assertEqual(modules[-1]["id"], module.id)
+
+
+class ConditionalGetTests(ProgressTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.student = self.enroll(1)[0]
+        self.client.force_login(self.student)
+
+    def assertRevalidates(self, url, change, queries):
+        etag = self.client.get(url)["ETag"]
+        # Session, user and the lookups made for the validators only.
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        change()
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_content_list_and_detail(self):
+        text = self.contents[0].item
+
+        def edit():
+            text.title = "Edited"
+            text.save()
+
+        module_url = f"/lessons/modules_view/{self.modules[0].id}/contents/"
+        self.assertRevalidates(module_url, edit, 4)
+        self.assertRevalidates(
+            reverse("content-detail", args=[self.contents[0].id]), edit, 4
+        )
+
+    def test_progress(self):
+        progress = CourseProgress.objects.get(student=self.student)
+        self.assertRevalidates(
+            reverse("progress_detail", args=[progress.id]),
+            lambda: progress.completed_contents.add(self.contents[-1]),
+            3,
+        )
+
+    def test_lookup_and_permissions_run_before_validators(self):
+        # A matching ETag must not answer for a missing or foreign object.
+        missing = self.course.id + 100
+        etag, _ = outline_validators(missing)
+        response = self.client.get(
+            reverse("course-detail", args=[missing]), headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        progress = CourseProgress.objects.get(student=self.student)
+        url = reverse("progress_detail", args=[progress.id])
+        etag = self.client.get(url)["ETag"]
+        self.client.force_login(self.owner)
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 404)
+
+    def test_public_course_detail(self):
+        self.client.logout()
+        url = reverse("course_detail_api", args=[self.course.id])
+        response = self.client.get(url)
+        self.assertIn("Last-Modified", response)
+        # The course lookup only.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        # A missing course is a 404, and mints no version stamp.
+        missing = self.course.id + 100
+        etag = make_etag("outline", missing, 1)
+        response = self.client.get(
+            reverse("course_detail_api", args=[missing]),
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(f"version:outline:{missing}"))
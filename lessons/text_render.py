@@ -0,0 +1,235 @@
+import gzip
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+# Elements and attributes produced by the CKEditor 5 configuration, everything
+# else is dropped (the text of unknown elements is kept, see SKIP_CONTENT).
+ALLOWED_TAGS = {
+    "a": {"href", "title", "target", "rel"},
+    "b": set(),
+    "blockquote": set(),
+    "br": set(),
+    "code": {"class"},
+    "del": set(),
+    "em": set(),
+    "figcaption": set(),
+    "figure": {"class", "style"},
+    "h1": set(),
+    "h2": set(),
+    "h3": set(),
+    "h4": set(),
+    "h5": set(),
+    "h6": set(),
+    "hr": set(),
+    "i": set(),
+    "img": {"src", "alt", "width", "height", "style"},
+    "li": set(),
+    "mark": {"class"},
+    "oembed": {"url"},
+    "ol": {"start", "reversed"},
+    "p": {"style"},
+    "pre": set(),
+    "s": set(),
+    "span": {"class", "style"},
+    "strong": set(),
+    "sub": set(),
+    "sup": set(),
+    "table": set(),
+    "tbody": set(),
+    "td": {"colspan", "rowspan"},
+    "tfoot": set(),
+    "th": {"colspan", "rowspan", "scope"},
+    "thead": set(),
+    "tr": set(),
+    "u": set(),
+    "ul": set(),
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Elements removed together with their content.
+SKIP_CONTENT = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+URL_ATTRIBUTES = {"href", "src", "url"}
+URL_SCHEMES = {"", "http", "https", "mailto"}
+STYLE_BLACKLIST = ("expression", "url(", "javascript:", "@import")
+
+
+def _safe_attribute(name, value):
+    if name in URL_ATTRIBUTES:
+        return urlsplit(value.strip()).scheme.lower() in URL_SCHEMES
+    if name == "style":
+        lowered = value.lower()
+        return not any(token in lowered for token in STYLE_BLACKLIST)
+    return True
+
+
+class _Sanitizer(HTMLParser):
+    """
+    Rebuilds the HTML from an allow list. The output is always well formed: end
+    tags without a matching start tag are dropped and open elements are closed.
+    ``<img>`` tags are kept apart in ``images`` so their sources can be rewritten.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.images = []
+        self.open = []
+        self.skipping = 0
+
+    def _start(self, tag, attrs):
+        allowed = ALLOWED_TAGS[tag]
+        attributes = {
+            name: value or ""
+            for name, value in attrs
+            if name in allowed and _safe_attribute(name, value or "")
+        }
+        if tag == "a" and attributes.get("target") == "_blank":
+            attributes["rel"] = "noopener noreferrer"
+        if tag == "img":
+            if attributes.get("src"):
+                self.images.append(attributes)
+                self.parts.append(attributes)
+            return
+        self.parts.append(_tag(tag, attributes))
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_CONTENT:
+            self.skipping += 1
+        elif not self.skipping and tag in ALLOWED_TAGS:
+            self._start(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skipping and tag in ALLOWED_TAGS:
+            self._start(tag, attrs)
+            if tag not in VOID_TAGS:
+                self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_CONTENT:
+            self.skipping = max(0, self.skipping - 1)
+        elif not self.skipping and tag in self.open:
+            while self.open:
+                current = self.open.pop()
+                self.parts.append(f"</{current}>")
+                if current == tag:
+                    break
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open:
+            self.parts.append(f"</{self.open.pop()}>")
+
+
+def _tag(tag, attributes):
+    rendered = "".join(
+        f' {name}="{escape(value)}"' for name, value in attributes.items()
+    )
+    return f"<{tag}{rendered}>"
+
+
+def _media_name(url):
+    path = urlsplit(url).path
+    if path.startswith(settings.MEDIA_URL):
+        return path[len(settings.MEDIA_URL) :]
+    return None
+
+
+def _image_variants(names):
+    """
+    ``{media name: variants}`` of the Image contents and course images, and of
+    the other images (CKEditor uploads) from their variants on disk.
+    """
+    from .image_variants import variants_on_disk
+    from .models import Course, Image
+
+    found = {}
+    if names:
+        for model, field_name in ((Image, "file"), (Course, "image")):
+            rows = model.objects.filter(**{f"{field_name}__in": names})
+            for name, variants in rows.values_list(field_name, "variants"):
+                if variants.get("source") == name:
+                    found[name] = variants
+    for name in names - found.keys():
+        variants = variants_on_disk(name)
+        if variants:
+            found[name] = variants
+    return found
+
+
+def _rewrite_image(attributes, variants):
+    """Point an image at its largest JPEG variant and list the others in srcset."""
+    from .image_variants import srcset
+
+    jpeg = variants.get("jpeg") if variants else None
+    if jpeg:
+        from django.core.files.storage import default_storage
+
+        attributes["src"] = default_storage.url(jpeg[-1][1])
+        attributes["srcset"] = srcset(variants, "jpeg")
+        attributes["sizes"] = "100vw"
+    attributes["loading"] = "lazy"
+    attributes["decoding"] = "async"
+    return _tag("img", attributes)
+
+
+def sanitize_html(source):
+    """
+    Sanitized copy of CKEditor HTML, with uploaded images pointed at their
+    resized variants (see lessons.image_variants).
+    """
+    parser = _Sanitizer()
+    parser.feed(source or "")
+    parser.close()
+    names = {_media_name(image["src"]) for image in parser.images} - {None}
+    variants = _image_variants(names)
+    return "".join(
+        (
+            _rewrite_image(part, variants.get(_media_name(part["src"])))
+            if isinstance(part, dict)
+            else part
+        )
+        for part in parser.parts
+    )
+
+
+def render_texts_embedding(names):
+    """
+    Render again the Texts whose HTML embeds one of the media files ``names``,
+    e.g. once the variants of an image exist. Scans the texts, so it only runs
+    off the request path.
+    """
+    from django.db.models import Q
+
+    from .models import Text
+
+    if not names:
+        return 0
+    embedding = Q()
+    for name in names:
+        embedding |= Q(content__contains=settings.MEDIA_URL + name)
+    rendered = 0
+    for text in Text.objects.filter(embedding).iterator():
+        text.render()
+        text.save(update_fields=[*Text.RENDERED_FIELDS, "updated"])
+        rendered += 1
+    return rendered
+
+
+def compress(html):
+    """``(gzip, brotli)`` bodies of ``html``, brotli is ``None`` without the module."""
+    data = html.encode()
+    try:
+        import brotli
+    except ImportError:
+        compressed = None
+    else:
+        compressed = brotli.compress(data, mode=brotli.MODE_TEXT)
+    return gzip.compress(data, compresslevel=9, mtime=0), compressed
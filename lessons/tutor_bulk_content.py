@@ -0,0 +1,186 @@
+import json
+import logging
+
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .content_registry import content_types
+from .models import Content, Image, Module
+from .search import index_contents
+from .serializers import ContentSerializer
+from .signals import contents_added, images_added
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_CONTENTS = 200
+
+DEFAULT_TITLES = {
+    "text": "Conteúdo de Texto",
+    "video": "Conteúdo de Vídeo",
+    "image": "Conteúdo de Imagem",
+    "file": "Conteúdo de Arquivo",
+}
+
+
+def _build_item(entry, owner, files):
+    """Return an unsaved item for one entry of the request, or an error message."""
+    if not isinstance(entry, dict):
+        return None, "Item inválido."
+    name = str(entry.get("content_type", "")).lower()
+    if name not in DEFAULT_TITLES:
+        return None, "Tipo de conteúdo inválido."
+    fields = {"owner": owner, "title": entry.get("title") or DEFAULT_TITLES[name]}
+    if name == "text":
+        if not entry.get("content"):
+            return None, "O conteúdo de texto é obrigatório."
+        fields["content"] = entry["content"]
+    elif name == "video":
+        if not entry.get("url"):
+            return None, "O URL do vídeo é obrigatório."
+        fields["url"] = entry["url"]
+    else:
+        # "file" names the multipart field holding the upload
+        upload = files.get(entry.get("file") or "")
+        if upload is None:
+            return None, "O arquivo é obrigatório."
+        fields["file"] = upload
+    item = content_types.model(name)(**fields)
+    if name == "text":
+        # bulk_create does not call Text.save, which renders the HTML
+        item.render()
+    return item, None
+
+
+def create_contents(module, items):
+    """
+    Insert the items and their Content rows at the end of ``module``.
+
+    Runs in one transaction: the items are inserted with one ``bulk_create`` per
+    content type (row by row on databases that cannot return the new primary
+    keys, such as MySQL), the orders and ordinals are reserved in one go from
+    their counters and the Content rows are inserted with a single
+    ``bulk_create``.
+    """
+    with transaction.atomic():
+        by_model = {}
+        for item in items:
+            by_model.setdefault(type(item), []).append(item)
+        for model, model_items in by_model.items():
+            if connection.features.can_return_rows_from_bulk_insert:
+                model.objects.bulk_create(model_items)
+                if model is Image:
+                    images_added(model_items)
+            else:
+                for item in model_items:
+                    item.save()
+
+        first_order = Content._meta.get_field("order").reserve(
+            Content(module=module), len(items)
+        )
+        first_ordinal = Content.allocate_ordinals(module.id, len(items))
+        contents = Content.objects.bulk_create(
+            [
+                Content(
+                    module=module,
+                    item=item,
+                    order=first_order + index,
+                    ordinal=first_ordinal + index,
+                )
+                for index, item in enumerate(items)
+            ]
+        )
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # The new primary keys are needed below, the ordinals were reserved.
+            contents = list(
+                Content.objects.filter(
+                    module=module,
+                    ordinal__gte=first_ordinal,
+                    ordinal__lt=first_ordinal + len(items),
+                ).order_by("ordinal")
+            )
+        # bulk_create sends no post_save, update the counters and the index in one go
+        contents_added(module.id, len(contents))
+        index_contents(contents)
+    return contents
+
+
+@api_view(["POST"])
+@parser_classes([JSONParser, MultiPartParser, FormParser])
+@permission_classes([AllowAny])  # Manually authenticate using the token
+def bulk_create_contents(request, module_id):
+    """
+    Create many contents at the end of a module in one request.
+
+    Expects ``token`` and ``items``, a list (a JSON string in multipart requests)
+    of ``{"content_type": "text", "title": ..., "content": ...}``,
+    ``{"content_type": "video", "url": ...}`` or ``{"content_type": "image" |
+    "file", "file": "<multipart field name>"}``. Nothing is created if any item
+    is invalid.
+    """
+    data = request.data
+
+    try:
+        user = Token.objects.get(key=data["token"]).user
+    except (KeyError, Token.DoesNotExist):
+        return Response(
+            {"status": "failed", "error": "Token de acesso ausente ou inválido."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    try:
+        module = Module.objects.select_related("course").get(pk=module_id)
+    except Module.DoesNotExist:
+        return Response(
+            {"detail": "Módulo não encontrado."}, status=status.HTTP_404_NOT_FOUND
+        )
+
+    if module.course.owner_id != user.id:
+        return Response(
+            {"detail": "Você não tem permissão para adicionar conteúdo a este módulo."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    entries = data.get("items")
+    if isinstance(entries, str):
+        try:
+            entries = json.loads(entries)
+        except ValueError:
+            entries = None
+    if not isinstance(entries, list) or not entries:
+        return Response(
+            {"detail": "Envie uma lista de itens não vazia em 'items'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(entries) > MAX_BULK_CONTENTS:
+        return Response(
+            {"detail": f"No máximo {MAX_BULK_CONTENTS} itens por requisição."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    items, errors = [], {}
+    for index, entry in enumerate(entries):
+        item, error = _build_item(entry, user, request.FILES)
+        if error:
+            errors[index] = error
+        items.append(item)
+    if errors:
+        return Response(
+            {"detail": "Itens inválidos.", "errors": errors},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    contents = create_contents(module, items)
+    logger.info(f"Created {len(contents)} contents in module {module.id}")
+
+    return Response(
+        {
+            "detail": "Conteúdos criados com sucesso!",
+            "contents": ContentSerializer(contents, many=True).data,
+        },
+        status=status.HTTP_201_CREATED,
+    )
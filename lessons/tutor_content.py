@@ -5,7 +5,7 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.authtoken.models import Token
 from .models import Content, Module, Text, Image, Video, File
-from django.contrib.contenttypes.models import ContentType
+from .content_registry import content_types
 from rest_framework.exceptions import ValidationError
 import logging
 
@@ -67,10 +67,9 @@ def create_content(request, module_id):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    # Try to fetch the content type
-    try:
-        content_type = ContentType.objects.get(model=content_type_name.lower())
-    except ContentType.DoesNotExist:
+    # Look up the content type in the registry
+    content_type = content_types.get(content_type_name.lower())
+    if content_type is None:
         return Response(
             {"detail": "Tipo de conteúdo inválido."}, status=status.HTTP_400_BAD_REQUEST
         )
@@ -3,8 +3,8 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.authtoken.models import Token
 from django.core.exceptions import ObjectDoesNotExist
-from lessons.models import Module, Content
-from lessons.serializers import ContentSerializer
+from lessons.course_outline import absolute_urls, get_module_outline
+from lessons.models import Module
 from rest_framework.exceptions import PermissionDenied
 
 
@@ -24,7 +24,7 @@ def get_module_contents(request, module_id):
 
     # Fetch the module and course
     try:
-        module = Module.objects.get(id=module_id)
+        module = Module.objects.select_related("course").get(id=module_id)
     except Module.DoesNotExist:
         return Response(
             {"error": "Módulo não encontrado."}, status=status.HTTP_404_NOT_FOUND
@@ -39,10 +39,13 @@ def get_module_contents(request, module_id):
             "Você não tem permissão para visualizar o conteúdo deste módulo."
         )
 
-    # Fetch the contents related to the module
-    contents = Content.objects.filter(module=module)
-
-    # Serialize the contents
-    serializer = ContentSerializer(contents, many=True)
+    # The serialized contents of the module, from the cached course outline
+    module_data = get_module_outline(module.course_id, module.id)
+    if module_data is None:  # Deleted meanwhile
+        return Response(
+            {"error": "Módulo não encontrado."}, status=status.HTTP_404_NOT_FOUND
+        )
 
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(
+        absolute_urls(module_data["contents"], request), status=status.HTTP_200_OK
+    )
@@ -0,0 +1,79 @@
+from django.db.models import Case, PositiveIntegerField, Value, When
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .cache_versions import bump_course_structure
+from .models import Content, Course, Module
+
+
+def reorder(queryset, ids):
+    """
+    Give the rows of ``queryset`` the positions of their id in ``ids`` with a
+    single UPDATE. ``ids`` must list every row of the queryset exactly once.
+    """
+    return queryset.filter(pk__in=ids).update(
+        order=Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=PositiveIntegerField(),
+        )
+    )
+
+
+def _reorder_response(request, queryset, course_id):
+    ids = request.data.get("order")
+    if not isinstance(ids, list) or not all(
+        isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+    ):
+        return Response(
+            {"error": "Envie a lista de ids em 'order'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    current = set(queryset.values_list("id", flat=True))
+    if len(ids) != len(set(ids)) or set(ids) != current:
+        return Response(
+            {"error": "'order' deve conter cada id exatamente uma vez."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    reorder(queryset, ids)
+    # A bulk UPDATE sends no signals.
+    bump_course_structure([course_id])
+    return Response({"order": ids}, status=status.HTTP_200_OK)
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def reorder_modules(request, course_id):
+    """
+    Reorder all modules of a course: ``{"order": [module ids in the new order]}``.
+    """
+    course = get_object_or_404(Course, id=course_id)
+
+    if course.owner != request.user:
+        return Response(
+            {"error": "Você não tem permissão para acessar esse curso."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    return _reorder_response(request, Module.objects.filter(course=course), course.id)
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def reorder_contents(request, module_id):
+    """
+    Reorder all contents of a module: ``{"order": [content ids in the new order]}``.
+    """
+    module = get_object_or_404(Module.objects.select_related("course"), id=module_id)
+
+    if module.course.owner != request.user:
+        return Response(
+            {"error": "Você não tem permissão para acessar esse curso."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    return _reorder_response(
+        request, Content.objects.filter(module=module), module.course_id
+    )
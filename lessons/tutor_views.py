@@ -1,5 +1,7 @@
 from rest_framework import generics
 from .models import Module, Content, Course, Text, File, Image, Video
+from .conditional import ConditionalGetMixin, make_etag, outline_validators
+from .course_outline import get_outline
 from .serializers import ModuleSerializer, ContentSerializer
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
@@ -8,10 +10,14 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view
 
 
-class ModuleListCreateView(generics.ListCreateAPIView):
+class ModuleListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = ModuleSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_validators(self):
+        self.get_queryset()  # Permission checks
+        return outline_validators(self.kwargs["course_id"])
+
     def get_queryset(self):
         course_id = self.kwargs["course_id"]
         try:
@@ -25,6 +31,18 @@ class ModuleListCreateView(generics.ListCreateAPIView):
 
         return Module.objects.filter(course=course)
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()  # Permission checks
+        # The modules of the cached course outline, without their contents
+        outline = get_outline(self.kwargs["course_id"])
+        if outline is None:  # Deleted meanwhile
+            return Response(self.get_serializer(queryset, many=True).data)
+        modules = [
+            {name: value for name, value in module.items() if name != "contents"}
+            for module in outline["modules"]
+        ]
+        return Response(modules)
+
     def perform_create(self, serializer):
         course_id = self.kwargs["course_id"]
         course = Course.objects.get(pk=course_id)
@@ -38,11 +56,14 @@ class ModuleListCreateView(generics.ListCreateAPIView):
 
 
 # New class to handle retrieve, update (edit), and delete for individual modules
-class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ModuleDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_validators(self):
+        return outline_validators(self.object.course_id)
+
     def get_queryset(self):
         """
         Restrict access to modules belonging to the course owned by the user.
@@ -96,7 +117,7 @@ class ModuleDetailView(generics.RetrieveUpdateDestroyAPIView):
 from rest_framework import generics
 from .models import Content, Module, Text, Image, Video, File
 from .serializers import ContentSerializer
-from django.contrib.contenttypes.models import ContentType
+from .content_registry import content_types
 from rest_framework.exceptions import ValidationError
 
 
@@ -115,8 +136,10 @@ class ContentCreateView(generics.CreateAPIView):
             )
 
         # Get content_type (e.g., Text, Image, Video) from the request data
-        content_type_name = self.request.data.get("content_type")
-        content_model = ContentType.objects.get(model=content_type_name.lower())
+        content_type_name = self.request.data.get("content_type") or ""
+        content_model = content_types.get(content_type_name.lower())
+        if content_model is None:
+            raise ValidationError({"content_type": "Invalid content type."})
 
         # Validate the object ID (e.g., ID of the specific Text, Image, etc.)
         object_id = self.request.data.get("object_id")
@@ -131,53 +154,75 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class ContentListView(generics.ListAPIView):
+class ContentListView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ContentSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        module_id = self.kwargs["module_id"]
-        module = Module.objects.get(pk=module_id)
-        user = self.request.user
+    def get_module(self):
+        # Checked once per request, by get_validators and get_queryset
+        if not hasattr(self, "module"):
+            module_id = self.kwargs["module_id"]
+            module = Module.objects.select_related("course").get(pk=module_id)
+            user = self.request.user
+
+            # Check if the user is the course owner or a student in the course
+            if (
+                module.course.owner_id != user.id
+                and not module.course.students.filter(id=user.id).exists()
+            ):
+                raise PermissionDenied(
+                    "You do not have permission to view contents for this module."
+                )
+            self.module = module
+        return self.module
 
-        # Check if the user is the course owner or a student in the course
-        if (
-            module.course.owner != user
-            and not module.course.students.filter(id=user.id).exists()
-        ):
-            raise PermissionDenied(
-                "You do not have permission to view contents for this module."
-            )
+    def get_validators(self):
+        return outline_validators(self.get_module().course_id)
 
-        return Content.objects.filter(module=module)
+    def get_queryset(self):
+        return Content.objects.filter(module=self.get_module()).with_items()
 
 
-class ContentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ContentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ContentSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Content.objects.all()
+    queryset = Content.objects.with_items()
+
+    def get_validators(self):
+        # The serialized content only changes with its row and its item
+        content = self.object
+        model = content_types.model(content_types.name_for_id(content.content_type_id))
+        if model is None:
+            return None, None
+        updated = (
+            model.objects.filter(pk=content.object_id)
+            .values_list("updated", flat=True)
+            .first()
+        )
+        etag = make_etag(
+            "content",
+            content.pk,
+            content.module_id,
+            content.content_type_id,
+            content.object_id,
+            updated,
+        )
+        return etag, updated
 
 
-from django.contrib.contenttypes.models import ContentType
+from django.utils.cache import patch_cache_control
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
 
+# ContentType ids only change with a new database, so clients may keep them a day.
+CONTENT_TYPES_MAX_AGE = 60 * 60 * 24
+
 
 @api_view(["GET"])
 @permission_classes([permissions.AllowAny])
 def get_content_types(request):
-    """API to get content type mappings dynamically."""
-    try:
-        content_types = {
-            "text": ContentType.objects.get(model="text").id,
-            "image": ContentType.objects.get(model="image").id,
-            "video": ContentType.objects.get(model="video").id,
-            "file": ContentType.objects.get(model="file").id,
-        }
-        return Response(content_types, status=status.HTTP_200_OK)
-    except ContentType.DoesNotExist:
-        return Response(
-            {"error": "Failed to retrieve content types."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+    """API to get content type mappings, served from the in-memory registry."""
+    response = Response(content_types.ids(), status=status.HTTP_200_OK)
+    patch_cache_control(response, public=True, max_age=CONTENT_TYPES_MAX_AGE)
+    return response
@@ -1,15 +1,23 @@
 from django.urls import path
 
+from lessons.chunked_upload import complete_upload, initiate_upload, upload_chunk
 from lessons.content import CreateContentView
-from lessons.courseProgress import mark_module_complete
+from lessons.course_outline import course_outline
+from lessons.media import media_url
+from lessons.courseProgress import mark_module_complete, progress_buffer_metrics
+from lessons.progress_batch import mark_progress_batch
+from lessons.progress_export import export_students_progress
 from lessons.students_progress import (
     activate_student,
     deactivate_student,
+    get_completion_matrix,
     get_students_progress,
 )
+from lessons.tutor_bulk_content import bulk_create_contents
 from lessons.tutor_content import create_content
 from lessons.tutor_module import add_module_to_course
 from lessons.tutor_module_contents import get_module_contents
+from lessons.tutor_reorder import reorder_contents, reorder_modules
 from lessons.tutor_views import (
     ContentDetailView,
     ContentListView,
@@ -34,6 +42,12 @@ urlpatterns = [
         ModuleListCreateView.as_view(),
         name="module-list-create",
     ),
+    path(
+        "courses/<int:course_id>/modules/reorder/",
+        reorder_modules,
+        name="module-reorder",
+    ),
+    path("courses/<int:course_id>/outline/", course_outline, name="course-outline"),
     path("modules/<int:pk>/", ModuleDetailView.as_view(), name="module-detail"),
     path(
         "courses/<int:course_id>/modules/<int:pk>/",
@@ -46,6 +60,16 @@ urlpatterns = [
         get_students_progress,
         name="students-progress",
     ),
+    path(
+        "courses/<int:course_id>/students-progress/export/",
+        export_students_progress,
+        name="students-progress-export",
+    ),
+    path(
+        "courses/<int:course_id>/completion-matrix/",
+        get_completion_matrix,
+        name="completion-matrix",
+    ),
     path(
         "courses/<int:course_id>/activate-student/<int:student_id>/",
         activate_student,
@@ -58,6 +82,27 @@ urlpatterns = [
     ),
     # Content CRUD
     path("modules/<int:module_id>/contents/", create_content, name="content-create"),
+    path(
+        "modules/<int:module_id>/contents/bulk/",
+        bulk_create_contents,
+        name="content-bulk-create",
+    ),
+    path(
+        "modules/<int:module_id>/uploads/",
+        initiate_upload,
+        name="chunked-upload-initiate",
+    ),
+    path("uploads/<uuid:upload_id>/", upload_chunk, name="chunked-upload"),
+    path(
+        "uploads/<uuid:upload_id>/complete/",
+        complete_upload,
+        name="chunked-upload-complete",
+    ),
+    path(
+        "modules/<int:module_id>/contents/reorder/",
+        reorder_contents,
+        name="content-reorder",
+    ),
     path(
         "modules/<int:module_id>/get_contents/",
         get_module_contents,
@@ -96,5 +141,12 @@ urlpatterns = [
   #  path('courses/<int:course_id>/module/<int:module_id>/complete/', mark_module_complete, name='mark_module_complete'),
     path('courses/<int:course_id>/remove-student/<int:student_id>/', RemoveStudentFromCourseView.as_view(), name='remove-student'),
     path("mark_module_complete/<int:course_id>/<int:module_id>/", mark_module_complete, name="mark_module_complete"),
+    path("progress/batch/", mark_progress_batch, name="progress_batch"),
+    path("media-url/", media_url, name="media-url"),
+    path(
+        "progress/buffer-metrics/",
+        progress_buffer_metrics,
+        name="progress_buffer_metrics",
+    ),
 
 ]
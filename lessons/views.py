@@ -1,5 +1,15 @@
+from django.db.models import Prefetch
 from rest_framework import generics, permissions
+from .bitmap import bitmap_enabled
+from .cache_versions import get_versions
+from .conditional import (
+    ConditionalGetMixin,
+    make_etag,
+    outline_validators,
+    stamp_datetime,
+)
 from .models import Content, Course, CourseProgress, Subject
+from .progress_buffer import progress_buffer, write_behind_enabled
 from .serializers import CourseProgressSerializer, CourseSerializer
 from rest_framework.response import Response
 import logging
@@ -8,8 +18,19 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 
 
+def courses_validators(courses):
+    """``(etag, last_modified)`` of a list of courses, from their creation and stamps."""
+    rows = list(courses.values_list("id", "created"))
+    stamps = get_versions("outline", [pk for pk, _ in rows])
+    moments = [created for _, created in rows] + [
+        stamp_datetime(stamp) for stamp in stamps.values()
+    ]
+    etag = make_etag("courses", *[(pk, stamps[pk]) for pk, _ in rows])
+    return etag, max(moments, default=None)
+
+
 # View to get courses associated with the authenticated user
-class UserCoursesView(generics.ListAPIView):
+class UserCoursesView(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
     permission_classes = [
         permissions.IsAuthenticated
@@ -29,6 +50,9 @@ class UserCoursesView(generics.ListAPIView):
 
         return queryset
 
+    def get_validators(self):
+        return courses_validators(Course.objects.filter(owner=self.request.user))
+
     def list(self, request, *args, **kwargs):
         # Print or log the request data for debugging
         logging.debug(f"Request Data: {request.data}")
@@ -95,12 +119,16 @@ class CreateCourseView(generics.CreateAPIView):
         return Response(CourseSerializer(course).data, status=HTTP_201_CREATED)
 
 
-class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CourseDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
+    def get_validators(self):
+        # The outline stamp changes with the course
+        return outline_validators(self.object.pk)
+
     def perform_update(self, serializer):
         subject_title = self.request.data.get("subject_title")
         if subject_title:
@@ -121,26 +149,74 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
 ######################################################################################
 
 
-class CourseProgressListCreateView(generics.ListCreateAPIView):
+def with_progress_details(queryset):
+    """Prefetch what CourseProgressSerializer reads, including the content items."""
+    queryset = queryset.select_related("course").prefetch_related("completed_modules")
+    if bitmap_enabled():
+        # The completed contents are read from the bitmap.
+        return queryset
+    return queryset.prefetch_related(
+        Prefetch("completed_contents", queryset=Content.objects.with_items())
+    )
+
+
+def progress_validators(progresses):
+    """
+    ``(etag, last_modified)`` of CourseProgress rows serialized with their course,
+    modules and contents: their ``updated`` and the outline stamps of the courses.
+    """
+    rows = [(p.id, p.course_id, p.updated) for p in progresses]
+    if not rows:
+        return None, None
+    stamps = get_versions("outline", {course_id for _, course_id, _ in rows})
+    etag = make_etag("progress", *rows, *sorted(stamps.items()))
+    moments = [updated for _, _, updated in rows] + [
+        stamp_datetime(stamp) for stamp in stamps.values()
+    ]
+    return etag, max(moments)
+
+
+class CourseProgressListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = CourseProgress.objects.all()
     serializer_class = CourseProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_validators(self):
+        progress_buffer.flush_student(self.request.user.id)
+        return progress_validators(
+            CourseProgress.objects.filter(student=self.request.user)
+            .order_by("pk")
+            .only("course_id", "updated")
+        )
+
     def get_queryset(self):
-        return CourseProgress.objects.filter(student=self.request.user)
+        # Make buffered completions of the user visible (read-your-writes)
+        progress_buffer.flush_student(self.request.user.id)
+        return with_progress_details(
+            CourseProgress.objects.filter(student=self.request.user)
+        )
 
     def perform_create(self, serializer):
         serializer.save(student=self.request.user)
 
 
 # Retrieve, Update, and Delete Course Progress
-class CourseProgressDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CourseProgressDetailView(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     queryset = CourseProgress.objects.all()
     serializer_class = CourseProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_validators(self):
+        return progress_validators([self.object])
+
     def get_queryset(self):
-        return CourseProgress.objects.filter(student=self.request.user)
+        # Make buffered completions of the user visible (read-your-writes)
+        progress_buffer.flush_student(self.request.user.id)
+        return with_progress_details(
+            CourseProgress.objects.filter(student=self.request.user)
+        )
 
 
 # Mark content as completed
@@ -154,8 +230,15 @@ class MarkContentCompleteView(generics.UpdateAPIView):
         content_id = kwargs.get("content_id")
         content = Content.objects.get(id=content_id)
 
-        if content not in progress.completed_contents.all():
-            progress.completed_contents.add(content)
+        if write_behind_enabled():
+            # Acknowledge now, the buffer writes the completion in a later batch
+            progress_buffer.record(
+                progress.student_id, progress.course_id, content_ids=[content.id]
+            )
+            return Response({"success": "Conteúdo marcado como completo."})
+
+        if content not in progress.get_completed_contents():
+            progress.complete_contents([content])
             progress.save()
 
         return Response(self.get_serializer(progress).data)
@@ -0,0 +1,84 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Prefetch
+
+from lessons.cache_versions import get_versions
+from lessons.models import Content, Course
+from .serializers import CourseSerializer
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_TIMEOUT = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def dashboard_course_ids(user):
+    return list(
+        Course.objects.filter(
+            progress__student=user, progress__is_active=True
+        ).values_list("id", flat=True)
+    )
+
+
+def build_dashboard(course_ids):
+    """
+    The dashboard document of the given courses, in a fixed number of queries:
+    courses, progress rows, modules, contents and one per content item type
+    (items already in the payload cache are not serialized again).
+    """
+    if not course_ids:
+        return {"is_active": False, "courses": []}
+    courses = Course.objects.filter(pk__in=course_ids).prefetch_related(
+        "progress",
+        Prefetch("modules__contents", queryset=Content.objects.with_items()),
+    )
+    return {
+        "is_active": True,
+        "courses": list(CourseSerializer(courses, many=True).data),
+    }
+
+
+def get_dashboard(user):
+    """
+    The dashboard of ``user``, cached per user with the version stamps of the
+    user and of each course it lists (see lessons.cache_versions), so that an
+    enrollment, progress row or content change rebuilds it.
+    """
+    key = f"dashboard:{user.pk}"
+    user_version = get_versions("user", [user.pk])[user.pk]
+    document = cache.get(key)
+    if (
+        document is not None
+        and document["user"] == user_version
+        and get_versions("course", document["courses"]) == document["courses"]
+    ):
+        return document["data"]
+
+    course_ids = dashboard_course_ids(user)
+    # Read before building, a change made meanwhile invalidates the document.
+    course_versions = get_versions("course", course_ids)
+    data = build_dashboard(course_ids)
+    cache.set(
+        key,
+        {"user": user_version, "courses": course_versions, "data": data},
+        DASHBOARD_TIMEOUT,
+    )
+    return data
+
+
+def precompute_dashboard(user):
+    """Build the dashboard of ``user`` in a background thread, e.g. after login."""
+
+    def run():
+        try:
+            get_dashboard(user)
+        except Exception:
+            logger.exception("Failed to precompute the dashboard of %s.", user.pk)
+        finally:
+            # The thread opened its own connection.
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
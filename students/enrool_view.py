@@ -61,7 +61,7 @@ def enroll_user(request):
     # Check if the user is already enrolled in the course
     if course.students.filter(id=user.id).exists():
         progress = CourseProgress.objects.filter(student=user, course=course).first()
-        if progress and progress.get_progress_percentage() >= 100:
+        if progress and progress.date_completed:
             return Response(
                 {"detail": "Você já completou este curso."},
                 status=status.HTTP_400_BAD_REQUEST,
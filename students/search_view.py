@@ -0,0 +1,70 @@
+from django.db.models import Q
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from lessons.models import Course
+from lessons.search import search, snippet, terms
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+def _positive_int(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+def search_courses(request):
+    """
+    Ranked full-text search over the courses, modules and Text contents of the
+    courses the user is enrolled in (or owns).
+
+    Query parameters: ``q``, ``page`` (from 1) and ``page_size`` (up to 50).
+    """
+    query = request.query_params.get("q", "")
+    if not terms(query):
+        return Response(
+            {"error": "Informe um termo de busca em 'q'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    page = _positive_int(request.query_params.get("page"), 1)
+    page_size = min(
+        _positive_int(request.query_params.get("page_size"), DEFAULT_PAGE_SIZE),
+        MAX_PAGE_SIZE,
+    )
+
+    course_ids = list(
+        Course.objects.filter(Q(students=request.user) | Q(owner=request.user))
+        .values_list("id", flat=True)
+        .distinct()
+    )
+    total, matches = search(
+        query, course_ids=course_ids, limit=page_size, offset=(page - 1) * page_size
+    )
+    words = terms(query)
+    return Response(
+        {
+            "count": total,
+            "page": page,
+            "page_size": page_size,
+            "next_page": page + 1 if page * page_size < total else None,
+            "results": [
+                {
+                    "kind": document.kind,
+                    "id": document.object_id,
+                    "course_id": document.course_id,
+                    "module_id": document.module_id,
+                    "title": document.title,
+                    "snippet": snippet(document.body, words),
+                    "score": score,
+                }
+                for document, score in matches
+            ],
+        },
+        status=status.HTTP_200_OK,
+    )
@@ -1,12 +1,21 @@
 from rest_framework import serializers
+from lessons.content_cache import content_payloads
 from lessons.models import Text, File, Image, Video, Course, Module
+from lessons.serializers import SrcsetField
+from lessons.text_render import sanitize_html
 
 
 class TextSerializer(serializers.ModelSerializer):
+    # Sanitized HTML rendered on save, see lessons.text_render
+    content = serializers.SerializerMethodField()
+
     class Meta:
         model = Text
         fields = ["title", "content"]  # Include fields that you want to serialize
 
+    def get_content(self, obj):
+        return obj.rendered or sanitize_html(obj.content)
+
 
 class FileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,9 +24,11 @@ class FileSerializer(serializers.ModelSerializer):
 
 
 class ImageSerializer(serializers.ModelSerializer):
+    srcset = SrcsetField()
+
     class Meta:
         model = Image
-        fields = ["title", "file"]
+        fields = ["title", "file", "srcset"]
 
 
 class VideoSerializer(serializers.ModelSerializer):
@@ -26,6 +37,14 @@ class VideoSerializer(serializers.ModelSerializer):
         fields = ["title", "url"]
 
 
+ITEM_SERIALIZERS = {
+    "text": TextSerializer,
+    "file": FileSerializer,
+    "image": ImageSerializer,
+    "video": VideoSerializer,
+}
+
+
 class ModuleSerializer(serializers.ModelSerializer):
     contents = serializers.SerializerMethodField()
 
@@ -34,18 +53,10 @@ class ModuleSerializer(serializers.ModelSerializer):
         fields = ["title", "description", "order", "contents"]
 
     def get_contents(self, obj):
-        # Serialize the contents based on their type
-        contents = []
-        for content in obj.contents.all():
-            if isinstance(content.item, Text):
-                contents.append(TextSerializer(content.item).data)
-            elif isinstance(content.item, File):
-                contents.append(FileSerializer(content.item).data)
-            elif isinstance(content.item, Image):
-                contents.append(ImageSerializer(content.item).data)
-            elif isinstance(content.item, Video):
-                contents.append(VideoSerializer(content.item).data)
-        return contents
+        # Assemble the contents from the cached payloads of their items
+        contents = list(obj.contents.all())
+        payloads = content_payloads(contents, "students", ITEM_SERIALIZERS)
+        return [payloads[content.pk] for content in contents if content.pk in payloads]
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -3,6 +3,8 @@ from django.urls import path
 from lessons.students_progress import activate_student, deactivate_student
 from students.dashboard_views import student_dashboard
 from students.enrool_view import enroll_user
+from students.module_content import text_content_html
+from students.search_view import search_courses
 from .views import CourseListAPIView, CourseDetailAPIView, CourseEnrollAPIView
 
 urlpatterns = [
@@ -12,6 +14,12 @@ urlpatterns = [
     path("courses/<int:id>/", CourseDetailAPIView.as_view(), name="course_detail_api"),
     path("enroll/", enroll_user, name="enroll_user"),
     path("dashboard/", student_dashboard, name="student_dashboard"),
+    path("search/", search_courses, name="search"),
+    path(
+        "contents/<int:content_id>/html/",
+        text_content_html,
+        name="text_content_html",
+    ),
     path(
         "courses/<int:id>/enroll/",
         CourseEnrollAPIView.as_view(),
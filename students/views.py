@@ -1,21 +1,83 @@
+from lessons.catalog_cache import cached_page
+from lessons.conditional import ConditionalGetMixin, outline_validators
+from lessons.course_outline import absolute_urls, get_outline
 from lessons.models import Course
 from lessons.serializers import CourseSerializer
 from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 
 
+class CatalogPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created", "-id")
+
+
 class CourseListAPIView(generics.ListAPIView):
+    """
+    Public course catalog, optionally filtered with ``?subject=<slug or id>``.
+
+    Passing ``cursor`` or ``page_size`` switches to cursor pagination; without
+    them the whole list is returned as before. Anonymous responses are cached
+    per query string, see lessons.catalog_cache.
+    """
+
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = CatalogPagination
+    QUERY_PARAMS = ("subject", "cursor", "page_size")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        subject = self.request.query_params.get("subject")
+        if subject:
+            if subject.isdigit():
+                queryset = queryset.filter(subject_id=subject)
+            else:
+                queryset = queryset.filter(subject__slug=subject)
+        return queryset
 
+    def paginate_queryset(self, queryset):
+        params = self.request.query_params
+        if "cursor" not in params and "page_size" not in params:
+            return None
+        return super().paginate_queryset(queryset)
 
-class CourseDetailAPIView(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        params = {
+            name: request.query_params[name]
+            for name in self.QUERY_PARAMS
+            if name in request.query_params
+        }
+        data = cached_page(
+            params, lambda: super(CourseListAPIView, self).list(request).data
+        )
+        return Response(data)
+
+
+class CourseDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     lookup_field = "id"  # Use 'id' instead of 'slug'
     permission_classes = [permissions.AllowAny]
 
+    def get_validators(self):
+        # Answered with 304 from the course's outline stamp, once the course exists
+        return outline_validators(self.object.pk)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the cached course outline, see lessons.course_outline
+        outline = get_outline(self.kwargs["id"])
+        if outline is None:
+            raise NotFound()
+        return Response(absolute_urls(outline["course"], request))
+
 
 class CourseEnrollAPIView(generics.UpdateAPIView):
     queryset = Course.objects.all()